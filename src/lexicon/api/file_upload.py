@@ -8,6 +8,9 @@ from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 from rest_framework.serializers import DjangoValidationError
 
+# Matroska/WebM files start with an EBML header
+EBML_SIGNATURE = b"\x1a\x45\xdf\xa3"
+
 
 @dataclass
 class UploadedFileConfig:
@@ -33,6 +36,32 @@ class UploadedFileConfig:
             return ["mp3", "wav"]
         return []
 
+    def get_allowed_signatures(self) -> List[bytes]:
+        """
+        Returns the magic numbers a file of this type may start with, or an empty list if
+        the content isn't checked.
+
+        Returns:
+            List[bytes]: Allowed leading bytes.
+        """
+        if self.file_type == "video":
+            return [EBML_SIGNATURE]
+        return []
+
+    def has_allowed_signature(self, header: bytes) -> bool:
+        """
+        Checks the leading bytes of a file against the allowed magic numbers.
+
+        Args:
+            header (bytes): At least the first `max(len(signature))` bytes of the file, or
+                the whole file if it is shorter.
+
+        Returns:
+            bool: True if the content is allowed.
+        """
+        signatures = self.get_allowed_signatures()
+        return not signatures or any(header.startswith(signature) for signature in signatures)
+
     def get_allowed_max_size(self) -> int:
         """
         Returns the maximum allowed file size based on the file type.
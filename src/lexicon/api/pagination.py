@@ -1,4 +1,8 @@
+import base64
+import binascii
+import json
 from collections import OrderedDict
+from typing import Sequence, Tuple
 
 from django.conf import settings
 from rest_framework import pagination, status
@@ -45,3 +49,37 @@ class PaginatedListAPIViewMixin:
             }
         )
         return self.success_response(paginated_data, status=status.HTTP_200_OK)
+
+
+def encode_keyset_cursor(position: Sequence) -> str:
+    """
+    Encode the sort key of the last row of a page as an opaque continuation token.
+
+    Args:
+        position (Sequence): Values of the ordering fields of the row, e.g. `(start_ms, id)`.
+
+    Returns:
+        str: URL-safe token to pass back to continue after the row.
+    """
+    data = json.dumps(list(position), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_keyset_cursor(token: str, size: int) -> Tuple[int, ...]:
+    """
+    Decode a token created by `encode_keyset_cursor` for a key of `size` integer fields.
+
+    Raises:
+        ValueError: If the token is malformed.
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError("Invalid cursor.")
+    if (
+        not isinstance(position, list)
+        or len(position) != size
+        or not all(isinstance(value, int) and not isinstance(value, bool) for value in position)
+    ):
+        raise ValueError("Invalid cursor.")
+    return tuple(position)
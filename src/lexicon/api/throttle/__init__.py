@@ -1,17 +1,25 @@
 import functools
 import logging
 
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from rest_framework import exceptions, status
 from rest_framework.response import Response
-from rest_framework.throttling import AnonRateThrottle, SimpleRateThrottle
+from rest_framework.throttling import AnonRateThrottle, BaseThrottle, SimpleRateThrottle
+
+from lexicon.utils.semaphore import LeaseSemaphore
 
 logger = logging.getLogger(__name__)
 
 __all__ = [
     "AnonRateThrottle",
+    "ConcurrencyThrottle",
+    "PlaybackConcurrencyThrottle",
     "ResponseStatusCodeThrottle",
+    "SearchConcurrencyThrottle",
     "SimpleRateThrottle",
+    "UploadConcurrencyThrottle",
+    "release_concurrency_leases",
 ]
 
 
@@ -25,6 +33,92 @@ class BurstAnonRateThrottle(AnonRateThrottle):
     scope = "anon_burst"
 
 
+class ConcurrencyThrottle(BaseThrottle):
+    """
+    Limits the number of requests an anonymous or an authenticated user may have in flight
+    at once, per scope. Limits are set per scope in `CONCURRENCY_THROTTLE_LIMITS`.
+
+    Each admitted request holds a lease of a `LeaseSemaphore` keyed by scope and user id or
+    IP address, shared by all processes through Redis. The lease is released once the
+    response has been sent, which for streaming responses is when the stream ends, so a
+    client can't open dozens of parallel streams. Leases are renewed in the background
+    while held, so a stream counts for as long as it lasts; leases of crashed workers
+    expire after `CONCURRENCY_THROTTLE_LEASE_SECONDS`.
+
+    Leases are released by `release_concurrency_leases`, which the views of `lexicon.api.views`
+    call from `finalize_response`.
+
+    Subclasses set `scope`, and `methods` to only count some request methods:
+        ```python
+        class SearchConcurrencyThrottle(ConcurrencyThrottle):
+            scope = "search"
+            methods = ("GET",)
+        ```
+    """
+
+    scope = None
+    methods = None
+
+    def allow_request(self, request, view):
+        """
+        Take a lease for the request, or raise `ConcurrencyThrottledError` if the client has
+        all of its scope's leases in use.
+        """
+        if self.methods is not None and request.method not in self.methods:
+            return True
+        limit = settings.CONCURRENCY_THROTTLE_LIMITS.get(self.scope)
+        if not limit:
+            return True
+
+        semaphore = LeaseSemaphore(
+            f"throttle:{self.scope}:{self.get_client_key(request)}",
+            limit=limit,
+            lease_seconds=settings.CONCURRENCY_THROTTLE_LEASE_SECONDS,
+            per_host=False,
+        )
+        token = semaphore.try_acquire()
+        if token is None:
+            raise ConcurrencyThrottledError()
+        semaphore.keep_alive(token)
+        if not hasattr(request, "concurrency_leases"):
+            request.concurrency_leases = []
+        request.concurrency_leases.append((semaphore, token))
+        return True
+
+    def get_client_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return f"ip:{self.get_ident(request)}"
+
+
+class PlaybackConcurrencyThrottle(ConcurrencyThrottle):
+    scope = "playback"
+
+
+class UploadConcurrencyThrottle(ConcurrencyThrottle):
+    # Multipart uploads and completions are POSTs, chunks of resumable uploads are PUTs
+    scope = "upload"
+    methods = ("POST", "PUT")
+
+
+class SearchConcurrencyThrottle(ConcurrencyThrottle):
+    scope = "search"
+    methods = ("GET",)
+
+
+def release_concurrency_leases(request, response):
+    """
+    Release the leases `ConcurrencyThrottle` took for a request once `response` is closed,
+    i.e. after its body was sent.
+    """
+    leases = getattr(request, "concurrency_leases", None)
+    if not leases:
+        return
+    request.concurrency_leases = []
+    for semaphore, token in leases:
+        response._resource_closers.append(functools.partial(semaphore.release, token))
+
+
 class ResponseStatusCodeThrottle(SimpleRateThrottle):
     """
     Limits the rate of API calls that may be made by an anonymous or an
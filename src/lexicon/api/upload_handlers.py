@@ -0,0 +1,141 @@
+import hashlib
+import logging
+
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions, status
+
+from lexicon.api.file_upload import UploadedFileConfig
+
+logger = logging.getLogger(__name__)
+
+# Slack allowed on top of the max file size when checking the Content-Length of a multipart
+# body, which also holds the other form fields and the part headers
+MULTIPART_OVERHEAD_ALLOWANCE = 64 * 1024
+# Bytes collected from the start of a file before its signature is checked
+SIGNATURE_HEADER_SIZE = 16
+
+
+class UploadTooLarge(exceptions.APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _("File size is too large.")
+    default_code = "file_too_large"
+
+
+class UnsupportedUploadType(exceptions.APIException):
+    status_code = status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    default_detail = _("File content is not an allowed format.")
+    default_code = "unsupported_file_type"
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """
+    Upload handler that computes a digest of every uploaded file while it is streamed to
+    disk, so callers never have to read the stored file back just to hash it.
+
+    It only observes the data and passes every chunk on unchanged, so it must be placed in
+    front of the handler that actually stores the file. Digests are exposed on the request
+    as `request.upload_digests`, keyed by form field name.
+
+    Usage:
+        request.upload_handlers.insert(0, HashingUploadHandler(request))
+    """
+
+    algorithm = "sha256"
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.hasher = None
+        if request is not None and not hasattr(request, "upload_digests"):
+            request.upload_digests = {}
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.new(self.algorithm)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.request is not None:
+            self.request.upload_digests[self.field_name] = self.hasher.hexdigest()
+        return None
+
+
+class ValidatingUploadHandler(FileUploadHandler):
+    """
+    Upload handler that rejects oversized or wrong-type files while they are being received,
+    instead of after the whole body has been written to disk.
+
+    The declared `Content-Length` is checked before a file starts, the running byte count of
+    every file while it streams, and the magic number of each file against the
+    `UploadedFileConfig` as soon as its first bytes arrive. A rejected upload stops reading
+    the body and resets the connection. The reason is exposed on the request as
+    `request.upload_rejection`, an API exception the view should raise once it has accessed
+    `request.data`.
+
+    Usage:
+        request.upload_handlers.insert(0, ValidatingUploadHandler(request, file_config))
+    """
+
+    def __init__(self, request=None, file_config: UploadedFileConfig = None):
+        super().__init__(request)
+        self.file_config = file_config
+        self.max_size = file_config.get_allowed_max_size()
+        self.content_length = None
+        self.received = 0
+        self.header = b""
+        self.signature_checked = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.content_length = content_length
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.header = b""
+        self.signature_checked = False
+        if (
+            self.content_length is not None
+            and self.content_length > self.max_size + MULTIPART_OVERHEAD_ALLOWANCE
+        ):
+            self.reject(UploadTooLarge(self.size_message()))
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.reject(UploadTooLarge(self.size_message()))
+
+        if not self.signature_checked:
+            self.header += raw_data[: SIGNATURE_HEADER_SIZE - len(self.header)]
+            if len(self.header) >= SIGNATURE_HEADER_SIZE:
+                self.check_signature()
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not self.signature_checked:
+            self.check_signature()
+        return None
+
+    def size_message(self):
+        return _("File size is too large. Allowed max file size: {} bytes.".format(self.max_size))
+
+    def check_signature(self):
+        self.signature_checked = True
+        if not self.file_config.has_allowed_signature(self.header):
+            self.reject(
+                UnsupportedUploadType(
+                    _(
+                        "File content is not an allowed {} format.".format(
+                            self.file_config.file_type
+                        )
+                    )
+                )
+            )
+
+    def reject(self, error: exceptions.APIException):
+        logger.warning(f"Rejected upload of '{self.file_name}': {error.detail}")
+        if self.request is not None:
+            self.request.upload_rejection = error
+        raise StopUpload(connection_reset=True)
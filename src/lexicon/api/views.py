@@ -1,6 +1,7 @@
 from rest_framework import generics, views
 from rest_framework.response import Response
 
+from lexicon.api.throttle import release_concurrency_leases
 from lexicon.api.utils import prep_response_data
 from lexicon.middleware.current_user import set_current_user
 
@@ -63,6 +64,14 @@ class APIView(ResponseMixin, views.APIView):
         user = request.user
         set_current_user(user)
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        """
+        Release the leases of concurrency throttles once the response has been sent.
+        """
+        response = super().finalize_response(request, response, *args, **kwargs)
+        release_concurrency_leases(request, response)
+        return response
+
 
 class GenericAPIView(ResponseMixin, generics.GenericAPIView):
     """
@@ -83,3 +92,11 @@ class GenericAPIView(ResponseMixin, generics.GenericAPIView):
         """
         user = request.user
         set_current_user(user)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """
+        Release the leases of concurrency throttles once the response has been sent.
+        """
+        response = super().finalize_response(request, response, *args, **kwargs)
+        release_concurrency_leases(request, response)
+        return response
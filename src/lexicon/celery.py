@@ -1,4 +1,5 @@
 from celery import Celery, Task
+from celery.signals import celeryd_init
 from django.conf import settings
 
 from lexicon.apps import setup_app_config
@@ -15,3 +16,18 @@ app = Celery("lexicon", task_cls="lexicon.celery:BaseTask")
 
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
+
+
+@celeryd_init.connect
+def configure_extraction_worker(conf=None, options=None, **kwargs):
+    """
+    Workers that consume only the extraction queue get their own concurrency, and fetch one
+    long-running ffmpeg job at a time. An explicit `--concurrency` still takes precedence.
+    """
+    queues = (options or {}).get("queues") or []
+    if isinstance(queues, str):
+        queues = queues.split(",")
+
+    if set(queues) == {settings.CELERY_EXTRACTION_QUEUE}:
+        conf.worker_concurrency = settings.CELERY_EXTRACTION_CONCURRENCY
+        conf.worker_prefetch_multiplier = 1
@@ -13,5 +13,11 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "lexicon.conf.settings")
 os.environ.setdefault("DJANGO_CONFIGURATION", "Development")
 
 from configurations.asgi import get_asgi_application  # noqa: E402
+from django.conf import settings  # noqa: E402
 
 application = get_asgi_application()
+
+if settings.ASYNC_PLAYBACK_ENABLED:
+    from lexicon.video.asgi import AsyncPlaybackMiddleware
+
+    application = AsyncPlaybackMiddleware(application)
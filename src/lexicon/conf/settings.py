@@ -1,5 +1,6 @@
 import os
 import pathlib
+import tempfile
 from datetime import timedelta
 
 import environ
@@ -194,6 +195,16 @@ class BaseConfiguration(Configuration):
         },
     }
 
+    # Requests a user or IP address may have in flight at once, per concurrency throttle scope
+    CONCURRENCY_THROTTLE_LIMITS = {
+        "playback": env.int("PLAYBACK_CONCURRENCY_LIMIT", default=8),
+        "upload": env.int("UPLOAD_CONCURRENCY_LIMIT", default=2),
+        "search": env.int("SEARCH_CONCURRENCY_LIMIT", default=4),
+    }
+    # Leases are renewed while their request runs; those of crashed workers are reclaimed
+    # after this long
+    CONCURRENCY_THROTTLE_LEASE_SECONDS = env.int("CONCURRENCY_THROTTLE_LEASE_SECS", default=60)
+
     # ----------------- Cache settings --------------------------------------
     DJANGO_CACHE_REDIS_URL = env("DJANGO_CACHE_REDIS_URL", default="")
     if DJANGO_CACHE_REDIS_URL:
@@ -213,11 +224,96 @@ class BaseConfiguration(Configuration):
         print('Using "In-Memory" for Django Cache')
 
     # ------------------- File Storage Settings-----------------------------
-    FILE_UPLOAD_MAX_SIZE = env("FILE_UPLOAD_MAX_SIZE", default=1024 * 1024 * 10)  # 10 MB
-    VIDEO_FILE_UPLOAD_MAX_SIZE = env(
+    FILE_UPLOAD_MAX_SIZE = env.int("FILE_UPLOAD_MAX_SIZE", default=1024 * 1024 * 10)  # 10 MB
+    VIDEO_FILE_UPLOAD_MAX_SIZE = env.int(
         "VIDEO_FILE_UPLOAD_MAX_SIZE", default=1024 * 1024 * 400
     )  # 400 MB
 
+    # Resumable uploads: default and max chunk size, and how long a session stays open
+    UPLOAD_CHUNK_SIZE = env.int("UPLOAD_CHUNK_SIZE", default=1024 * 1024 * 8)  # 8 MB
+    UPLOAD_MAX_CHUNK_SIZE = env.int("UPLOAD_MAX_CHUNK_SIZE", default=1024 * 1024 * 64)  # 64 MB
+    UPLOAD_SESSION_TTL = env.int("UPLOAD_SESSION_TTL_SECS", default=60 * 60 * 24)  # 1 day
+
+    # Playback offload: with "x-accel-redirect" (nginx) or "x-sendfile" (Apache, lighttpd)
+    # Django only looks up and authorizes the video, and the web server streams the file.
+    # nginx needs an internal location for the prefix mapped to MEDIA_ROOT, e.g.
+    #   location /protected-media/ { internal; alias /lexicon/media/; }
+    # PLAYBACK_OFFLOAD_EMULATE makes the WSGI app do the web server's part, for development.
+    PLAYBACK_OFFLOAD = env("PLAYBACK_OFFLOAD", default="")
+    PLAYBACK_OFFLOAD_PREFIX = env("PLAYBACK_OFFLOAD_PREFIX", default="/protected-media/")
+    PLAYBACK_OFFLOAD_EMULATE = env.bool("PLAYBACK_OFFLOAD_EMULATE", default=False)
+    # Under ASGI, stream playback with async file I/O instead of a thread per stream
+    ASYNC_PLAYBACK_ENABLED = env.bool("ASYNC_PLAYBACK_ENABLED", default=True)
+
+    # ------------------- Video Processing Settings ------------------------
+    SUBTITLE_INSERT_BATCH_SIZE = env.int("SUBTITLE_INSERT_BATCH_SIZE", default=1000)
+    # Run ANALYZE on the subtitle table after loads of at least this many rows
+    SUBTITLE_ANALYZE_MIN_ROWS = env.int("SUBTITLE_ANALYZE_MIN_ROWS", default=20000)
+    # Cues returned per subtitle window request when no `limit` is given, and the most allowed
+    SUBTITLE_WINDOW_LIMIT = env.int("SUBTITLE_WINDOW_LIMIT", default=200)
+    SUBTITLE_WINDOW_MAX_LIMIT = env.int("SUBTITLE_WINDOW_MAX_LIMIT", default=1000)
+    # Subtitle tracks one extraction subtask demuxes from a single read of the container.
+    # Containers with more text tracks are split across subtasks that extract in parallel.
+    SUBTITLE_TRACKS_PER_READ = env.int("SUBTITLE_TRACKS_PER_READ", default=4)
+    # ffmpeg/ffprobe resource limits. Timeouts are in seconds; the stall timeout kills
+    # ffmpeg when its `-progress` output stops advancing.
+    FFMPEG_TIMEOUT = env.int("FFMPEG_TIMEOUT_SECS", default=60 * 60)  # 1 hour
+    FFMPEG_STALL_TIMEOUT = env.int("FFMPEG_STALL_TIMEOUT_SECS", default=2 * 60)
+    FFPROBE_TIMEOUT = env.int("FFPROBE_TIMEOUT_SECS", default=60)
+    # Max concurrent ffmpeg processes per host, across all workers, and how long to wait
+    # for a free slot
+    FFMPEG_MAX_PROCESSES = env.int("FFMPEG_MAX_PROCESSES", default=2)
+    FFMPEG_SLOT_TIMEOUT = env.int("FFMPEG_SLOT_TIMEOUT_SECS", default=10 * 60)
+    # `nice` niceness and `ionice` scheduling class/level of ffmpeg processes
+    FFMPEG_NICENESS = env.int("FFMPEG_NICENESS", default=10)
+    FFMPEG_IONICE_CLASS = env.int("FFMPEG_IONICE_CLASS", default=2)  # best-effort
+    FFMPEG_IONICE_LEVEL = env.int("FFMPEG_IONICE_LEVEL", default=7)
+    # Lifetime of cached video metadata; entries are also invalidated whenever a video changes
+    VIDEO_CACHE_TIMEOUT = env.int("VIDEO_CACHE_TIMEOUT_SECS", default=60 * 60)  # 1 hour
+    # Per-process LRU of stored video files (path, size, mtime, content type) used by playback
+    # and subtitle routes. Other processes don't see invalidations, so entries expire quickly.
+    VIDEO_FILE_CACHE_SIZE = env.int("VIDEO_FILE_CACHE_SIZE", default=1024)
+    VIDEO_FILE_CACHE_TTL = env.int("VIDEO_FILE_CACHE_TTL_SECS", default=60)
+    # Videos one `process_video_batch` worker extracts concurrently on its event loop
+    ASYNC_EXTRACTION_CONCURRENCY = env.int("ASYNC_EXTRACTION_CONCURRENCY", default=4)
+    # Remux uploads without re-encoding so their seek index comes before the media data
+    FASTSTART_REMUX_ENABLED = env.bool("FASTSTART_REMUX_ENABLED", default=True)
+    # Optional HLS packaging: `<height>:<video kbit/s>` renditions, segment duration, and how
+    # long the stable master playlist URL and the immutable package files may be cached
+    HLS_PACKAGING_ENABLED = env.bool("HLS_PACKAGING_ENABLED", default=False)
+    HLS_LADDER = env.list("HLS_LADDER", default=["360:800", "720:2800", "1080:5000"])
+    HLS_SEGMENT_SECONDS = env.int("HLS_SEGMENT_SECONDS", default=6)
+    HLS_MASTER_MAX_AGE = env.int("HLS_MASTER_MAX_AGE_SECS", default=60)
+    HLS_CACHE_MAX_AGE = env.int("HLS_CACHE_MAX_AGE_SECS", default=60 * 60 * 24 * 365)  # 1 year
+    # How long the stable WebVTT track URL of a video and language, which redirects to the
+    # current rendering, and the immutable renderings themselves may be cached
+    SUBTITLE_TRACK_REDIRECT_MAX_AGE = env.int("SUBTITLE_TRACK_REDIRECT_MAX_AGE_SECS", default=60)
+    SUBTITLE_TRACK_MAX_AGE = env.int(
+        "SUBTITLE_TRACK_MAX_AGE_SECS", default=60 * 60 * 24 * 365
+    )  # 1 year
+    # Node-wide cache of the leading and popular byte windows of videos, in a shared memory
+    # directory. Docker limits /dev/shm to 64 MB unless the container sets `shm_size`.
+    SEGMENT_CACHE_ENABLED = env.bool("SEGMENT_CACHE_ENABLED", default=False)
+    SEGMENT_CACHE_DIR = env("SEGMENT_CACHE_DIR", default="/dev/shm/lexicon-segments")
+    SEGMENT_CACHE_SIZE = env.int("SEGMENT_CACHE_SIZE", default=1024 * 1024 * 256)  # 256 MB
+    SEGMENT_CACHE_WINDOW_SIZE = env.int("SEGMENT_CACHE_WINDOW_SIZE", default=1024 * 1024)  # 1 MB
+    SEGMENT_CACHE_LEADING_SIZE = env.int("SEGMENT_CACHE_LEADING_SIZE", default=1024 * 1024 * 4)
+    # Range requests by any worker of the node starting in a window, or in the leading windows,
+    # before it is cached. Counts restart after the TTL passes without a request.
+    SEGMENT_CACHE_MIN_REQUESTS = env.int("SEGMENT_CACHE_MIN_REQUESTS", default=2)
+    SEGMENT_CACHE_POPULARITY_TTL = env.int("SEGMENT_CACHE_POPULARITY_TTL_SECS", default=10 * 60)
+    # Playback telemetry: every worker process writes its statistics to a file of its own in
+    # the directory every flush interval, and `/api/v1/metrics/playback/` sums them up
+    PLAYBACK_TELEMETRY_ENABLED = env.bool("PLAYBACK_TELEMETRY_ENABLED", default=True)
+    PLAYBACK_TELEMETRY_DIR = env(
+        "PLAYBACK_TELEMETRY_DIR", default=os.path.join(tempfile.gettempdir(), "lexicon-telemetry")
+    )
+    PLAYBACK_TELEMETRY_FLUSH_INTERVAL = env.int(
+        "PLAYBACK_TELEMETRY_FLUSH_INTERVAL_SECS", default=10
+    )
+    # Videos with per-video statistics, per process
+    PLAYBACK_TELEMETRY_MAX_VIDEOS = env.int("PLAYBACK_TELEMETRY_MAX_VIDEOS", default=256)
+
     # --------------------- General settings----------------------------------
     API_ROOT_URL = env("API_ROOT_URL", default="http://127.0.0.1:8000")
 
@@ -267,9 +363,20 @@ class BaseConfiguration(Configuration):
     CELERY_TASK_SERIALIZER = "json"
     CELERY_RESULT_SERIALIZER = "json"
     CELERY_TIMEZONE = "UTC"
-    CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", default=None)
+    # Chords (used to fan out subtitle extraction) need a result backend
+    CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", default=CELERY_BROKER_URL)
     CELERY_TASK_IGNORE_RESULT = env.bool("CELERY_TASK_IGNORE_RESULT", default=True)
     CELERY_RESULT_EXPIRES = env.int("CELERY_RESULT_EXPIRES_SECS", default=60 * 60)  # 1hour
+    # Long-running ffmpeg jobs go to a dedicated queue served by its own worker pool, e.g.
+    # `celery -A lexicon worker -Q extraction -c $CELERY_EXTRACTION_CONCURRENCY`
+    CELERY_EXTRACTION_QUEUE = env("CELERY_EXTRACTION_QUEUE", default="extraction")
+    CELERY_EXTRACTION_CONCURRENCY = env.int("CELERY_EXTRACTION_CONCURRENCY", default=2)
+    CELERY_TASK_ROUTES = {
+        "lexicon.video.extraction.extract_subtitle_streams": {"queue": CELERY_EXTRACTION_QUEUE},
+        "lexicon.video.async_extraction.process_video_batch": {"queue": CELERY_EXTRACTION_QUEUE},
+        "lexicon.video.remux.remux_video": {"queue": CELERY_EXTRACTION_QUEUE},
+        "lexicon.video.packaging.package_video_for_streaming": {"queue": CELERY_EXTRACTION_QUEUE},
+    }
 
     # ---------------- Logging settings -----------------------------------
     LOGS_DIR = env("LOGS_DIR", default=BASE_ROOT_DIR)
@@ -13,5 +13,11 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "lexicon.conf.settings")
 os.environ.setdefault("DJANGO_CONFIGURATION", "Development")
 
 from configurations.wsgi import get_wsgi_application  # noqa: E402
+from django.conf import settings  # noqa: E402
 
 application = get_wsgi_application()
+
+if settings.PLAYBACK_OFFLOAD_EMULATE:
+    from lexicon.middleware.offload import OffloadEmulatorMiddleware
+
+    application = OffloadEmulatorMiddleware(application)
@@ -0,0 +1,130 @@
+import datetime
+import io
+from itertools import islice
+from typing import Iterable, Iterator, Sequence, Type
+
+from django.db import DEFAULT_DB_ALIAS, connections, models
+
+__all__ = [
+    "analyze_model",
+    "copy_rows",
+]
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _format_copy_value(value) -> str:
+    """
+    Render a Python value as a field of PostgreSQL's COPY text format.
+    """
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class CopyRowStream(io.TextIOBase):
+    """
+    Read-only text stream that renders rows lazily in COPY text format.
+
+    psycopg2's `copy_expert` pulls fixed-size chunks from this stream, so only a chunk's
+    worth of rows is ever materialized regardless of how many rows the iterable yields.
+    """
+
+    def __init__(self, rows: Iterable[Sequence]):
+        self._rows = iter(rows)
+        self._buffer = ""
+        self.row_count = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size is None or size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buffer += "\t".join(_format_copy_value(value) for value in row) + "\n"
+            self.row_count += 1
+
+        if size is None or size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def _batched(rows: Iterable[Sequence], batch_size: int) -> Iterator[list]:
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def copy_rows(
+    model: Type[models.Model],
+    fields: Sequence[str],
+    rows: Iterable[Sequence],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    using: str = DEFAULT_DB_ALIAS,
+) -> int:
+    """
+    Bulk-load rows into a model's table without building model instances.
+
+    On PostgreSQL the rows are streamed through `COPY ... FROM STDIN`. Other backends fall
+    back to `bulk_create` in batches of `batch_size`. Model `save()` logic and field defaults
+    are bypassed on the COPY path, so every required column must be present in `fields`.
+
+    Args:
+        model (Type[models.Model]): Model whose table receives the rows.
+        fields (Sequence[str]): Concrete field attribute names (e.g. 'video_id'), in row order.
+        rows (Iterable[Sequence]): Row tuples; consumed lazily.
+        batch_size (int): Batch size of the `bulk_create` fallback.
+        using (str): Database alias.
+
+    Returns:
+        int: Number of rows loaded.
+    """
+    connection = connections[using]
+
+    if connection.vendor != "postgresql":
+        loaded = 0
+        for batch in _batched(rows, batch_size):
+            model.objects.using(using).bulk_create(
+                [model(**dict(zip(fields, row))) for row in batch]
+            )
+            loaded += len(batch)
+        return loaded
+
+    opts = model._meta
+    quote_name = connection.ops.quote_name
+    columns = ", ".join(quote_name(opts.get_field(name).column) for name in fields)
+    stream = CopyRowStream(rows)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {quote_name(opts.db_table)} ({columns}) FROM STDIN", stream, size=64 * 1024
+        )
+    return stream.row_count
+
+
+def analyze_model(model: Type[models.Model], using: str = DEFAULT_DB_ALIAS):
+    """
+    Refresh planner statistics of a model's table after a large load. No-op on backends
+    other than PostgreSQL.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
@@ -0,0 +1,96 @@
+import os
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+
+from lexicon.video.http import OFFLOAD_HEADERS, RangedFileReader, parse_range_header
+
+STRIPPED_HEADERS = {"content-length"} | {header.lower() for header in OFFLOAD_HEADERS.values()}
+
+
+class OffloadEmulatorMiddleware:
+    """
+    WSGI middleware standing in for the fronting web server during development, so the
+    playback offload mode (`PLAYBACK_OFFLOAD`) can be used without nginx or Apache.
+
+    Like nginx, it replaces a response carrying `X-Accel-Redirect` or `X-Sendfile` with the
+    referenced file, keeping the response's other headers, and serves single byte ranges of
+    it. Enable it with `PLAYBACK_OFFLOAD_EMULATE`; never in production, where the web server
+    does this.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        offloaded = []
+
+        def capture_start_response(status, headers, exc_info=None):
+            file_path = self.resolve(headers)
+            if file_path is None:
+                return start_response(status, headers, exc_info)
+            offloaded.append((file_path, headers))
+            return lambda data: None
+
+        result = self.application(environ, capture_start_response)
+        if not offloaded:
+            return result
+        if hasattr(result, "close"):
+            result.close()
+        file_path, headers = offloaded[0]
+        return self.serve(environ, start_response, file_path, headers)
+
+    @staticmethod
+    def resolve(headers):
+        """
+        Returns the path of the file an offloading response refers to, or None.
+        """
+        values = {name.lower(): value for name, value in headers}
+        location = values.get("x-accel-redirect")
+        if location is not None:
+            prefix = settings.PLAYBACK_OFFLOAD_PREFIX.rstrip("/") + "/"
+            if not location.startswith(prefix):
+                return ""
+            try:
+                return safe_join(settings.MEDIA_ROOT, unquote(location[len(prefix) :]))
+            except SuspiciousFileOperation:
+                return ""
+        return values.get("x-sendfile")
+
+    def serve(self, environ, start_response, file_path, headers):
+        if not os.path.isfile(file_path):
+            start_response("404 Not Found", [("Content-Type", "text/plain")])
+            return [b"Not Found"]
+
+        headers = [(name, value) for name, value in headers if name.lower() not in STRIPPED_HEADERS]
+        headers.append(("Accept-Ranges", "bytes"))
+        file = open(file_path, "rb")
+        file_size = os.fstat(file.fileno()).st_size
+
+        status, start, length = "200 OK", 0, file_size
+        ranges = parse_range_header(environ.get("HTTP_RANGE", ""), file_size)
+        if ranges == []:
+            file.close()
+            start_response(
+                "416 Requested Range Not Satisfiable",
+                [("Content-Range", f"bytes */{file_size}"), ("Content-Length", "0")],
+            )
+            return [b""]
+        # Multiple ranges are answered with the whole file, which RFC 7233 allows
+        if ranges and len(ranges) == 1:
+            (start, end), status = ranges[0], "206 Partial Content"
+            length = end - start + 1
+            headers.append(("Content-Range", f"bytes {start}-{end}/{file_size}"))
+
+        headers.append(("Content-Length", str(length)))
+        start_response(status, headers)
+        if environ.get("REQUEST_METHOD") == "HEAD":
+            file.close()
+            return [b""]
+        reader = RangedFileReader(file, start, length)
+        file_wrapper = environ.get("wsgi.file_wrapper")
+        if file_wrapper is not None:
+            return file_wrapper(reader)
+        return iter(lambda: reader.read(64 * 1024), b"")
@@ -0,0 +1,71 @@
+# Generated by Django 4.0.5 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lexicon", "0004_subtitle_end_time_subtitle_start_time_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="subtitle",
+            name="start_ms",
+            field=models.PositiveIntegerField(
+                null=True, help_text="Cue start in milliseconds", verbose_name="Start time"
+            ),
+        ),
+        migrations.AddField(
+            model_name="subtitle",
+            name="end_ms",
+            field=models.PositiveIntegerField(
+                null=True, help_text="Cue end in milliseconds", verbose_name="End time"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="subtitle",
+            name="start_time",
+            field=models.TimeField(db_index=True, null=True, verbose_name="Start time"),
+        ),
+        migrations.AlterField(
+            model_name="subtitle",
+            name="end_time",
+            field=models.TimeField(db_index=True, null=True, verbose_name="End time"),
+        ),
+        migrations.RunSQL(
+            sql=(
+                "UPDATE lexicon_subtitle SET "
+                "start_ms = ROUND(EXTRACT(EPOCH FROM start_time) * 1000), "
+                "end_ms = ROUND(EXTRACT(EPOCH FROM end_time) * 1000)"
+            ),
+            reverse_sql=(
+                "UPDATE lexicon_subtitle SET "
+                "start_time = TIME '00:00' + start_ms * INTERVAL '1 millisecond', "
+                "end_time = TIME '00:00' + end_ms * INTERVAL '1 millisecond'"
+            ),
+        ),
+        migrations.RemoveField(
+            model_name="subtitle",
+            name="start_time",
+        ),
+        migrations.RemoveField(
+            model_name="subtitle",
+            name="end_time",
+        ),
+        migrations.AlterField(
+            model_name="subtitle",
+            name="start_ms",
+            field=models.PositiveIntegerField(
+                db_index=True, help_text="Cue start in milliseconds", verbose_name="Start time"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="subtitle",
+            name="end_ms",
+            field=models.PositiveIntegerField(
+                db_index=True, help_text="Cue end in milliseconds", verbose_name="End time"
+            ),
+        ),
+    ]
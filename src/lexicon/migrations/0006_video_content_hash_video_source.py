@@ -0,0 +1,40 @@
+# Generated by Django 4.0.5 on 2026-10-17 10:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lexicon", "0005_subtitle_start_ms_end_ms"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="video",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                help_text="SHA-256 digest of the uploaded file, used to detect duplicate uploads",
+                max_length=64,
+                verbose_name="content hash",
+            ),
+        ),
+        migrations.AddField(
+            model_name="video",
+            name="source",
+            field=models.ForeignKey(
+                blank=True,
+                default=None,
+                help_text="Earlier upload of the same file whose stored file and subtitles are reused",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="duplicates",
+                to="lexicon.video",
+                verbose_name="source video",
+            ),
+        ),
+    ]
@@ -0,0 +1,198 @@
+# Generated by Django 4.0.5 on 2026-10-17 11:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lexicon", "0006_video_content_hash_video_source"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VideoProcessingRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, db_index=True, verbose_name="created at"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, db_index=True, verbose_name="last updated at"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("probing", "Probing"),
+                            ("extracting", "Extracting"),
+                            ("parsing", "Parsing"),
+                            ("saving", "Saving"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        db_index=True,
+                        default="queued",
+                        max_length=20,
+                        verbose_name="status",
+                    ),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="started at"),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="finished at"),
+                ),
+                ("error", models.TextField(blank=True, default="", verbose_name="error")),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        default=None,
+                        editable=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_created",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="created by",
+                    ),
+                ),
+                (
+                    "updated_by",
+                    models.ForeignKey(
+                        blank=True,
+                        default=None,
+                        editable=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_updated",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="last updated by",
+                    ),
+                ),
+                (
+                    "video",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="processing_runs",
+                        to="lexicon.video",
+                        verbose_name="video",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "video processing run",
+                "verbose_name_plural": "video processing runs",
+                "db_table": "lexicon_video_processing_run",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="VideoProcessingStage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, db_index=True, verbose_name="created at"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, db_index=True, verbose_name="last updated at"
+                    ),
+                ),
+                (
+                    "stage",
+                    models.CharField(
+                        choices=[
+                            ("probe", "Probe"),
+                            ("extract", "Extract"),
+                            ("parse", "Parse"),
+                            ("insert", "Insert"),
+                        ],
+                        db_index=True,
+                        max_length=20,
+                        verbose_name="stage",
+                    ),
+                ),
+                (
+                    "language",
+                    models.CharField(
+                        blank=True, default="", max_length=50, verbose_name="language"
+                    ),
+                ),
+                (
+                    "duration_ms",
+                    models.PositiveIntegerField(db_index=True, verbose_name="duration (ms)"),
+                ),
+                (
+                    "row_count",
+                    models.PositiveIntegerField(blank=True, null=True, verbose_name="row count"),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        default=None,
+                        editable=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_created",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="created by",
+                    ),
+                ),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stages",
+                        to="lexicon.videoprocessingrun",
+                        verbose_name="processing run",
+                    ),
+                ),
+                (
+                    "updated_by",
+                    models.ForeignKey(
+                        blank=True,
+                        default=None,
+                        editable=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_updated",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="last updated by",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "video processing stage",
+                "verbose_name_plural": "video processing stages",
+                "db_table": "lexicon_video_processing_stage",
+                "ordering": ["created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,158 @@
+# Generated by Django 4.0.5 on 2026-10-17 14:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lexicon", "0008_video_upload_session_upload_chunk"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VideoRemux",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, db_index=True, verbose_name="created at"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, db_index=True, verbose_name="last updated at"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("completed", "Completed"),
+                            ("skipped", "Skipped"),
+                            ("failed", "Failed"),
+                        ],
+                        db_index=True,
+                        default="pending",
+                        max_length=20,
+                        verbose_name="status",
+                    ),
+                ),
+                (
+                    "container",
+                    models.CharField(
+                        blank=True, default="", max_length=20, verbose_name="container"
+                    ),
+                ),
+                (
+                    "size_before",
+                    models.PositiveBigIntegerField(
+                        blank=True, null=True, verbose_name="size before"
+                    ),
+                ),
+                (
+                    "size_after",
+                    models.PositiveBigIntegerField(
+                        blank=True, null=True, verbose_name="size after"
+                    ),
+                ),
+                (
+                    "index_offset_before",
+                    models.PositiveBigIntegerField(
+                        blank=True,
+                        help_text="Byte offset of the seek index, empty if the file had none",
+                        null=True,
+                        verbose_name="index offset before",
+                    ),
+                ),
+                (
+                    "index_offset_after",
+                    models.PositiveBigIntegerField(
+                        blank=True, null=True, verbose_name="index offset after"
+                    ),
+                ),
+                (
+                    "first_frame_ms_before",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="time to first frame before (ms)"
+                    ),
+                ),
+                (
+                    "first_frame_ms_after",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="time to first frame after (ms)"
+                    ),
+                ),
+                (
+                    "seek_ms_before",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="seek latency before (ms)"
+                    ),
+                ),
+                (
+                    "seek_ms_after",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="seek latency after (ms)"
+                    ),
+                ),
+                (
+                    "duration_ms",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="duration (ms)"
+                    ),
+                ),
+                ("error", models.TextField(blank=True, default="", verbose_name="error")),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        default=None,
+                        editable=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_created",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="created by",
+                    ),
+                ),
+                (
+                    "updated_by",
+                    models.ForeignKey(
+                        blank=True,
+                        default=None,
+                        editable=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_updated",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="last updated by",
+                    ),
+                ),
+                (
+                    "video",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="remuxes",
+                        to="lexicon.video",
+                        verbose_name="video",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "video remux",
+                "verbose_name_plural": "video remuxes",
+                "db_table": "lexicon_video_remux",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.0.5 on 2026-10-17 15:30
+
+import os
+
+from django.db import migrations, models
+
+
+def backfill_file_keys(apps, schema_editor):
+    Video = apps.get_model("lexicon", "Video")
+    seen = set()
+    videos = Video.objects.filter(source__isnull=True).exclude(video_file="").order_by("id")
+    for video_id, name in videos.values_list("id", "video_file").iterator():
+        file_key = os.path.basename(name)
+        # Files are stored in a single directory, so names are unique; keep the oldest video
+        # should legacy rows still collide
+        if file_key in seen:
+            continue
+        seen.add(file_key)
+        Video.objects.filter(id=video_id).update(file_key=file_key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lexicon", "0010_video_package"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="video",
+            name="file_key",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text=(
+                    "Name of the stored file, used to look the video up in playback and subtitle "
+                    "URLs. Empty for duplicate uploads, which share the file of their source video"
+                ),
+                max_length=255,
+                null=True,
+                unique=True,
+                verbose_name="file key",
+            ),
+        ),
+        migrations.RunPython(backfill_file_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,118 @@
+# Generated by Django 4.0.5 on 2026-10-17 16:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lexicon", "0011_video_file_key"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SubtitleTrack",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, db_index=True, verbose_name="created at"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, db_index=True, verbose_name="last updated at"
+                    ),
+                ),
+                ("language", models.CharField(max_length=50, verbose_name="language")),
+                ("cue_count", models.PositiveIntegerField(verbose_name="cue count")),
+                (
+                    "size",
+                    models.PositiveIntegerField(
+                        help_text="Size of the uncompressed WebVTT file in bytes",
+                        verbose_name="size",
+                    ),
+                ),
+                (
+                    "version",
+                    models.CharField(
+                        help_text="Digest of the WebVTT content",
+                        max_length=64,
+                        verbose_name="version",
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        default=None,
+                        editable=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_created",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="created by",
+                    ),
+                ),
+                (
+                    "updated_by",
+                    models.ForeignKey(
+                        blank=True,
+                        default=None,
+                        editable=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="%(class)s_updated",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="last updated by",
+                    ),
+                ),
+                (
+                    "video",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="subtitle_tracks",
+                        to="lexicon.video",
+                        verbose_name="video",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "subtitle track",
+                "verbose_name_plural": "subtitle tracks",
+                "db_table": "lexicon_subtitle_track",
+                "ordering": ["language"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="subtitletrack",
+            constraint=models.UniqueConstraint(
+                fields=("video", "language"), name="lexicon_subtitle_track_video_language"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="videoprocessingstage",
+            name="stage",
+            field=models.CharField(
+                choices=[
+                    ("probe", "Probe"),
+                    ("extract", "Extract"),
+                    ("parse", "Parse"),
+                    ("insert", "Insert"),
+                    ("render", "Render"),
+                ],
+                db_index=True,
+                max_length=20,
+                verbose_name="stage",
+            ),
+        ),
+    ]
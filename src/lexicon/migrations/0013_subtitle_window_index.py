@@ -0,0 +1,19 @@
+# Generated by Django 4.0.5 on 2026-10-17 16:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lexicon", "0012_subtitle_track"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="subtitle",
+            index=models.Index(
+                fields=["video", "language", "start_ms", "id"], name="lexicon_subtitle_window_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.0.5 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lexicon", "0013_subtitle_window_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="uploadsession",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("active", "Active"),
+                    ("completing", "Completing"),
+                    ("completed", "Completed"),
+                    ("failed", "Failed"),
+                ],
+                db_index=True,
+                default="active",
+                max_length=20,
+                verbose_name="status",
+            ),
+        ),
+    ]
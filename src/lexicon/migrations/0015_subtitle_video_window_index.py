@@ -0,0 +1,19 @@
+# Generated by Django 4.0.5 on 2026-10-17 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lexicon", "0014_upload_session_completing"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="subtitle",
+            index=models.Index(
+                fields=["video", "start_ms", "id"], name="lexicon_subtitle_time_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+from wsgiref.util import FileWrapper, setup_testing_defaults
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import TestCase, override_settings
+
+from lexicon.middleware.offload import OffloadEmulatorMiddleware
+from lexicon.video.http import OFFLOAD_HEADERS
+from lexicon.video.models import Video
+
+DATA = os.urandom(100_000)
+
+
+def call_wsgi(application, path, **environ):
+    """
+    Run a request through a WSGI application.
+
+    Returns:
+        Tuple[str, Dict[str, str], bytes]: The status, headers and body of the response.
+    """
+    environ.setdefault("HTTP_HOST", "testserver")
+    environ.setdefault("wsgi.file_wrapper", FileWrapper)
+    setup_testing_defaults(environ)
+    environ["PATH_INFO"] = path
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = status
+        response["headers"] = dict(headers)
+
+    result = application(environ, start_response)
+    try:
+        body = b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return response["status"], response["headers"], body
+
+
+class OffloadEmulatorMiddlewareTests(TestCase):
+    """
+    Playback responses of the WSGI app in both `PLAYBACK_OFFLOAD` modes, served by the
+    emulated web server.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        cls.addClassCleanup(media_settings.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        video = Video.objects.create(
+            title="Clip", description="", video_file=SimpleUploadedFile("clip.mp4", DATA)
+        )
+        cls.url = f"/api/v1/video/playback/{video.file_key}/"
+        cls.application = OffloadEmulatorMiddleware(WSGIHandler())
+
+    def setUp(self):
+        # Throttle counts and cached file lookups
+        cache.clear()
+
+    def request(self, **environ):
+        return call_wsgi(self.application, self.url, **environ)
+
+    def test_full_response(self):
+        for mode in OFFLOAD_HEADERS:
+            with self.subTest(mode=mode), self.settings(PLAYBACK_OFFLOAD=mode):
+                status, headers, body = self.request()
+                self.assertEqual(status, "200 OK")
+                self.assertEqual(headers["Content-Length"], str(len(DATA)))
+                self.assertEqual(headers["Accept-Ranges"], "bytes")
+                self.assertIn("Content-Disposition", headers)
+                self.assertNotIn(OFFLOAD_HEADERS[mode], headers)
+                self.assertEqual(body, DATA)
+
+    def test_single_range(self):
+        for mode in OFFLOAD_HEADERS:
+            with self.subTest(mode=mode), self.settings(PLAYBACK_OFFLOAD=mode):
+                status, headers, body = self.request(HTTP_RANGE="bytes=10-99")
+                self.assertEqual(status, "206 Partial Content")
+                self.assertEqual(headers["Content-Range"], f"bytes 10-99/{len(DATA)}")
+                self.assertEqual(headers["Content-Length"], "90")
+                self.assertEqual(body, DATA[10:100])
+
+    def test_unsatisfiable_range(self):
+        for mode in OFFLOAD_HEADERS:
+            with self.subTest(mode=mode), self.settings(PLAYBACK_OFFLOAD=mode):
+                status, headers, body = self.request(HTTP_RANGE=f"bytes={len(DATA)}-")
+                self.assertEqual(status, "416 Requested Range Not Satisfiable")
+                self.assertEqual(headers["Content-Range"], f"bytes */{len(DATA)}")
+                self.assertEqual(body, b"")
+
+    def test_head(self):
+        for mode in OFFLOAD_HEADERS:
+            with self.subTest(mode=mode), self.settings(PLAYBACK_OFFLOAD=mode):
+                status, headers, body = self.request(REQUEST_METHOD="HEAD")
+                self.assertEqual(status, "200 OK")
+                self.assertEqual(headers["Content-Length"], str(len(DATA)))
+                self.assertEqual(body, b"")
+
+    def test_rejected_accel_prefix(self):
+        def application(environ, start_response):
+            start_response("200 OK", [("X-Accel-Redirect", environ["PATH_INFO"])])
+            return [b""]
+
+        emulator = OffloadEmulatorMiddleware(application)
+        with self.settings(PLAYBACK_OFFLOAD_PREFIX="/protected-media/"):
+            for location in ["/media/videos/clip.mp4", "/protected-media/../../etc/passwd"]:
+                with self.subTest(location=location):
+                    status, headers, body = call_wsgi(emulator, location)
+                    self.assertEqual(status, "404 Not Found")
+                    self.assertNotIn("X-Accel-Redirect", headers)
+                    self.assertNotEqual(body, DATA)
@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+
+class LRUCache:
+    """
+    A small thread-safe in-process cache that evicts the least recently used entry once it
+    holds `maxsize` entries, and drops entries older than `ttl` seconds.
+
+    Each process has its own copy, so entries can only be invalidated in the process that
+    changed them; the TTL bounds how long other processes may serve stale entries.
+
+    `on_evict` is called with the key and value of every entry evicted to make room.
+    """
+
+    _missing = object()
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: Optional[float] = None,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value, expires = self._entries.get(key, (self._missing, None))
+            if value is self._missing or (expires is not None and expires <= time.monotonic()):
+                if value is not self._missing:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        evicted = []
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                evicted.append(self._entries.popitem(last=False))
+        if self.on_evict is not None:
+            for evicted_key, (evicted_value, _expires) in evicted:
+                self.on_evict(evicted_key, evicted_value)
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """
+        Returns the unexpired entries, least recently used first, without touching them.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, value)
+                for key, (value, expires) in self._entries.items()
+                if expires is None or expires > now
+            ]
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
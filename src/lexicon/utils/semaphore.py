@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "LeaseSemaphore",
+    "SemaphoreTimeout",
+]
+
+# Drops expired leases, then takes a slot if one is free. Runs atomically on the Redis server.
+ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    return 1
+end
+return 0
+"""
+
+
+class SemaphoreTimeout(Exception):
+    """
+    Raised when a semaphore slot could not be acquired in time.
+    """
+
+
+def _redis_connection():
+    """
+    Return a Redis client for the default cache, or None when the cache is not Redis backed.
+    """
+    backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    if not backend.startswith("django_redis."):
+        return None
+
+    from django_redis import get_redis_connection
+
+    return get_redis_connection("default")
+
+
+class _LocalLeases:
+    """
+    Process-local stand-in for the Redis sorted set, used when Redis is not configured.
+    """
+
+    lock = threading.Lock()
+    leases: Dict[str, Dict[str, float]] = {}
+
+    @classmethod
+    def acquire(cls, key, limit, token, expires_at):
+        with cls.lock:
+            leases = cls.leases.setdefault(key, {})
+            now = time.time()
+            for expired in [name for name, expiry in leases.items() if expiry <= now]:
+                del leases[expired]
+            if len(leases) >= limit:
+                return False
+            leases[token] = expires_at
+            return True
+
+    @classmethod
+    def renew(cls, key, token, expires_at):
+        with cls.lock:
+            leases = cls.leases.get(key, {})
+            if leases.get(token, 0) > time.time():
+                leases[token] = expires_at
+
+    @classmethod
+    def release(cls, key, token):
+        with cls.lock:
+            leases = cls.leases.get(key, {})
+            leases.pop(token, None)
+            if not leases:
+                # Keys are per client for throttles, so don't keep them around
+                cls.leases.pop(key, None)
+
+
+class _LeaseRenewer:
+    """
+    Daemon thread renewing the leases registered with `LeaseSemaphore.keep_alive` every
+    third of their lease time until they are released, so long-held leases don't expire
+    while their holder is alive. Started lazily, once per process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.leases = {}
+        self.wakeup = threading.Event()
+        self.pid = None
+
+    def add(self, semaphore, token: str):
+        with self.lock:
+            renew_at = time.monotonic() + semaphore.lease_seconds / 3
+            self.leases[(semaphore.key, token)] = (semaphore, renew_at)
+            if self.pid != os.getpid():
+                # Not started yet, or this is a forked child without the parent's thread
+                self.pid = os.getpid()
+                threading.Thread(target=self._run, name="lease-renewer", daemon=True).start()
+        self.wakeup.set()
+
+    def discard(self, key: str, token: str):
+        with self.lock:
+            self.leases.pop((key, token), None)
+
+    def _run(self):
+        while True:
+            self.wakeup.clear()
+            with self.lock:
+                now = time.monotonic()
+                due = [
+                    (token, semaphore)
+                    for (_key, token), (semaphore, renew_at) in self.leases.items()
+                    if renew_at <= now
+                ]
+                for token, semaphore in due:
+                    self.leases[(semaphore.key, token)] = (
+                        semaphore,
+                        now + semaphore.lease_seconds / 3,
+                    )
+                next_at = min((renew_at for _s, renew_at in self.leases.values()), default=None)
+
+            for token, semaphore in due:
+                try:
+                    semaphore.renew(token)
+                except Exception as e:
+                    logger.warning(f"Could not renew a '{semaphore.name}' lease: {e}")
+            self.wakeup.wait(None if next_at is None else max(next_at - time.monotonic(), 0))
+
+
+_renewer = _LeaseRenewer()
+
+
+class LeaseSemaphore:
+    """
+    Counting semaphore shared by every process that uses the same Redis server.
+
+    Each holder owns a lease that expires after `lease_seconds`, so slots held by a worker
+    that crashed or was killed are reclaimed automatically instead of leaking forever.
+    Leases live in a Redis sorted set scored by expiry time. With `per_host` the set is
+    keyed by host name, which caps usage of a machine's resources regardless of how many
+    worker processes run on it.
+
+    Falls back to a process-local semaphore when the default cache is not Redis backed.
+
+    Usage:
+        semaphore = LeaseSemaphore("ffmpeg", limit=2, lease_seconds=3600)
+        with semaphore.hold(timeout=60):
+            ...
+    """
+
+    poll_interval = 0.5
+
+    def __init__(self, name: str, limit: int, lease_seconds: int, per_host: bool = True):
+        self.name = name
+        self.limit = limit
+        self.lease_seconds = lease_seconds
+        scope = socket.gethostname() if per_host else "global"
+        self.key = f"lexicon:semaphore:{name}:{scope}"
+
+    def try_acquire(self) -> Optional[str]:
+        """
+        Take a slot without waiting.
+
+        Returns:
+            Optional[str]: Lease token to release the slot with, or None if no slot is free.
+        """
+        token = uuid.uuid4().hex
+        now = time.time()
+        expires_at = now + self.lease_seconds
+        redis = _redis_connection()
+        if redis is None:
+            acquired = _LocalLeases.acquire(self.key, self.limit, token, expires_at)
+        else:
+            acquired = redis.eval(
+                ACQUIRE_SCRIPT,
+                1,
+                self.key,
+                now,
+                self.limit,
+                expires_at,
+                token,
+                self.lease_seconds,
+            )
+        return token if acquired else None
+
+    def acquire(self, timeout: Optional[float] = None) -> str:
+        """
+        Take a slot, waiting up to `timeout` seconds (forever when None) for one to free up.
+
+        Returns:
+            str: Lease token to release the slot with.
+
+        Raises:
+            SemaphoreTimeout: If no slot became free in time.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            token = self.try_acquire()
+            if token is not None:
+                return token
+            if deadline is not None and time.monotonic() >= deadline:
+                raise SemaphoreTimeout(
+                    f"No '{self.name}' slot became free within {timeout} seconds "
+                    f"(limit {self.limit})."
+                )
+            time.sleep(self.poll_interval)
+
+    async def aacquire(self, timeout: Optional[float] = None) -> str:
+        """
+        Coroutine version of `acquire`. Polls for a slot with `asyncio.sleep`, so waiting
+        doesn't tie up a thread of the event loop's executor.
+
+        Returns:
+            str: Lease token to release the slot with.
+
+        Raises:
+            SemaphoreTimeout: If no slot became free in time.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            token = self.try_acquire()
+            if token is not None:
+                return token
+            if deadline is not None and time.monotonic() >= deadline:
+                raise SemaphoreTimeout(
+                    f"No '{self.name}' slot became free within {timeout} seconds "
+                    f"(limit {self.limit})."
+                )
+            await asyncio.sleep(self.poll_interval)
+
+    def renew(self, token: str):
+        """
+        Extend a lease by `lease_seconds` from now. Expired or released leases stay gone.
+        """
+        expires_at = time.time() + self.lease_seconds
+        redis = _redis_connection()
+        if redis is None:
+            _LocalLeases.renew(self.key, token, expires_at)
+        else:
+            redis.zadd(self.key, {token: expires_at}, xx=True)
+            redis.expire(self.key, self.lease_seconds)
+
+    def keep_alive(self, token: str):
+        """
+        Renew a lease in the background until it is released, for holders that can't
+        renew it themselves, e.g. while a response streams. `lease_seconds` then only
+        bounds how long the slot outlives a crashed process.
+        """
+        _renewer.add(self, token)
+
+    def release(self, token: str):
+        """
+        Give a slot back. Releasing an expired or unknown lease is a no-op.
+        """
+        _renewer.discard(self.key, token)
+        redis = _redis_connection()
+        if redis is None:
+            _LocalLeases.release(self.key, token)
+        else:
+            redis.zrem(self.key, token)
+
+    @contextmanager
+    def hold(self, timeout: Optional[float] = None):
+        """
+        Context manager that holds a slot for the duration of the block.
+        """
+        token = self.acquire(timeout)
+        try:
+            yield token
+        finally:
+            self.release(token)
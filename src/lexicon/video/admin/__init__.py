@@ -1,6 +1,16 @@
 from django.contrib import admin
 
-from lexicon.video.models import Subtitle, Video
+from lexicon.video.models import (
+    Subtitle,
+    SubtitleTrack,
+    UploadChunk,
+    UploadSession,
+    Video,
+    VideoPackage,
+    VideoProcessingRun,
+    VideoProcessingStage,
+    VideoRemux,
+)
 
 DEFAULT_READONLY_FIELDS = (
     "created_by",
@@ -34,3 +44,108 @@ class SubtitleAdmin(BaseDefaultModelAdmin):
         "created_at",
     )
     list_display_links = ["video"]
+
+
+@admin.register(SubtitleTrack)
+class SubtitleTrackAdmin(BaseDefaultModelAdmin):
+    list_display = (
+        "id",
+        "video",
+        "language",
+        "cue_count",
+        "size",
+        "version",
+    )
+    list_display_links = ["video"]
+    list_filter = ("language",)
+
+
+class VideoProcessingStageInline(admin.TabularInline):
+    model = VideoProcessingStage
+    fields = ("stage", "language", "duration_ms", "row_count", "created_at")
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
+@admin.register(VideoProcessingRun)
+class VideoProcessingRunAdmin(BaseDefaultModelAdmin):
+    list_display = (
+        "id",
+        "video",
+        "status",
+        "started_at",
+        "finished_at",
+    )
+    list_display_links = ["video"]
+    list_filter = ("status",)
+    inlines = [VideoProcessingStageInline]
+
+
+@admin.register(VideoProcessingStage)
+class VideoProcessingStageAdmin(BaseDefaultModelAdmin):
+    list_display = (
+        "id",
+        "run",
+        "stage",
+        "language",
+        "duration_ms",
+        "row_count",
+    )
+    list_display_links = ["run"]
+    list_filter = ("stage",)
+    ordering = ("-duration_ms",)
+
+
+class UploadChunkInline(admin.TabularInline):
+    model = UploadChunk
+    fields = ("index", "size", "created_at", "updated_at")
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(BaseDefaultModelAdmin):
+    list_display = (
+        "id",
+        "title",
+        "status",
+        "total_size",
+        "expires_at",
+        "created_at",
+    )
+    list_display_links = ["title"]
+    list_filter = ("status",)
+    inlines = [UploadChunkInline]
+
+
+@admin.register(VideoRemux)
+class VideoRemuxAdmin(BaseDefaultModelAdmin):
+    list_display = (
+        "id",
+        "video",
+        "status",
+        "container",
+        "first_frame_ms_before",
+        "first_frame_ms_after",
+        "seek_ms_before",
+        "seek_ms_after",
+        "duration_ms",
+    )
+    list_display_links = ["video"]
+    list_filter = ("status", "container")
+
+
+@admin.register(VideoPackage)
+class VideoPackageAdmin(BaseDefaultModelAdmin):
+    list_display = (
+        "id",
+        "video",
+        "status",
+        "segment_seconds",
+        "size",
+        "duration_ms",
+    )
+    list_display_links = ["video"]
+    list_filter = ("status",)
@@ -5,3 +5,6 @@ class Video(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "lexicon.video"
     label = "lexicon_video"
+
+    def ready(self):
+        from lexicon.video import signals  # noqa: F401
@@ -0,0 +1,277 @@
+import asyncio
+import io
+import json
+import os
+from typing import Optional, Tuple
+
+import aiofiles
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django.urls import Resolver404, resolve
+
+from .files import forget_video_file, get_video_file
+from .http import CONDITIONAL_STATUSES, FilePlan, file_etag, plan_file_response
+from .telemetry import StreamMeter
+from .views.playback import VideoPlaybackView
+
+PLAYBACK_VIEW_NAME = "lexicon_video:video-playback"
+
+# Bytes read and sent per `send()`. ASGI servers make `send()` wait while their write buffer
+# is above its high-water mark (64 KB for uvicorn), so a stream to a slow client holds about
+# one block in memory instead of reading ahead of the client.
+ASYNC_PLAYBACK_BLOCK_SIZE = 64 * 1024
+
+
+async def send_file(
+    scope,
+    receive,
+    send,
+    file_path: str,
+    content_type: str,
+    filename: str = "",
+    cached_stat: Optional[Tuple[int, int]] = None,
+    meter: Optional[StreamMeter] = None,
+) -> FilePlan:
+    """
+    Asynchronous counterpart of `serve_file`: answers an ASGI HTTP request for a file with
+    the same conditional request and byte range handling, reading the file with `aiofiles`.
+
+    The body is sent one block at a time and the next block is only read once the server
+    accepted the previous one, so a stream progresses at the pace of its client and costs a
+    coroutine instead of a thread. Streaming stops as soon as the client disconnects.
+
+    Args:
+        scope (dict): ASGI connection scope of the request.
+        receive (Callable): ASGI receive channel.
+        send (Callable): ASGI send channel.
+        file_path (str): Path of the file.
+        content_type (str): Content type of the file.
+        filename (str): Name sent in an inline `Content-Disposition` of full responses.
+        cached_stat (Optional[Tuple[int, int]]): Size and modification time of the file, in
+            nanoseconds, as last seen by the caller.
+        meter (Optional[StreamMeter]): Records the response in the playback telemetry.
+
+    Returns:
+        FilePlan: The response that was sent.
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist; nothing was sent then.
+    """
+    request = ASGIRequest(scope, io.BytesIO())
+    if cached_stat is not None:
+        plan = plan_file_response(request, *cached_stat, content_type, filename)
+        if plan.status in CONDITIONAL_STATUSES:
+            await _send_start(send, plan)
+            await send({"type": "http.response.body", "body": b""})
+            if meter is not None:
+                meter.start(plan, send_body=False)
+                meter.finish()
+            return plan
+
+    async with aiofiles.open(file_path, "rb") as file:
+        stat = os.fstat(file.fileno())
+        plan = plan_file_response(request, stat.st_size, stat.st_mtime_ns, content_type, filename)
+        send_body = bool(plan.parts) and request.method != "HEAD"
+        if meter is not None:
+            meter.start(plan, send_body)
+        try:
+            await _send_start(send, plan)
+            if send_body:
+                await _send_body(file, plan, receive, send, meter)
+            else:
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            if meter is not None:
+                # Streams that stopped short were aborted by the client
+                meter.finish()
+    return plan
+
+
+async def _send_start(send, plan: FilePlan):
+    headers = [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in plan.headers.items()
+    ]
+    if settings.SECURE_CONTENT_TYPE_NOSNIFF:
+        headers.append((b"x-content-type-options", b"nosniff"))
+    await send({"type": "http.response.start", "status": plan.status, "headers": headers})
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _send_body(file, plan: FilePlan, receive, send, meter: Optional[StreamMeter]):
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+
+    async def send_chunk(chunk: bytes, more_body: bool = True):
+        await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+        if meter is not None:
+            meter.sent(len(chunk))
+
+    try:
+        for header, start, length in plan.parts:
+            if header:
+                await send_chunk(header)
+            await file.seek(start)
+            while length > 0:
+                if disconnected.done():
+                    return
+                chunk = await file.read(min(length, ASYNC_PLAYBACK_BLOCK_SIZE))
+                if not chunk:
+                    # The file was truncated; the client sees a short response
+                    return
+                length -= len(chunk)
+                await send_chunk(chunk)
+        await send_chunk(plan.closing, more_body=False)
+    finally:
+        disconnected.cancel()
+
+
+def _get_video_file(file_key: str):
+    close_old_connections()
+    return get_video_file(file_key)
+
+
+async def _send_not_found(send):
+    body = json.dumps({"detail": "File not found."}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 404,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def _admit(scope, file_name: str):
+    """
+    Run the authentication, permission and throttle checks of `VideoPlaybackView` for a
+    playback request, the way DRF does before calling the view.
+
+    Returns:
+        Tuple[List[Tuple[LeaseSemaphore, str]], Optional[HttpResponse]]: The concurrency
+            leases taken for the request, and the rendered error response if it was refused.
+    """
+    close_old_connections()
+    request = ASGIRequest(scope, io.BytesIO())
+    view = VideoPlaybackView()
+    view.setup(request, file_name=file_name)
+    drf_request = view.initialize_request(request, file_name=file_name)
+    view.request = drf_request
+    view.headers = view.default_response_headers
+    try:
+        view.initial(drf_request, file_name=file_name)
+    except Exception as exc:
+        response = view.finalize_response(drf_request, view.handle_exception(exc))
+        response.render()
+        return [], response
+    return getattr(drf_request, "concurrency_leases", []), None
+
+
+def _release(leases):
+    for semaphore, token in leases:
+        semaphore.release(token)
+
+
+async def _send_response(send, response):
+    headers = [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in response.items()
+    ]
+    await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": response.content})
+
+
+async def playback(scope, receive, send, file_name: str):
+    """
+    Asynchronous version of `VideoPlaybackView`, for ASGI servers. Requests go through the
+    view's authentication, permission and throttle checks, and hold their concurrency
+    leases until the stream ended. Video files are looked up the same way, through the
+    per-process cache, and served by `send_file`.
+    """
+    leases, refused = await sync_to_async(_admit)(scope, file_name)
+    if refused is not None:
+        await _send_response(send, refused)
+        return await sync_to_async(refused.close)()
+    try:
+        await _playback(scope, receive, send, file_name)
+    finally:
+        await sync_to_async(_release)(leases)
+
+
+async def _playback(scope, receive, send, file_name: str):
+    video_file = await sync_to_async(_get_video_file)(file_name)
+    if video_file is None:
+        return await _send_not_found(send)
+
+    cached_stat = (video_file.size, video_file.mtime_ns)
+    try:
+        plan = await send_file(
+            scope,
+            receive,
+            send,
+            video_file.path,
+            content_type=video_file.content_type,
+            filename=file_name,
+            cached_stat=cached_stat,
+            meter=StreamMeter(video_file.video_id) if settings.PLAYBACK_TELEMETRY_ENABLED else None,
+        )
+    except FileNotFoundError:
+        forget_video_file(file_name)
+        return await _send_not_found(send)
+
+    if plan.headers["ETag"] != file_etag(*cached_stat):
+        # The file was replaced since it was cached, e.g. by a remux
+        forget_video_file(file_name)
+
+
+class AsyncPlaybackMiddleware:
+    """
+    ASGI middleware that serves video playback requests with the asynchronous `playback`
+    view, and passes every other request to Django.
+
+    Django 4.0 iterates streaming responses synchronously, so under ASGI a playback stream
+    would block the event loop or a thread until the client has downloaded it; with this, a
+    process can hold thousands of slow streams. Playback responses skip Django's middleware,
+    but not the authentication, permissions and throttles of `VideoPlaybackView`. Requests
+    are left to Django when `PLAYBACK_OFFLOAD` is set, since the web server streams the
+    files then. Enable it with `ASYNC_PLAYBACK_ENABLED`.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        file_name = self.match(scope)
+        if file_name is None:
+            return await self.application(scope, receive, send)
+        return await playback(scope, receive, send, file_name)
+
+    @staticmethod
+    def match(scope) -> Optional[str]:
+        """
+        Returns the file name of a playback request, or None for other requests.
+        """
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return None
+        if settings.PLAYBACK_OFFLOAD:
+            return None
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path) :]
+        try:
+            match = resolve(path)
+        except Resolver404:
+            return None
+        if match.view_name != PLAYBACK_VIEW_NAME:
+            return None
+        return match.kwargs["file_name"]
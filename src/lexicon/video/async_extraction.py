@@ -0,0 +1,400 @@
+import asyncio
+import logging
+import os
+import subprocess
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+
+from lexicon.tasks.base import instrumented_task
+
+from .extraction import Stage, Status, VideoProcessor, group_streams, srt_output_args
+from .ffmpeg import FFmpegRunner, parse_probe_output, probe_command
+from .models import VideoProcessingRun
+from .services.subtitle import load_subtitles
+from .srt import SRTParser
+
+logger = logging.getLogger(__name__)
+
+# Parsed cues are handed to the database writer in batches of `CUE_BATCH_SIZE`, through a
+# queue holding at most `CUE_QUEUE_BATCHES` batches, so a slow database throttles reading
+# the pipe instead of buffering the whole track in memory.
+CUE_BATCH_SIZE = 500
+CUE_QUEUE_BATCHES = 4
+# Longest SRT line accepted from an ffmpeg pipe
+PIPE_LINE_LIMIT = 1024 * 1024
+
+_END_OF_TRACK = object()
+
+
+class TrackWriter:
+    """
+    Streams the cues of one subtitle track into the database from a worker thread while the
+    event loop keeps reading and parsing.
+
+    The writer holds a thread of `executor` for the whole track, so the executor must have a
+    thread for every track written at once; when no thread is free the reader blocks on the
+    full queue until ffmpeg stalls. The track is written inside a single transaction that
+    only commits once `finish()` is awaited, after ffmpeg exited cleanly; `abort()` rolls it
+    back.
+    """
+
+    def __init__(self, processor, language, executor: Optional[Executor] = None):
+        self.processor = processor
+        self.language = language
+        self.loop = asyncio.get_event_loop()
+        self.queue = asyncio.Queue(maxsize=CUE_QUEUE_BATCHES)
+        self.batch = []
+        self.source_seconds = 0.0
+        self.task = self.loop.run_in_executor(executor, self._write)
+
+    async def _put(self, item):
+        put = asyncio.ensure_future(self.queue.put(item))
+        await asyncio.wait({put, self.task}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            # The writer died and will never drain the queue again
+            put.cancel()
+            self.task.result()
+
+    async def add(self, entry):
+        self.batch.append(entry)
+        if len(self.batch) >= CUE_BATCH_SIZE:
+            batch, self.batch = self.batch, []
+            await self._put(batch)
+
+    async def finish(self) -> int:
+        """
+        Flush the remaining cues and commit the track.
+
+        Returns:
+            int: Number of subtitles saved.
+        """
+        if self.batch:
+            batch, self.batch = self.batch, []
+            await self._put(batch)
+        await self._put(_END_OF_TRACK)
+        return await self.task
+
+    async def abort(self, error):
+        """
+        Roll the track back, waiting for the writer to stop.
+        """
+        if not self.task.done():
+            await self._put(error)
+        await asyncio.wait({self.task})
+        # The writer failed with `error` (or on its own); that's reported by the caller
+        self.task.exception()
+
+    def _write(self):
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                saved = load_subtitles(self.processor.video_id, self.language, self._entries())
+            self.processor.record_stage(
+                Stage.INSERT,
+                time.perf_counter() - started - self.source_seconds,
+                self.language,
+                saved,
+            )
+            return saved
+        finally:
+            connections.close_all()
+
+    def _entries(self):
+        while True:
+            waited = time.perf_counter()
+            item = asyncio.run_coroutine_threadsafe(self.queue.get(), self.loop).result()
+            self.source_seconds += time.perf_counter() - waited
+            if item is _END_OF_TRACK:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield from item
+
+
+class AsyncVideoProcessor(VideoProcessor):
+    """
+    `VideoProcessor` running ffprobe and ffmpeg as asyncio subprocesses, so a single worker
+    process can drive many extractions at once; see `process_videos`.
+
+    The event loop reads and parses the SRT pipes while every track is written to the
+    database by a `TrackWriter` thread of `executor`, or of the loop's default executor when
+    not given. Streams are extracted in groups of `SUBTITLE_TRACKS_PER_READ`, so a video
+    holds at most that many writer threads at once. Subtitles are only committed once ffmpeg
+    exited cleanly, and the run is marked completed by the processor itself.
+    """
+
+    def __init__(self, video_id, languages=None, run_id=None, executor=None):
+        super().__init__(video_id, languages=languages, run_id=run_id)
+        self.executor = executor
+
+    async def aadvance(self, status):
+        await sync_to_async(self.advance)(status)
+
+    async def aprobe_streams(self):
+        """
+        Discover the subtitle streams of the video and select the ones to extract.
+        """
+        if not self.video:
+            raise ValueError("Video object is not initialized.")
+
+        await self.aadvance(Status.PROBING)
+        started = time.perf_counter()
+        command = probe_command(self.input_path)
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(), timeout=settings.FFPROBE_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise subprocess.TimeoutExpired(command, settings.FFPROBE_TIMEOUT)
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(
+                process.returncode, command, stderr=stderr.decode("utf-8", errors="replace")
+            )
+
+        streams = self.select_streams(parse_probe_output(stdout.decode("utf-8")))
+        await sync_to_async(self.record_stage)(
+            Stage.PROBE, time.perf_counter() - started, row_count=len(streams)
+        )
+        return streams
+
+    async def aprocess(self, streams=None) -> Dict[str, int]:
+        """
+        Probe (unless `streams` is given), extract and save the subtitles of the video.
+        Probed languages that already have a rendered track are skipped.
+
+        Returns:
+            Dict[str, int]: Number of subtitles saved per language.
+        """
+        try:
+            if streams is None:
+                streams = await self.aprobe_streams()
+                streams = await sync_to_async(self.pending_streams)(streams)
+            saved = {}
+            for group in group_streams(streams):
+                saved.update(await self._aextract(group))
+        except Exception as e:
+            logger.error(f"Error processing video {self.video_id}: {e}")
+            if self.run_id is not None:
+                await sync_to_async(VideoProcessingRun.fail)(self.run_id, e)
+            raise
+
+        await self.aadvance(Status.COMPLETED)
+        return saved
+
+    async def _aextract(self, streams):
+        runner = FFmpegRunner()
+        token = await runner.semaphore.aacquire(runner.slot_timeout)
+        process = None
+        writers = {}
+        transports = []
+        try:
+            started = time.perf_counter()
+            command, process, read_fds = await self._start_ffmpeg(runner, streams)
+            readers = {streams[0].language: process.stdout}
+            for language, read_fd in read_fds.items():
+                readers[language], transport = await self._open_pipe(read_fd)
+                transports.append(transport)
+
+            await self.aadvance(Status.EXTRACTING)
+            writers = {language: TrackWriter(self, language, self.executor) for language in readers}
+            logger.info(f"Extracting {', '.join(readers)} subtitles for video {self.video_id}")
+
+            try:
+                saved = await asyncio.wait_for(
+                    self._pump(command, process, readers, writers), timeout=runner.timeout or None
+                )
+            except asyncio.TimeoutError:
+                raise subprocess.TimeoutExpired(command, runner.timeout)
+            await sync_to_async(self.record_stage)(
+                Stage.EXTRACT, time.perf_counter() - started, ",".join(saved), sum(saved.values())
+            )
+            return saved
+        except BaseException as e:
+            if process is not None and process.returncode is None:
+                process.kill()
+                await process.wait()
+            for writer in writers.values():
+                await writer.abort(e)
+            raise
+        finally:
+            for transport in transports:
+                transport.close()
+            await sync_to_async(runner.semaphore.release)(token)
+
+    async def _start_ffmpeg(self, runner, streams):
+        """
+        Start ffmpeg writing the first track to stdout and every further track to its own
+        pipe, as `VideoProcessor.extract_subtitles` does.
+
+        Returns:
+            Tuple[List[str], asyncio.subprocess.Process, Dict[str, int]]: The command, the
+            process and the read end of the extra pipe of each further track, by language.
+        """
+        args = ["-loglevel", "error", "-i", self.input_path]
+        read_fds, write_fds = {}, []
+        for position, stream in enumerate(streams):
+            if position == 0:
+                target = "pipe:1"
+            else:
+                read_fd, write_fd = os.pipe()
+                read_fds[stream.language] = read_fd
+                write_fds.append(write_fd)
+                target = f"pipe:{write_fd}"
+            args += srt_output_args(stream, target)
+
+        command = runner.build_command(args)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                limit=PIPE_LINE_LIMIT,
+                pass_fds=write_fds,
+            )
+        except Exception:
+            for read_fd in read_fds.values():
+                os.close(read_fd)
+            raise
+        finally:
+            for write_fd in write_fds:
+                os.close(write_fd)
+        return command, process, read_fds
+
+    @staticmethod
+    async def _open_pipe(read_fd):
+        loop = asyncio.get_event_loop()
+        reader = asyncio.StreamReader(limit=PIPE_LINE_LIMIT)
+        transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(read_fd, "rb", 0)
+        )
+        return reader, transport
+
+    async def _pump(self, command, process, readers, writers):
+        stderr = asyncio.ensure_future(process.stderr.read())
+        tracks = [
+            asyncio.ensure_future(self._read_track(readers[language], writers[language]))
+            for language in readers
+        ]
+        try:
+            parsed = await asyncio.gather(*tracks)
+        except BaseException:
+            for track in tracks:
+                track.cancel()
+            raise
+
+        returncode = await process.wait()
+        if returncode != 0:
+            raise subprocess.CalledProcessError(
+                returncode, command, stderr=(await stderr).decode("utf-8", errors="replace")
+            )
+
+        await self.aadvance(Status.SAVING)
+        saved = await asyncio.gather(*(writer.finish() for writer in writers.values()))
+        for language, (rows, parse_seconds) in zip(readers, parsed):
+            await sync_to_async(self.record_stage)(Stage.PARSE, parse_seconds, language, rows)
+        for language in writers:
+            await sync_to_async(self.render_track)(language)
+        return dict(zip(writers, saved))
+
+    async def _read_track(self, reader, writer):
+        parser = SRTParser()
+        rows = 0
+        parse_seconds = 0.0
+        async for line in reader:
+            started = time.perf_counter()
+            entry = parser.feed(line.decode("utf-8", errors="replace"))
+            parse_seconds += time.perf_counter() - started
+            if entry is not None:
+                if rows == 0:
+                    await self.aadvance(Status.PARSING)
+                rows += 1
+                await writer.add(entry)
+
+        entry = parser.close()
+        if entry is not None:
+            rows += 1
+            await writer.add(entry)
+        return rows, parse_seconds
+
+
+async def process_videos(
+    video_ids: Iterable[int],
+    languages: Optional[List[str]] = None,
+    run_ids: Optional[Dict[int, int]] = None,
+    concurrency: Optional[int] = None,
+) -> Dict[int, object]:
+    """
+    Extract the subtitles of many videos concurrently from one event loop, running at most
+    `concurrency` of them at a time. ffmpeg processes still also count against the
+    per-host `FFMPEG_MAX_PROCESSES` cap.
+
+    Track writers run on a dedicated thread pool with a thread for every track that can be
+    written at once, rather than on the loop's default executor, whose size depends on the
+    CPU count and which a busy batch would starve.
+
+    Args:
+        video_ids (Iterable[int]): Videos to process.
+        languages (Optional[List[str]]): Languages to extract; all text tracks when None.
+        run_ids (Optional[Dict[int, int]]): Processing run to report to, per video id.
+        concurrency (Optional[int]): Defaults to `ASYNC_EXTRACTION_CONCURRENCY`.
+
+    Returns:
+        Dict[int, object]: Per video id, the saved count per language, or the exception
+        that made its processing fail.
+    """
+    run_ids = run_ids or {}
+    concurrency = concurrency or settings.ASYNC_EXTRACTION_CONCURRENCY
+    semaphore = asyncio.Semaphore(concurrency)
+    executor = ThreadPoolExecutor(
+        max_workers=concurrency * max(settings.SUBTITLE_TRACKS_PER_READ, 1),
+        thread_name_prefix="track-writer",
+    )
+
+    async def process_one(video_id):
+        async with semaphore:
+            processor = await sync_to_async(AsyncVideoProcessor)(
+                video_id, languages=languages, run_id=run_ids.get(video_id), executor=executor
+            )
+            return await processor.aprocess()
+
+    video_ids = list(video_ids)
+    try:
+        results = await asyncio.gather(
+            *(process_one(video_id) for video_id in video_ids), return_exceptions=True
+        )
+    finally:
+        executor.shutdown(wait=False)
+        await sync_to_async(connections.close_all)()
+    return dict(zip(video_ids, results))
+
+
+@instrumented_task(name="lexicon.video.async_extraction.process_video_batch")
+def process_video_batch(video_ids, language=None):
+    """
+    Celery task extracting the subtitles of a batch of videos concurrently inside a single
+    worker process. Batches are queued by the `extract_subtitles` management command.
+    """
+    run_ids = {
+        video_id: VideoProcessingRun.objects.create(video_id=video_id).id for video_id in video_ids
+    }
+    languages = [language] if language else None
+    results = asyncio.run(process_videos(video_ids, languages=languages, run_ids=run_ids))
+
+    failed = [video_id for video_id, result in results.items() if isinstance(result, Exception)]
+    logger.info(
+        f"Processed a batch of {len(results)} video(s), {len(failed)} failed: {failed or '-'}"
+    )
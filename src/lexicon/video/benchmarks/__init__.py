@@ -0,0 +1,12 @@
+from .fixtures import generate_subtitle_entries, write_synthetic_media, write_synthetic_srt
+from .suite import BenchmarkResult, ExtractionBenchmark, build_report, find_regressions
+
+__all__ = [
+    "BenchmarkResult",
+    "ExtractionBenchmark",
+    "build_report",
+    "find_regressions",
+    "generate_subtitle_entries",
+    "write_synthetic_media",
+    "write_synthetic_srt",
+]
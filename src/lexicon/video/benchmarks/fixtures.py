@@ -0,0 +1,85 @@
+import os
+import subprocess
+from typing import Dict, Iterator, Sequence
+
+from lexicon.video.ffmpeg import FFmpegRunner
+from lexicon.video.timecodes import format_srt_timestamp
+
+CUE_INTERVAL_MS = 2500
+CUE_DURATION_MS = 2000
+
+
+def generate_subtitle_entries(count: int) -> Iterator[Dict]:
+    """
+    Yield `count` synthetic cue entries, one every `CUE_INTERVAL_MS` milliseconds.
+    """
+    for index in range(count):
+        start_ms = index * CUE_INTERVAL_MS
+        yield {
+            "start_ms": start_ms,
+            "end_ms": start_ms + CUE_DURATION_MS,
+            "cc_subtitle": f"Synthetic subtitle line number {index}, long enough to be realistic.",
+        }
+
+
+def write_synthetic_srt(path: str, count: int) -> str:
+    """
+    Write an SRT file with `count` synthetic cues. Every other cue spans two text lines, so
+    the parser's multi-line path is exercised as well.
+
+    Returns:
+        str: The path written.
+    """
+    with open(path, "w", encoding="utf-8") as srt_file:
+        for number, entry in enumerate(generate_subtitle_entries(count), start=1):
+            text = entry["cc_subtitle"]
+            if number % 2 == 0:
+                text = text.replace(", ", ",\n", 1)
+            srt_file.write(
+                f"{number}\n"
+                f"{format_srt_timestamp(entry['start_ms'])} --> "
+                f"{format_srt_timestamp(entry['end_ms'])}\n"
+                f"{text}\n\n"
+            )
+    return path
+
+
+def write_synthetic_media(path: str, srt_paths: Sequence[str], languages: Sequence[str]) -> str:
+    """
+    Mux SRT files as language-tagged subtitle streams into a small Matroska file, next to a
+    tiny 1 fps video stream lasting as long as the longest track.
+
+    Args:
+        path (str): Output path; should end in '.mkv'.
+        srt_paths (Sequence[str]): SRT files, one per subtitle stream.
+        languages (Sequence[str]): ISO 639-2 language tag of each stream.
+
+    Returns:
+        str: The path written.
+    """
+    duration_ms = 0
+    for srt_path in srt_paths:
+        with open(srt_path, encoding="utf-8") as srt_file:
+            cues = sum(1 for line in srt_file if "-->" in line)
+        duration_ms = max(duration_ms, cues * CUE_INTERVAL_MS)
+
+    args = [
+        "-loglevel",
+        "error",
+        "-f",
+        "lavfi",
+        "-i",
+        f"color=c=black:s=64x64:r=1:d={duration_ms}ms",
+    ]
+    for srt_path in srt_paths:
+        args += ["-f", "srt", "-i", srt_path]
+    args += ["-map", "0:v"]
+    for position, language in enumerate(languages):
+        args += ["-map", f"{position + 1}:s", f"-metadata:s:s:{position}", f"language={language}"]
+    args += ["-c:v", "mpeg4", "-c:s", "srt", path]
+
+    with FFmpegRunner().start(args, stdout=subprocess.DEVNULL) as process:
+        process.check_returncode()
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    return path
@@ -0,0 +1,253 @@
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from lexicon._version import VERSION
+from lexicon.video.extraction import VideoProcessor
+from lexicon.video.ffmpeg import FFmpegRunner
+from lexicon.video.models import Subtitle, Video
+from lexicon.video.services.subtitle import load_subtitles
+from lexicon.video.srt import SRT_TIMING_PATTERN, iter_srt_cues
+from lexicon.video.timecodes import parse_srt_timestamp
+
+from .fixtures import generate_subtitle_entries, write_synthetic_media, write_synthetic_srt
+
+REPORT_FORMAT_VERSION = 1
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    Timings of a single pipeline stage at a single input size.
+
+    Attributes:
+        stage (str): Stage name, e.g. 'parse'.
+        cues (int): Number of cues per run.
+        runs (List[float]): Wall-clock seconds of every run.
+    """
+
+    stage: str
+    cues: int
+    runs: List[float] = field(default_factory=list)
+
+    @property
+    def best(self) -> float:
+        return min(self.runs)
+
+    @property
+    def cues_per_second(self) -> float:
+        return self.cues / self.best if self.best else 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "stage": self.stage,
+            "cues": self.cues,
+            "best_seconds": round(self.best, 6),
+            "cues_per_second": round(self.cues_per_second, 1),
+            "runs": [round(seconds, 6) for seconds in self.runs],
+        }
+
+
+class ExtractionBenchmark:
+    """
+    Measures the throughput of every stage of the subtitle extraction pipeline in isolation:
+
+    - `timecode`: converting SRT timestamps to milliseconds;
+    - `parse`: reading and parsing an SRT file into cue entries;
+    - `insert`: loading cue entries into the database (rolled back after every run);
+    - `extract`: demuxing one subtitle stream of a media file to SRT with ffmpeg;
+    - `process`: the end-to-end `VideoProcessor.process` over every stream of a media file.
+
+    SRT stages run once per size in `sizes`. Media stages run on a generated Matroska file
+    holding one stream of `media_cues` cues per language, and are skipped when
+    `media_cues` is 0.
+    """
+
+    def __init__(
+        self,
+        sizes: Sequence[int],
+        repeat: int = 3,
+        media_cues: int = 10000,
+        languages: Sequence[str] = ("eng", "kor"),
+        log: Optional[Callable[[str], None]] = None,
+    ):
+        self.sizes = sizes
+        self.repeat = repeat
+        self.media_cues = media_cues
+        self.languages = languages
+        self.log = log or (lambda message: None)
+
+    def run(self) -> List[BenchmarkResult]:
+        results = []
+        workdir = tempfile.mkdtemp(prefix="lexicon-benchmark-")
+        name = f"benchmark-{uuid.uuid4().hex}"
+        video = Video.objects.create(
+            title=name,
+            description="Extraction pipeline benchmark",
+            video_file=f"videos/{name}.webm",
+        )
+        try:
+            for size in self.sizes:
+                srt_path = write_synthetic_srt(os.path.join(workdir, f"{size}.srt"), size)
+                results.append(self._measure("timecode", size, self._timecode, srt_path))
+                results.append(self._measure("parse", size, self._parse, srt_path))
+                results.append(self._measure("insert", size, self._insert, video.id, size))
+                os.remove(srt_path)
+
+            if self.media_cues:
+                results += self._run_media_stages(video)
+        finally:
+            video.delete()
+            shutil.rmtree(workdir, ignore_errors=True)
+        return results
+
+    def _measure(self, stage, cues, function, *args) -> BenchmarkResult:
+        result = BenchmarkResult(stage=stage, cues=cues)
+        for _ in range(self.repeat):
+            result.runs.append(function(*args))
+        self.log(
+            f"{stage:<10} {cues:>9,} cues  {result.cues_per_second:>14,.0f} cues/sec  "
+            f"(best of {self.repeat}: {result.best:.3f}s)"
+        )
+        return result
+
+    @staticmethod
+    def _timecode(srt_path):
+        timestamps = []
+        with open(srt_path, encoding="utf-8") as srt_file:
+            for line in srt_file:
+                match = SRT_TIMING_PATTERN.match(line)
+                if match:
+                    timestamps += match.groups()
+
+        started = time.perf_counter()
+        for timestamp in timestamps:
+            parse_srt_timestamp(timestamp)
+        return time.perf_counter() - started
+
+    @staticmethod
+    def _parse(srt_path):
+        started = time.perf_counter()
+        with open(srt_path, encoding="utf-8") as srt_file:
+            for _ in iter_srt_cues(srt_file):
+                pass
+        return time.perf_counter() - started
+
+    @staticmethod
+    def _insert(video_id, cues):
+        with transaction.atomic():
+            started = time.perf_counter()
+            load_subtitles(video_id, "eng", generate_subtitle_entries(cues))
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        return elapsed
+
+    def _run_media_stages(self, video):
+        # The media file must live below MEDIA_ROOT for `VideoProcessor` to find it
+        media_dir = os.path.join(settings.MEDIA_ROOT, "benchmarks", uuid.uuid4().hex)
+        os.makedirs(media_dir)
+        try:
+            srt_path = write_synthetic_srt(os.path.join(media_dir, "track.srt"), self.media_cues)
+            media_path = write_synthetic_media(
+                os.path.join(media_dir, "benchmark.mkv"),
+                [srt_path] * len(self.languages),
+                self.languages,
+            )
+            video.video_file.name = os.path.relpath(media_path, settings.MEDIA_ROOT)
+            video.save(update_fields=["video_file"])
+
+            return [
+                self._measure("extract", self.media_cues, self._extract, media_path),
+                self._measure(
+                    "process",
+                    self.media_cues * len(self.languages),
+                    self._process,
+                    video.id,
+                ),
+            ]
+        finally:
+            shutil.rmtree(media_dir, ignore_errors=True)
+
+    @staticmethod
+    def _extract(media_path):
+        args = ["-loglevel", "error", "-i", media_path, "-map", "0:s:0", "-f", "srt", "pipe:1"]
+        started = time.perf_counter()
+        with FFmpegRunner().start(args, stdout=subprocess.PIPE) as process:
+            while process.stdout.read(64 * 1024):
+                pass
+            process.check_returncode()
+        return time.perf_counter() - started
+
+    @staticmethod
+    def _process(video_id):
+        started = time.perf_counter()
+        VideoProcessor(video_id).process()
+        elapsed = time.perf_counter() - started
+        Subtitle.objects.filter(video_id=video_id).delete()
+        return elapsed
+
+
+def ffmpeg_version() -> str:
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-version"], capture_output=True, text=True, timeout=10, check=True
+        )
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    return result.stdout.splitlines()[0] if result.stdout else ""
+
+
+def build_report(results: Sequence[BenchmarkResult]) -> Dict:
+    """
+    Build the machine-readable report of a benchmark run.
+    """
+    return {
+        "format": REPORT_FORMAT_VERSION,
+        "version": VERSION,
+        "created_at": timezone.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": connection.vendor,
+            "ffmpeg": ffmpeg_version(),
+        },
+        "results": [result.as_dict() for result in results],
+    }
+
+
+def find_regressions(baseline: Dict, report: Dict, tolerance: float) -> List[Dict]:
+    """
+    Compare two reports and list the stages whose throughput dropped by more than
+    `tolerance` (a fraction, e.g. 0.1 for 10%). Stages missing from either report are
+    ignored.
+    """
+    baseline_results = {
+        (result["stage"], result["cues"]): result for result in baseline.get("results", [])
+    }
+    regressions = []
+    for result in report["results"]:
+        previous = baseline_results.get((result["stage"], result["cues"]))
+        if not previous or not previous["cues_per_second"]:
+            continue
+        change = result["cues_per_second"] / previous["cues_per_second"] - 1
+        if change < -tolerance:
+            regressions.append(
+                {
+                    "stage": result["stage"],
+                    "cues": result["cues"],
+                    "baseline_cues_per_second": previous["cues_per_second"],
+                    "cues_per_second": result["cues_per_second"],
+                    "change": round(change, 4),
+                }
+            )
+    return regressions
@@ -0,0 +1,146 @@
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from lexicon.video.models import Video
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "CachedVideo",
+    "get_cached_video",
+    "invalidate_video",
+    "get_video_cache_stats",
+    "reset_video_cache_stats",
+]
+
+HITS_KEY = "video_cache:hits"
+MISSES_KEY = "video_cache:misses"
+
+
+@dataclass(frozen=True)
+class CachedVideo:
+    """
+    The metadata of a `Video` that background jobs need, in the plain shape it is cached as.
+
+    Attributes:
+        id (int): Id of the video.
+        title (str): Title of the video.
+        file_name (str): Name of the stored file, relative to `MEDIA_ROOT`.
+        content_hash (str): SHA-256 digest of the file, empty if unknown.
+        source_id (Optional[int]): Id of the video this one duplicates, if any.
+    """
+
+    id: int
+    title: str
+    file_name: str
+    content_hash: str
+    source_id: Optional[int]
+
+    @classmethod
+    def from_video(cls, video: Video) -> "CachedVideo":
+        return cls(
+            id=video.id,
+            title=video.title,
+            file_name=video.video_file.name,
+            content_hash=video.content_hash,
+            source_id=video.source_id,
+        )
+
+    @property
+    def path(self) -> str:
+        return os.path.join(settings.MEDIA_ROOT, self.file_name)
+
+    @property
+    def subtitle_video_id(self) -> int:
+        return self.source_id or self.id
+
+
+def _generation_key(video_id: int) -> str:
+    return f"video:{video_id}:generation"
+
+
+def _get_generation(video_id: int) -> int:
+    """
+    Return the current cache generation of a video, starting a new one if it has none.
+
+    New generations start at the current time in milliseconds rather than at 1, so a counter
+    that was evicted never restarts at a value whose entries may still be cached.
+    """
+    key = _generation_key(video_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def _count(key: str):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def invalidate_video(video_id: int):
+    """
+    Make every cached entry of a video stale by moving it to a new generation. Stale entries
+    are never read again and simply expire.
+    """
+    key = _generation_key(video_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+
+
+def get_cached_video(video_id: int) -> CachedVideo:
+    """
+    Read-through cache of video metadata, keyed by the video's current generation.
+
+    Args:
+        video_id (int): Id of the video.
+
+    Returns:
+        CachedVideo: The video's metadata.
+
+    Raises:
+        Video.DoesNotExist: If there is no such video.
+    """
+    key = f"video:{video_id}:v{_get_generation(video_id)}"
+    data = cache.get(key)
+    if data is not None:
+        _count(HITS_KEY)
+        return CachedVideo(**data)
+
+    _count(MISSES_KEY)
+    video = Video.objects.only("id", "title", "video_file", "content_hash", "source_id").get(
+        id=video_id
+    )
+    cached = CachedVideo.from_video(video)
+    cache.set(key, asdict(cached), timeout=settings.VIDEO_CACHE_TIMEOUT)
+    return cached
+
+
+def get_video_cache_stats() -> Dict[str, float]:
+    """
+    Return the hit and miss counts of `get_cached_video` and the resulting hit ratio.
+    """
+    counts = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counts.get(HITS_KEY, 0), counts.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+    }
+
+
+def reset_video_cache_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
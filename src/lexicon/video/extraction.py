@@ -1,158 +1,422 @@
+import io
 import logging
 import os
-import re
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
 
+from celery import chord
 from django.conf import settings
-from django.core.cache import cache
-from django.core.exceptions import ObjectDoesNotExist
-from django.db import transaction
+from django.db import connections, transaction
 
 from lexicon.tasks.base import instrumented_task
 
-from .models import Subtitle, Video
+from .cache import get_cached_video
+from .ffmpeg import FFmpegRunner, SubtitleStream, probe_subtitle_streams
+from .models import SubtitleTrack, Video, VideoProcessingRun, VideoProcessingStage
+from .services.subtitle import load_subtitles, render_subtitle_track
+from .srt import SRTParser
 
 logger = logging.getLogger(__name__)
 
+SRT_PIPE_ENCODING = {"encoding": "utf-8", "errors": "replace"}
+
+PROGRESS_POLL_INTERVAL = 0.5
+
+Status = VideoProcessingRun.Status
+Stage = VideoProcessingStage.Stage
+
+
+def srt_output_args(stream, target):
+    """
+    ffmpeg output arguments that convert `stream` to SRT and write it to `target`.
+    """
+    return ["-map", f"0:{stream.index}", "-c:s", "srt", "-f", "srt", target]
+
+
+def group_streams(streams):
+    """
+    Split subtitle streams into groups of up to `SUBTITLE_TRACKS_PER_READ`, each demuxed from
+    a single read of the container.
+    """
+    size = max(settings.SUBTITLE_TRACKS_PER_READ, 1)
+    return [streams[i : i + size] for i in range(0, len(streams), size)]
+
+
+@dataclass
+class TrackMetrics:
+    """
+    Time split of a single subtitle track while it streams from ffmpeg into the database.
+
+    Attributes:
+        parse_seconds (float): Time spent inside the SRT parser.
+        source_seconds (float): Time spent producing cues, including waits on the ffmpeg pipe.
+        rows (int): Number of cues parsed.
+        started (threading.Event): Set once the first cue has been parsed.
+        parsed (threading.Event): Set once the whole track has been parsed.
+    """
+
+    parse_seconds: float = 0.0
+    source_seconds: float = 0.0
+    rows: int = 0
+    started: threading.Event = field(default_factory=threading.Event)
+    parsed: threading.Event = field(default_factory=threading.Event)
+
 
 class VideoProcessor:
-    def __init__(self, video_id, language="eng"):
+    def __init__(self, video_id, languages=None, run_id=None):
         self.video_id = video_id
-        self.video = self._get_video_cached(video_id)
-        self.video_path = self.video.video_file.path if self.video else ""
-        self.subtitle_path = ""
-        self.language = language
+        self.video = self._get_video(video_id)
+        self.video_path = self.video.path if self.video else ""
+        self.languages = languages
+        self.run_id = run_id
 
     @staticmethod
-    def _get_video_cached(video_id):
+    def _get_video(video_id):
         """
-        Fetch the video object with caching to avoid repeated DB lookups.
+        Fetch the video metadata through the versioned video cache.
         """
-        cache_key = f"video_{video_id}"
-        video = cache.get(cache_key)
-        if not video:
-            try:
-                video = Video.objects.get(id=video_id)
-                cache.set(cache_key, video, timeout=3600)
-            except ObjectDoesNotExist:
-                raise ValueError("Video not found")
-        return video
+        try:
+            return get_cached_video(video_id)
+        except Video.DoesNotExist:
+            raise ValueError("Video not found")
+
+    def select_streams(self, streams):
+        """
+        Pick one text subtitle stream per requested language, in container order.
 
-    def extract_subtitles(self):
+        When no languages were requested every text track found in the container is used.
         """
-        Extract subtitles from a video file asynchronously using subprocess.
+        selected = {}
+        for stream in streams:
+            if not stream.is_text:
+                logger.debug(
+                    f"Skipping non-text subtitle stream {stream.index} ({stream.codec_name})"
+                )
+                continue
+            if self.languages and stream.language not in self.languages:
+                continue
+            selected.setdefault(stream.language, stream)
+        return list(selected.values())
+
+    @property
+    def input_path(self):
+        return self.video.path
+
+    def advance(self, status):
+        """
+        Move the processing run of this processor, if any, forward to `status`.
+        """
+        if self.run_id is not None:
+            VideoProcessingRun.advance(self.run_id, status)
+
+    def record_stage(self, stage, duration, language="", row_count=None):
+        """
+        Store the wall-clock duration (in seconds) and row count of a processing stage.
+        """
+        if self.run_id is None:
+            return
+        VideoProcessingStage.objects.create(
+            run_id=self.run_id,
+            stage=stage,
+            language=language,
+            duration_ms=round(duration * 1000),
+            row_count=row_count,
+        )
+
+    def probe_streams(self):
+        """
+        Discover the subtitle streams of the video and select the ones to extract.
         """
         if not self.video:
             raise ValueError("Video object is not initialized.")
 
-        input_path = os.path.join(settings.MEDIA_ROOT, self.video.video_file.name)
-        output_filename = f"{os.path.splitext(self.video.video_file.name)[0]}_{self.language}.srt"
-        output_path = os.path.join(settings.MEDIA_ROOT, "subtitles", output_filename)
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        self.advance(Status.PROBING)
+        started = time.perf_counter()
+        streams = self.select_streams(probe_subtitle_streams(self.input_path))
+        self.record_stage(Stage.PROBE, time.perf_counter() - started, row_count=len(streams))
+        return streams
 
-        stream_mapping = {
-            "eng": 2,
-            "kor": 4,
-            "ger": 5,
-        }
-        stream = stream_mapping.get(self.language, 2)
+    def pending_streams(self, streams):
+        """
+        Drop the streams of languages that already have a rendered track, so extracting a
+        video again doesn't duplicate its subtitles.
+        """
+        extracted = set(
+            SubtitleTrack.objects.filter(video_id=self.video_id).values_list("language", flat=True)
+        )
+        return [stream for stream in streams if stream.language not in extracted]
 
-        command = ["ffmpeg", "-i", input_path, "-map", f"0:{stream}", "-c:s", "copy", output_path]
+    def extract_subtitles(self, streams=None):
+        """
+        Start a single ffmpeg pass that writes every selected track as SRT to its own pipe.
 
-        try:
-            subprocess.run(command, check=True, stderr=subprocess.PIPE, text=True)
-            self.subtitle_path = output_path
-            logger.info(f"Subtitles extracted to: {output_path}")
-        except Exception as e:
-            logger.exception(f"Failed to extract subtitles: {e}")
-            raise
+        The first track is written to ffmpeg's stdout and any further track to an extra pipe
+        inherited by the child process, so the container is still read only once.
 
-    def read_subtitle_file(self):
-        """
-        Asynchronously read and parse the subtitle file.
+        Args:
+            streams (Optional[List[SubtitleStream]]): Streams to extract. Probed and selected
+                from the container when not given.
+
+        Returns:
+            Tuple[Optional[FFmpegProcess], Dict[str, IO[str]]]: The running ffmpeg process
+            and a mapping of language to a text stream of that track's SRT output.
         """
-        subtitle_entries = []
-        try:
-            with open(self.subtitle_path, "r", encoding="utf-8") as file:
-                content = file.read()
+        if not self.video:
+            raise ValueError("Video object is not initialized.")
 
-            subtitle_pattern = r"(\d+)\s+(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})\s+(.+?)\s*(?=\n\d|\Z)"
-            matches = re.findall(subtitle_pattern, content, re.DOTALL)
+        input_path = self.input_path
+        if streams is None:
+            streams = self.probe_streams()
+        if not streams:
+            logger.warning(f"No subtitle streams to extract for video {self.video_id}.")
+            return None, {}
 
-            for match in matches:
-                entry = {
-                    "start_time": self._convert_srt_time(match[1]),
-                    "end_time": self._convert_srt_time(match[2]),
-                    "cc_subtitle": match[3].replace("\n", " ").strip(),
-                }
-                subtitle_entries.append(entry)
-        except FileNotFoundError:
-            logger.error(f"Subtitle file {self.subtitle_path} not found.")
-            raise
+        args = ["-loglevel", "error", "-i", input_path]
+        read_fds, write_fds = {}, []
+        for position, stream in enumerate(streams):
+            if position == 0:
+                target = "pipe:1"
+            else:
+                read_fd, write_fd = os.pipe()
+                read_fds[stream.language] = read_fd
+                write_fds.append(write_fd)
+                target = f"pipe:{write_fd}"
+            args += srt_output_args(stream, target)
+
+        try:
+            process = FFmpegRunner().start(args, stdout=subprocess.PIPE, pass_fds=write_fds)
         except Exception as e:
-            logger.error(f"Error reading subtitle file: {e}")
+            for read_fd in read_fds.values():
+                os.close(read_fd)
+            logger.exception(f"Failed to extract subtitles: {e}")
             raise
+        finally:
+            for write_fd in write_fds:
+                os.close(write_fd)
 
-        return subtitle_entries
+        self.advance(Status.EXTRACTING)
+        tracks = {streams[0].language: io.TextIOWrapper(process.stdout, **SRT_PIPE_ENCODING)}
+        for language, read_fd in read_fds.items():
+            tracks[language] = os.fdopen(read_fd, "r", **SRT_PIPE_ENCODING)
 
-    @staticmethod
-    def _convert_srt_time(srt_time_str):
+        logger.info(f"Extracting {', '.join(tracks)} subtitles for video {self.video_id}")
+        return process, tracks
+
+    def read_subtitle_stream(self, language, srt_stream, metrics=None, process=None):
         """
-        Convert SRT timestamp to Python `time` object (HH:MM:SS,MS).
+        Parse an SRT text stream incrementally and stream its cues into the database, then
+        render the committed track as WebVTT.
+
+        Rows for a track are written inside a single transaction, so a failed track leaves no
+        partial subtitles behind while memory stays flat regardless of the track size. When
+        the producing ffmpeg `process` is given, the transaction only commits once it exited
+        cleanly, so a track cut short by a crash or a timeout is rolled back.
         """
-        from datetime import datetime
+        metrics = metrics or TrackMetrics()
+        started = time.perf_counter()
+        with srt_stream, transaction.atomic():
+            saved = load_subtitles(self.video_id, language, self._metered_cues(srt_stream, metrics))
+            if process is not None:
+                process.check_returncode()
+        elapsed = time.perf_counter() - started
 
-        time_format = "%H:%M:%S,%f"
-        return datetime.strptime(srt_time_str, time_format).time()
+        self.record_stage(Stage.PARSE, metrics.parse_seconds, language, metrics.rows)
+        self.record_stage(Stage.INSERT, elapsed - metrics.source_seconds, language, saved)
+        self.render_track(language)
+        return saved
 
-    @transaction.atomic
-    def save_subtitle_to_db(self, subtitle_entries):
+    def render_track(self, language):
         """
-        Save the parsed subtitle entries to the database using bulk_create for efficiency.
+        Render the committed subtitles of a language as the video's WebVTT track.
         """
-        subtitles_to_create = [
-            Subtitle(
-                video=self.video,
-                language=self.language,
-                cc_subtitle=entry["cc_subtitle"],
-                start_time=entry["start_time"],
-                end_time=entry["end_time"],
-            )
-            for entry in subtitle_entries
-        ]
+        started = time.perf_counter()
+        track = render_subtitle_track(self.video_id, language)
+        self.record_stage(Stage.RENDER, time.perf_counter() - started, language, track.cue_count)
 
-        Subtitle.objects.bulk_create(subtitles_to_create)
-        logger.info(
-            f"{len(subtitles_to_create)} subtitles saved to the database for video {self.video_id}."
-        )
+    def _metered_cues(self, srt_stream, metrics):
+        """
+        Yield the cues of an SRT stream while measuring the parser and the producer side.
+        """
+        parser = SRTParser()
+        resumed = time.perf_counter()
+        for line in srt_stream:
+            started = time.perf_counter()
+            entry = parser.feed(line)
+            metrics.parse_seconds += time.perf_counter() - started
+            if entry is None:
+                continue
+
+            metrics.rows += 1
+            metrics.started.set()
+            metrics.source_seconds += time.perf_counter() - resumed
+            yield entry
+            resumed = time.perf_counter()
+
+        entry = parser.close()
+        metrics.source_seconds += time.perf_counter() - resumed
+        metrics.parsed.set()
+        if entry is not None:
+            metrics.rows += 1
+            yield entry
+
+    def _read_subtitle_stream_in_thread(self, language, srt_stream, metrics, process):
+        try:
+            return self.read_subtitle_stream(language, srt_stream, metrics, process)
+        finally:
+            metrics.parsed.set()
+            connections.close_all()
 
-    def clean_up(self):
+    def _report_progress(self, futures, metrics):
         """
-        Remove the temporary subtitle file if it exists.
+        Advance the run status while the track readers are running.
+
+        Readers stream cues through a single COPY statement on their own connection, so
+        progress is reported from this thread instead of from inside the readers.
         """
-        if os.path.exists(self.subtitle_path):
-            os.remove(self.subtitle_path)
-            logger.info(f"Removed temporary subtitle file {self.subtitle_path}")
+        pending = set(futures)
+        status = Status.EXTRACTING
+        while pending:
+            _, pending = wait(pending, timeout=PROGRESS_POLL_INTERVAL)
+            track_metrics = metrics.values()
+            if status == Status.EXTRACTING and any(m.started.is_set() for m in track_metrics):
+                status = Status.PARSING
+                self.advance(status)
+            if status != Status.SAVING and all(m.parsed.is_set() for m in track_metrics):
+                status = Status.SAVING
+                self.advance(status)
 
-    def process(self):
+    def process(self, streams=None):
         """
-        Process the video asynchronously, extract subtitles, and save them to the database.
+        Process the video, streaming subtitles from ffmpeg into the database while it demuxes.
+
+        Args:
+            streams (Optional[List[SubtitleStream]]): Streams to extract. Probed and selected
+                from the container when not given.
+
+        Returns:
+            Dict[str, int]: Number of subtitles saved per language.
         """
+        process = None
+        saved = {}
         try:
-            self.extract_subtitles()
-            subtitle_entries = self.read_subtitle_file()
-            self.save_subtitle_to_db(subtitle_entries)
+            started = time.perf_counter()
+            process, tracks = self.extract_subtitles(streams)
+            if process is None:
+                return saved
+
+            metrics = {language: TrackMetrics() for language in tracks}
+            with ThreadPoolExecutor(max_workers=len(tracks)) as executor:
+                futures = {
+                    language: executor.submit(
+                        self._read_subtitle_stream_in_thread,
+                        language,
+                        srt_stream,
+                        metrics[language],
+                        process,
+                    )
+                    for language, srt_stream in tracks.items()
+                }
+                self._report_progress(futures.values(), metrics)
+
+            for language, future in futures.items():
+                saved[language] = future.result()
+
+            process.check_returncode()
+            self.record_stage(
+                Stage.EXTRACT, time.perf_counter() - started, ",".join(tracks), sum(saved.values())
+            )
         except Exception as e:
             logger.error(f"Error processing video {self.video_id}: {e}")
+            if self.run_id is not None:
+                VideoProcessingRun.fail(self.run_id, e)
+            raise
         finally:
-            ...
-            # self.clean_up()
+            if process is not None:
+                process.close()
+        return saved
 
 
 @instrumented_task(name="lexicon.video.extraction.process_video")
-def process_video(video_id, language=None):
+def process_video(video_id, language=None, run_id=None):
     """
     Celery task to process a video asynchronously.
+
+    Probes the video's text subtitle streams and fans extraction out on the extraction queue,
+    one subtask per group of up to `SUBTITLE_TRACKS_PER_READ` streams. Each subtask demuxes
+    its group in a single ffmpeg pass, so a container is read once per group rather than once
+    per track, while the tracks of a large multi-language container still extract in
+    parallel. Languages that already have a rendered track are skipped, so re-running the
+    task for a video doesn't duplicate its subtitles.
+
+    Args:
+        video_id (int): Id of the video to process.
+        language (Optional[str]): Language the upload asked for. Every text track is
+            extracted; a warning is logged when the container has no track in this language.
+        run_id (Optional[int]): Processing run to report progress to. A new run is created
+            when not given.
+    """
+    if run_id is None:
+        run_id = VideoProcessingRun.objects.create(video_id=video_id).id
+
+    try:
+        processor = VideoProcessor(video_id, run_id=run_id)
+        streams = processor.probe_streams()
+    except Exception as e:
+        logger.error(f"Error probing video {video_id}: {e}")
+        VideoProcessingRun.fail(run_id, e)
+        raise
+
+    if language and language not in {stream.language for stream in streams}:
+        logger.warning(f"Video {video_id} has no {language} text subtitle stream.")
+    streams = processor.pending_streams(streams)
+    if not streams:
+        logger.warning(f"No subtitle streams to extract for video {video_id}.")
+        VideoProcessingRun.advance(run_id, Status.COMPLETED)
+        return
+
+    header = [
+        extract_subtitle_streams.s(video_id, [asdict(stream) for stream in group], run_id=run_id)
+        for group in group_streams(streams)
+    ]
+    chord(header)(finalize_video_processing.s(video_id, run_id=run_id))
+    logger.info(
+        f"Dispatched {len(header)} subtitle extraction subtask(s) for {len(streams)} stream(s) "
+        f"of video {video_id}"
+    )
+
+
+@instrumented_task(name="lexicon.video.extraction.extract_subtitle_streams", ignore_result=False)
+def extract_subtitle_streams(video_id, streams, run_id=None):
+    """
+    Celery subtask to extract and save a group of subtitle streams of a video from a single
+    read of its container.
+
+    Args:
+        video_id (int): Id of the video.
+        streams (List[Dict]): Fields of the `SubtitleStream`s to extract.
+        run_id (Optional[int]): Processing run to report progress to.
+
+    Returns:
+        int: Number of subtitles saved across the group.
+    """
+    streams = [SubtitleStream(**stream) for stream in streams]
+    processor = VideoProcessor(
+        video_id, languages=[stream.language for stream in streams], run_id=run_id
+    )
+    return sum(processor.process(streams=streams).values())
+
+
+@instrumented_task(name="lexicon.video.extraction.finalize_video_processing")
+def finalize_video_processing(saved_counts, video_id, run_id=None):
+    """
+    Celery callback that runs once every subtitle subtask of a video has finished.
     """
-    processor = VideoProcessor(video_id, language=language)
-    processor.process()
+    if run_id is not None:
+        VideoProcessingRun.advance(run_id, Status.COMPLETED)
+    logger.info(
+        f"Finished processing video {video_id}: {sum(saved_counts)} subtitles saved "
+        f"in {len(saved_counts)} extraction subtask(s)."
+    )
@@ -0,0 +1,370 @@
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from django.conf import settings
+
+from lexicon.utils.semaphore import LeaseSemaphore
+
+logger = logging.getLogger(__name__)
+
+# Never prompt (e.g. before overwriting an output) and never read the worker's stdin.
+NON_INTERACTIVE_FLAGS = ["-nostdin", "-y", "-hide_banner", "-nostats"]
+
+# Subtitle codecs ffmpeg can convert to SRT. Bitmap subtitles (PGS, VobSub, DVB)
+# need OCR and are skipped.
+TEXT_SUBTITLE_CODECS = frozenset({"subrip", "srt", "ass", "ssa", "mov_text", "webvtt", "text"})
+
+UNDETERMINED_LANGUAGE = "und"
+
+
+@dataclass(frozen=True)
+class SubtitleStream:
+    """
+    A subtitle stream discovered in a media container by ffprobe.
+
+    Attributes:
+        index (int): Absolute stream index inside the container, usable as `-map 0:<index>`.
+        codec_name (str): Codec reported by ffprobe, e.g. 'subrip' or 'hdmv_pgs_subtitle'.
+        language (str): ISO 639-2 language tag, or 'und' when the stream is untagged.
+    """
+
+    index: int
+    codec_name: str
+    language: str
+
+    @property
+    def is_text(self) -> bool:
+        return self.codec_name in TEXT_SUBTITLE_CODECS
+
+
+def probe_command(input_path: str) -> List[str]:
+    """
+    Build the ffprobe command listing the subtitle streams of a media file, at lowered
+    priority.
+    """
+    return priority_prefix() + [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "s",
+        "-show_entries",
+        "stream=index,codec_name:stream_tags=language",
+        "-of",
+        "json",
+        input_path,
+    ]
+
+
+def parse_probe_output(output: str) -> List[SubtitleStream]:
+    """
+    Parse the JSON printed by the `probe_command` ffprobe call.
+    """
+    payload = json.loads(output or "{}")
+
+    streams = []
+    for stream in payload.get("streams", []):
+        tags = stream.get("tags") or {}
+        streams.append(
+            SubtitleStream(
+                index=int(stream["index"]),
+                codec_name=stream.get("codec_name", ""),
+                language=(tags.get("language") or UNDETERMINED_LANGUAGE).lower(),
+            )
+        )
+    return streams
+
+
+def probe_subtitle_streams(input_path: str) -> List[SubtitleStream]:
+    """
+    List the subtitle streams of a media file with a single ffprobe call.
+
+    Args:
+        input_path (str): Path of the media file to inspect.
+
+    Returns:
+        List[SubtitleStream]: Subtitle streams in container order.
+    """
+    result = subprocess.run(
+        probe_command(input_path),
+        check=True,
+        capture_output=True,
+        text=True,
+        stdin=subprocess.DEVNULL,
+        timeout=settings.FFPROBE_TIMEOUT,
+    )
+    streams = parse_probe_output(result.stdout)
+
+    logger.debug("Probed %s subtitle stream(s) in %s", len(streams), input_path)
+    return streams
+
+
+def priority_prefix() -> List[str]:
+    """
+    Command prefix that lowers the CPU and IO priority of a child process, so media jobs
+    don't starve the web and database processes on the same host. Tools missing on the
+    host are skipped.
+    """
+    prefix = []
+    if settings.FFMPEG_IONICE_CLASS and shutil.which("ionice"):
+        prefix += ["ionice", "-c", str(settings.FFMPEG_IONICE_CLASS)]
+        if settings.FFMPEG_IONICE_CLASS == 2:
+            prefix += ["-n", str(settings.FFMPEG_IONICE_LEVEL)]
+    if settings.FFMPEG_NICENESS and shutil.which("nice"):
+        prefix += ["nice", "-n", str(settings.FFMPEG_NICENESS)]
+    return prefix
+
+
+@dataclass
+class FFmpegProgress:
+    """
+    A single block of ffmpeg's `-progress` output.
+
+    Attributes:
+        out_time_ms (int): Position reached in the output, in milliseconds.
+        speed (Optional[float]): Processing speed relative to real time, if reported.
+        finished (bool): Whether this is the final block.
+        values (Dict[str, str]): All raw key/value pairs of the block.
+    """
+
+    out_time_ms: int = 0
+    speed: Optional[float] = None
+    finished: bool = False
+    values: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_values(cls, values: Dict[str, str]) -> "FFmpegProgress":
+        # Despite its name, ffmpeg reports `out_time_ms` (and `out_time_us`) in microseconds.
+        out_time_us = values.get("out_time_us") or values.get("out_time_ms") or ""
+        speed = values.get("speed", "").rstrip("x")
+        return cls(
+            out_time_ms=int(out_time_us) // 1000 if out_time_us.lstrip("-").isdigit() else 0,
+            speed=float(speed) if speed.replace(".", "", 1).isdigit() else None,
+            finished=values.get("progress") == "end",
+            values=values,
+        )
+
+
+def parse_progress(lines: Iterable[str]) -> Iterator[FFmpegProgress]:
+    """
+    Parse ffmpeg `-progress` output, yielding a block each time one is complete.
+
+    Args:
+        lines (Iterable[str]): `key=value` lines, e.g. an open text stream of the progress pipe.
+
+    Yields:
+        FFmpegProgress: One entry per block; blocks end with a `progress=...` line.
+    """
+    values = {}
+    for line in lines:
+        key, separator, value = line.strip().partition("=")
+        if not separator:
+            continue
+        values[key] = value
+        if key == "progress":
+            yield FFmpegProgress.from_values(values)
+            values = {}
+
+
+class FFmpegProcess:
+    """
+    A running ffmpeg process started by `FFmpegRunner`.
+
+    A watchdog kills the process once it exceeds its hard timeout or stops reporting
+    progress for longer than the stall timeout. `close()` must always be called, it kills
+    the process if still running and releases its concurrency slot; the handle is also a
+    context manager that does so.
+    """
+
+    def __init__(self, popen, stderr, progress_fd, release, timeout, stall_timeout, on_progress):
+        self.popen = popen
+        self.args = popen.args
+        self.stdout = popen.stdout
+        self.progress = None
+        self.timed_out = None
+        self._stderr = stderr
+        self._release = release
+        self._on_progress = on_progress
+        self._timeout = timeout
+        self._stall_timeout = stall_timeout
+        self._started = self._last_progress = time.monotonic()
+        self._done = threading.Event()
+
+        self._threads = [threading.Thread(target=self._watch, daemon=True)]
+        if progress_fd is not None:
+            progress = os.fdopen(progress_fd, "r", encoding="utf-8", errors="replace")
+            self._threads.append(
+                threading.Thread(target=self._read_progress, args=(progress,), daemon=True)
+            )
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read_progress(self, stream):
+        with stream:
+            for progress in parse_progress(stream):
+                self.progress = progress
+                self._last_progress = time.monotonic()
+                if self._on_progress is not None:
+                    self._on_progress(progress)
+
+    def _watch(self):
+        while not self._done.wait(1):
+            if self.popen.poll() is not None:
+                return
+            now = time.monotonic()
+            if self._timeout and now - self._started > self._timeout:
+                self.timed_out = self._timeout
+            elif self._stall_timeout and now - self._last_progress > self._stall_timeout:
+                self.timed_out = self._stall_timeout
+            else:
+                continue
+            logger.error(f"Killing ffmpeg after {self.timed_out}s without finishing: {self.args}")
+            self.popen.kill()
+            return
+
+    def poll(self) -> Optional[int]:
+        return self.popen.poll()
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        return self.popen.wait(timeout)
+
+    @property
+    def stderr(self) -> str:
+        self._stderr.seek(0)
+        return self._stderr.read().decode("utf-8", errors="replace").strip()
+
+    def check_returncode(self):
+        """
+        Wait for the process and raise if it was killed by the watchdog or failed.
+
+        Raises:
+            subprocess.TimeoutExpired: If the process exceeded its timeout or stalled.
+            subprocess.CalledProcessError: If the process exited with a nonzero status.
+        """
+        returncode = self.wait()
+        if self.timed_out is not None:
+            raise subprocess.TimeoutExpired(self.args, self.timed_out, stderr=self.stderr)
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, self.args, stderr=self.stderr)
+
+    def close(self):
+        if self._done.is_set():
+            return
+        self._done.set()
+        try:
+            if self.popen.poll() is None:
+                self.popen.kill()
+            self.popen.wait()
+            for thread in self._threads:
+                thread.join()
+            self._stderr.close()
+        finally:
+            self._release()
+
+
+class FFmpegRunner:
+    """
+    Starts ffmpeg processes under the project's resource limits:
+
+    - non-interactive flags, so ffmpeg never waits on stdin;
+    - lowered CPU and IO priority (see `priority_prefix`);
+    - a hard timeout, plus a stall timeout driven by `-progress` output;
+    - a per-host cap on concurrent ffmpeg processes shared by every worker, backed by a
+      Redis lease semaphore.
+
+    Usage:
+        with FFmpegRunner().start(["-i", path, "-f", "srt", "pipe:1"]) as process:
+            ...
+            process.check_returncode()
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[int] = None,
+        stall_timeout: Optional[int] = None,
+        max_processes: Optional[int] = None,
+        slot_timeout: Optional[int] = None,
+    ):
+        self.timeout = settings.FFMPEG_TIMEOUT if timeout is None else timeout
+        self.stall_timeout = (
+            settings.FFMPEG_STALL_TIMEOUT if stall_timeout is None else stall_timeout
+        )
+        self.slot_timeout = settings.FFMPEG_SLOT_TIMEOUT if slot_timeout is None else slot_timeout
+        self.semaphore = LeaseSemaphore(
+            "ffmpeg",
+            limit=settings.FFMPEG_MAX_PROCESSES if max_processes is None else max_processes,
+            # Outlive the hard timeout, so a lease only expires when its holder is gone
+            lease_seconds=self.timeout + 60 if self.timeout else 24 * 60 * 60,
+        )
+
+    def build_command(self, args: Sequence[str], progress_target: Optional[str] = None):
+        command = priority_prefix() + ["ffmpeg", *NON_INTERACTIVE_FLAGS]
+        if progress_target is not None:
+            command += ["-progress", progress_target]
+        return command + list(args)
+
+    def start(
+        self,
+        args: Sequence[str],
+        stdout=None,
+        pass_fds: Sequence[int] = (),
+        on_progress: Optional[Callable[[FFmpegProgress], None]] = None,
+    ) -> FFmpegProcess:
+        """
+        Wait for a free ffmpeg slot on this host and start ffmpeg with `args`.
+
+        Args:
+            args (Sequence[str]): ffmpeg arguments, without the executable and global flags.
+            stdout: Passed on to `subprocess.Popen`.
+            pass_fds (Sequence[int]): Extra file descriptors the process writes to. The
+                caller still owns and must close them.
+            on_progress (Optional[Callable]): Called with every `FFmpegProgress` block.
+
+        Returns:
+            FFmpegProcess: Handle of the running process.
+
+        Raises:
+            SemaphoreTimeout: If no slot became free within the slot timeout.
+        """
+        token = self.semaphore.acquire(timeout=self.slot_timeout)
+        stderr = tempfile.TemporaryFile()
+        progress_fd, progress_write_fd = os.pipe()
+        try:
+            popen = subprocess.Popen(
+                self.build_command(args, progress_target=f"pipe:{progress_write_fd}"),
+                stdin=subprocess.DEVNULL,
+                stdout=stdout,
+                stderr=stderr,
+                pass_fds=[*pass_fds, progress_write_fd],
+            )
+        except Exception:
+            os.close(progress_fd)
+            stderr.close()
+            self.semaphore.release(token)
+            raise
+        finally:
+            os.close(progress_write_fd)
+
+        return FFmpegProcess(
+            popen,
+            stderr=stderr,
+            progress_fd=progress_fd,
+            release=lambda: self.semaphore.release(token),
+            timeout=self.timeout,
+            stall_timeout=self.stall_timeout,
+            on_progress=on_progress,
+        )
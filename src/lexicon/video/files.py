@@ -0,0 +1,101 @@
+import mimetypes
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+
+from lexicon.utils.lru import LRUCache
+
+from .models import Video
+
+__all__ = [
+    "VideoFileInfo",
+    "get_video_file",
+    "forget_video_file",
+]
+
+VIDEO_CONTENT_TYPES = {
+    ".mp4": "video/mp4",
+    ".m4v": "video/mp4",
+    ".mov": "video/quicktime",
+    ".webm": "video/webm",
+    ".mkv": "video/x-matroska",
+}
+
+_files = LRUCache(maxsize=settings.VIDEO_FILE_CACHE_SIZE, ttl=settings.VIDEO_FILE_CACHE_TTL)
+
+
+@dataclass(frozen=True)
+class VideoFileInfo:
+    """
+    What playback and subtitle routes need to know about a stored video file.
+
+    Attributes:
+        video_id (int): Id of the video owning the file.
+        path (str): Absolute path of the file.
+        size (int): Size of the file in bytes.
+        mtime_ns (int): Modification time of the file in nanoseconds.
+        content_type (str): Content type of the file.
+    """
+
+    video_id: int
+    path: str
+    size: int
+    mtime_ns: int
+    content_type: str
+
+
+def guess_content_type(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    return (
+        VIDEO_CONTENT_TYPES.get(extension)
+        or mimetypes.guess_type(path)[0]
+        or "application/octet-stream"
+    )
+
+
+def get_video_file(file_key: str) -> Optional[VideoFileInfo]:
+    """
+    Look up a stored video file by its `Video.file_key`, through a per-process LRU.
+
+    Browsers send many range requests for each playback, so after the first one resolving a
+    file costs a dictionary lookup instead of a query and filesystem calls.
+
+    Args:
+        file_key (str): The file key from the URL.
+
+    Returns:
+        Optional[VideoFileInfo]: The file, or None if there is no such video or its file is
+            missing.
+    """
+    info = _files.get(file_key)
+    if info is not None:
+        return info
+
+    video = Video.objects.filter(file_key=file_key).only("id", "video_file").first()
+    if video is None:
+        return None
+    try:
+        stat = os.stat(video.video_file.path)
+    except FileNotFoundError:
+        return None
+
+    info = VideoFileInfo(
+        video_id=video.id,
+        path=video.video_file.path,
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        content_type=guess_content_type(video.video_file.name),
+    )
+    _files.set(file_key, info)
+    return info
+
+
+def forget_video_file(file_key: Optional[str]):
+    """
+    Drop a file from this process's cache, e.g. after its video changed or its file was
+    replaced.
+    """
+    if file_key:
+        _files.delete(file_key)
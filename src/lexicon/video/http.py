@@ -0,0 +1,417 @@
+import os
+import uuid
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from .telemetry import MeteredReader, StreamMeter
+
+# Read size when the server streams a response by calling `read()` instead of `sendfile()`
+PLAYBACK_BLOCK_SIZE = 512 * 1024
+
+# Requests for more ranges than this are answered with the whole file, as RFC 7233 allows,
+# so a client can't make the server assemble thousands of tiny parts
+MAX_RANGES = 16
+
+# Statuses of conditional request failures, which can be answered from a cached stat
+CONDITIONAL_STATUSES = (304, 412)
+
+# `PLAYBACK_OFFLOAD` modes: the header the fronting web server serves files for
+OFFLOAD_X_ACCEL_REDIRECT = "x-accel-redirect"  # nginx
+OFFLOAD_X_SENDFILE = "x-sendfile"  # Apache mod_xsendfile, lighttpd
+OFFLOAD_HEADERS = {
+    OFFLOAD_X_ACCEL_REDIRECT: "X-Accel-Redirect",
+    OFFLOAD_X_SENDFILE: "X-Sendfile",
+}
+
+
+class RangedFileReader:
+    """
+    A read-only window of `length` bytes of an open file, starting at `start`.
+
+    The file is positioned at `start`, so WSGI servers that send `wsgi.file_wrapper`
+    responses with `sendfile()` (gunicorn, uWSGI) copy exactly the window from the page
+    cache to the socket, using `fileno()`, the current file offset and the `Content-Length`
+    of the response. Servers that iterate the response instead call `read()`, which never
+    returns bytes past the window.
+    """
+
+    def __init__(self, file: BinaryIO, start: int = 0, length: Optional[int] = None):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining is None:
+            return self.file.read(size)
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b""
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+class PlaybackFileResponse(FileResponse):
+    """
+    A `FileResponse` for media files. WSGI servers send it through `wsgi.file_wrapper`,
+    zero-copy where they support it; otherwise it is read in large blocks.
+    """
+
+    block_size = PLAYBACK_BLOCK_SIZE
+
+
+def inline_disposition(filename: str) -> str:
+    """
+    An inline `Content-Disposition` for `filename`, quoted like Django's `FileResponse` does.
+    """
+    try:
+        filename.encode("ascii")
+        return f'inline; filename="{filename}"'
+    except UnicodeEncodeError:
+        return f"inline; filename*=utf-8''{quote(filename)}"
+
+
+def offload_response(
+    file_path: str, content_type: str, filename: str = ""
+) -> Optional[HttpResponse]:
+    """
+    Build an empty response that hands serving `file_path` off to the fronting web server,
+    which then streams the file and handles range requests itself while the app worker is
+    free again.
+
+    With `X-Accel-Redirect` the file is addressed by its path below `MEDIA_ROOT`, under the
+    internal location `PLAYBACK_OFFLOAD_PREFIX`; with `X-Sendfile` by its absolute path.
+
+    Args:
+        file_path (str): Absolute path of the file to serve.
+        content_type (str): Content type of the file.
+        filename (str): Name sent in an inline `Content-Disposition`, if given.
+
+    Returns:
+        Optional[HttpResponse]: The response, or None if offloading is disabled or the file
+            isn't below `MEDIA_ROOT` for `X-Accel-Redirect`.
+    """
+    mode = settings.PLAYBACK_OFFLOAD
+    if not mode:
+        return None
+    if mode not in OFFLOAD_HEADERS:
+        raise ImproperlyConfigured(
+            f"PLAYBACK_OFFLOAD must be one of {', '.join(OFFLOAD_HEADERS)}, not '{mode}'"
+        )
+
+    if mode == OFFLOAD_X_ACCEL_REDIRECT:
+        media_root = os.path.realpath(settings.MEDIA_ROOT)
+        real_path = os.path.realpath(file_path)
+        if os.path.commonpath([media_root, real_path]) != media_root:
+            return None
+        relative_path = os.path.relpath(real_path, media_root).replace(os.sep, "/")
+        location = settings.PLAYBACK_OFFLOAD_PREFIX.rstrip("/") + "/" + quote(relative_path)
+    else:
+        location = file_path
+
+    response = HttpResponse(content_type=content_type)
+    response[OFFLOAD_HEADERS[mode]] = location
+    if filename:
+        response["Content-Disposition"] = inline_disposition(filename)
+    return response
+
+
+def parse_range_header(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parse a `Range` header (RFC 7233) against a representation of `size` bytes.
+
+    Supports `first-last`, open-ended `first-` and suffix `-length` ranges, any number of
+    them. Overlapping and adjacent ranges are coalesced.
+
+    Args:
+        header (str): Value of the `Range` header.
+        size (int): Size of the file in bytes.
+
+    Returns:
+        Optional[List[Tuple[int, int]]]: Sorted inclusive `(first, last)` byte positions; an
+            empty list if no range is satisfiable (416); None if the header is invalid, not
+            in bytes or asks for too many ranges, in which case it must be ignored (200).
+    """
+    unit, separator, specs = header.partition("=")
+    if not separator or unit.strip().lower() != "bytes":
+        return None
+
+    specs = [spec.strip() for spec in specs.split(",") if spec.strip()]
+    if not specs:
+        return None
+    ranges = []
+    for spec in specs:
+        byte_range = _parse_range_spec(spec, size)
+        if byte_range is None:
+            return None
+        if byte_range:
+            ranges.append(byte_range)
+    if len(ranges) > MAX_RANGES:
+        return None
+
+    coalesced = []
+    for start, end in sorted(ranges):
+        if coalesced and start <= coalesced[-1][1] + 1:
+            coalesced[-1] = (coalesced[-1][0], max(end, coalesced[-1][1]))
+        else:
+            coalesced.append((start, end))
+    return coalesced
+
+
+def _parse_range_spec(spec: str, size: int):
+    """
+    Parse one range of a `Range` header into inclusive byte positions. Returns an empty
+    tuple for an unsatisfiable range and None for an invalid one.
+    """
+    first, separator, last = (part.strip() for part in spec.partition("-"))
+    if not separator or not (first or last):
+        return None
+    if (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+    if not first:
+        # Suffix range: the last `last` bytes
+        if int(last) == 0 or size == 0:
+            return ()
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return ()
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def file_etag(size: int, mtime_ns: int) -> str:
+    """
+    Strong ETag of a file, from its size and modification time. Files are replaced rather
+    than modified in place, so both change whenever the content does.
+    """
+    return f'"{size:x}-{mtime_ns:x}"'
+
+
+def if_range_passes(if_range: Optional[str], etag: str, last_modified: int) -> bool:
+    """
+    Whether the `Range` header of a request applies: with `If-Range` it only does if the
+    client's copy is current, judged by a strong ETag match or an exact date match.
+    """
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+@dataclass
+class FilePlan:
+    """
+    How to answer a request for a file, decided from the request and the file's stat alone,
+    so synchronous and asynchronous servers send the same responses.
+
+    Attributes:
+        status (int): Status code of the response.
+        headers (Dict[str, str]): Response headers, including `Content-Length`.
+        parts (List[Tuple[bytes, int, int]]): The body: for each part, the bytes sent before
+            it and the `(start, length)` window of the file. Empty if there is no body.
+        closing (bytes): Bytes sent after the last part, e.g. a multipart boundary.
+    """
+
+    status: int
+    headers: Dict[str, str]
+    parts: List[Tuple[bytes, int, int]] = field(default_factory=list)
+    closing: bytes = b""
+
+    @property
+    def content_length(self) -> int:
+        return sum(len(header) + length for header, _start, length in self.parts) + len(
+            self.closing
+        )
+
+
+def plan_file_response(
+    request, size: int, mtime_ns: int, content_type: str, filename: str = ""
+) -> FilePlan:
+    """
+    Decide the response to a request for a file of `size` bytes last modified at
+    `mtime_ns`: a 304 or 412 for conditional requests, a 416 for unsatisfiable ranges, a 206
+    for one or several ranges, or a 200 with the whole file.
+
+    Args:
+        request (HttpRequest): The request.
+        size (int): Size of the file in bytes.
+        mtime_ns (int): Modification time of the file in nanoseconds.
+        content_type (str): Content type of the file.
+        filename (str): Name sent in an inline `Content-Disposition` of full responses.
+
+    Returns:
+        FilePlan: The response to send.
+    """
+    etag, last_modified = file_etag(size, mtime_ns), mtime_ns // 10**9
+    validators = {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Accept-Ranges": "bytes",
+    }
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        return FilePlan(conditional.status_code, validators)
+
+    ranges = None
+    range_header = request.headers.get("Range")
+    if range_header and if_range_passes(request.headers.get("If-Range"), etag, last_modified):
+        ranges = parse_range_header(range_header, size)
+
+    if ranges == []:
+        return FilePlan(
+            416, {**validators, "Content-Range": f"bytes */{size}", "Content-Length": "0"}
+        )
+    if ranges is None:
+        plan = FilePlan(200, {**validators, "Content-Type": content_type}, [(b"", 0, size)])
+        if filename:
+            plan.headers["Content-Disposition"] = inline_disposition(filename)
+    elif len(ranges) == 1:
+        start, end = ranges[0]
+        plan = FilePlan(
+            206,
+            {
+                **validators,
+                "Content-Type": content_type,
+                "Content-Range": f"bytes {start}-{end}/{size}",
+            },
+            [(b"", start, end - start + 1)],
+        )
+    else:
+        boundary = uuid.uuid4().hex
+        plan = FilePlan(
+            206,
+            {**validators, "Content-Type": f"multipart/byteranges; boundary={boundary}"},
+            _multipart_parts(ranges, size, content_type, boundary),
+            f"\r\n--{boundary}--\r\n".encode("latin-1"),
+        )
+    plan.headers["Content-Length"] = str(plan.content_length)
+    return plan
+
+
+def _multipart_parts(
+    ranges: List[Tuple[int, int]], size: int, content_type: str, boundary: str
+) -> List[Tuple[bytes, int, int]]:
+    return [
+        (
+            (
+                f"\r\n--{boundary}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+            ).encode("latin-1"),
+            start,
+            end - start + 1,
+        )
+        for start, end in ranges
+    ]
+
+
+def _stream_multipart(file: BinaryIO, plan: FilePlan) -> Iterator[bytes]:
+    for header, start, length in plan.parts:
+        yield header
+        reader = RangedFileReader(file, start, length)
+        yield from iter(lambda: reader.read(PLAYBACK_BLOCK_SIZE), b"")
+    yield plan.closing
+
+
+def serve_file(
+    request,
+    file_path: str,
+    content_type: str,
+    filename: str = "",
+    cached_stat: Optional[Tuple[int, int]] = None,
+    meter: Optional[StreamMeter] = None,
+) -> HttpResponse:
+    """
+    Serve a file with conditional request and byte range support (RFC 7232, RFC 7233).
+
+    - `ETag`/`Last-Modified` validators, so `If-None-Match`/`If-Modified-Since` revalidations
+      get a 304 and `If-Match`/`If-Unmodified-Since` failures a 412;
+    - single ranges as a 206 that servers can `sendfile()`, multiple ranges as
+      `multipart/byteranges`, and unsatisfiable ranges as a 416;
+    - `If-Range`, so a client resuming a file that changed gets the whole new file;
+    - `HEAD`, answered with the headers of the equivalent GET and no body.
+
+    The file is opened before its size and validators are read, so they always describe the
+    bytes sent, even if the file is replaced meanwhile. Revalidations can be answered from a
+    cached `(size, mtime_ns)` without touching the file at all; a 304 based on a slightly
+    stale stat is harmless, since files are only replaced by equivalent media (remuxes).
+
+    Args:
+        request (HttpRequest): The request.
+        file_path (str): Path of the file.
+        content_type (str): Content type of the file.
+        filename (str): Name sent in an inline `Content-Disposition` of full responses.
+        cached_stat (Optional[Tuple[int, int]]): Size and modification time of the file, in
+            nanoseconds, as last seen by the caller.
+        meter (Optional[StreamMeter]): Records the response in the playback telemetry.
+
+    Returns:
+        HttpResponse: The response.
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist.
+    """
+    if cached_stat is not None:
+        plan = plan_file_response(request, *cached_stat, content_type, filename)
+        if plan.status in CONDITIONAL_STATUSES:
+            return _empty_response(plan, meter)
+
+    file = open(file_path, "rb")
+    try:
+        stat = os.fstat(file.fileno())
+        plan = plan_file_response(request, stat.st_size, stat.st_mtime_ns, content_type, filename)
+    except Exception:
+        file.close()
+        raise
+    if not plan.parts or request.method == "HEAD":
+        file.close()
+        return _empty_response(plan, meter)
+
+    response = _body_response(file, plan, meter)
+    for header, value in plan.headers.items():
+        response[header] = value
+    if meter is not None:
+        meter.attach(response, plan)
+    return response
+
+
+def _body_response(file: BinaryIO, plan: FilePlan, meter: Optional[StreamMeter]) -> HttpResponse:
+    if len(plan.parts) == 1 and not plan.closing:
+        _header, start, length = plan.parts[0]
+        reader = RangedFileReader(file, start, length)
+        if meter is not None:
+            reader = MeteredReader(reader, meter)
+        return PlaybackFileResponse(reader, status=plan.status)
+
+    parts = _stream_multipart(file, plan)
+    if meter is not None:
+        parts = meter.wrap(parts)
+    response = StreamingHttpResponse(parts, status=plan.status)
+    # The generator may never run, so close the file with the response
+    response._resource_closers.append(file.close)
+    return response
+
+
+def _empty_response(plan: FilePlan, meter: Optional[StreamMeter] = None) -> HttpResponse:
+    response = HttpResponseNotModified() if plan.status == 304 else HttpResponse(status=plan.status)
+    for header, value in plan.headers.items():
+        response[header] = value
+    if meter is not None:
+        meter.attach(response, plan, send_body=False)
+    return response
@@ -0,0 +1,67 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lexicon.video.benchmarks import ExtractionBenchmark, build_report, find_regressions
+
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every stage of the subtitle extraction pipeline on synthetic SRT tracks "
+        "and generated media, and optionally fail on throughput regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default=DEFAULT_SIZES,
+            help=f"Comma separated cue counts of the SRT benchmarks (default: {DEFAULT_SIZES}).",
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per stage and size.")
+        parser.add_argument(
+            "--media-cues",
+            type=int,
+            default=10000,
+            help="Cues per stream of the generated media file; 0 skips the ffmpeg stages.",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+        parser.add_argument("--baseline", help="JSON report of a previous run to compare with.")
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.1,
+            help="Allowed throughput drop against the baseline, as a fraction (default: 0.1).",
+        )
+
+    def handle(self, *args, sizes, repeat, media_cues, output, baseline, tolerance, **options):
+        try:
+            sizes = [int(size) for size in sizes.split(",") if size.strip()]
+        except ValueError:
+            raise CommandError("--sizes must be a comma separated list of integers.")
+
+        benchmark = ExtractionBenchmark(
+            sizes, repeat=repeat, media_cues=media_cues, log=self.stderr.write
+        )
+        report = build_report(benchmark.run())
+
+        if output:
+            with open(output, "w") as report_file:
+                json.dump(report, report_file, indent=2)
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+        if not baseline:
+            return
+
+        with open(baseline) as baseline_file:
+            regressions = find_regressions(json.load(baseline_file), report, tolerance)
+        for regression in regressions:
+            self.stderr.write(
+                f"Regression in {regression['stage']} ({regression['cues']:,} cues): "
+                f"{regression['baseline_cues_per_second']:,.0f} -> "
+                f"{regression['cues_per_second']:,.0f} cues/sec ({regression['change']:+.1%})"
+            )
+        if regressions:
+            raise CommandError(f"{len(regressions)} stage(s) regressed beyond {tolerance:.0%}.")
@@ -0,0 +1,145 @@
+import os
+import resource
+import socket
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory
+
+from lexicon.video.http import serve_file
+
+# Per-thread CPU time, so the thread draining the socket isn't counted (Linux only)
+RUSAGE_SERVER = getattr(resource, "RUSAGE_THREAD", resource.RUSAGE_SELF)
+SENDFILE_BLOCK_SIZE = 0x3FFFFFFF
+DRAIN_BUFFER_SIZE = 1024 * 1024
+GB = 1024**3
+
+
+def legacy_response(file_path, start=0, end=None):
+    """
+    The previous playback path: the file is read in Python in 8 KB chunks and yielded through
+    a `StreamingHttpResponse`.
+    """
+
+    def stream():
+        with open(file_path, "rb") as f:
+            f.seek(start)
+            remaining = (end - start) if end else None
+            while remaining is None or remaining > 0:
+                chunk = f.read(8192)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    chunk = chunk[:remaining]
+                    remaining -= len(chunk)
+                yield chunk
+
+    return StreamingHttpResponse(stream(), content_type="video/mp4")
+
+
+def send_response(response, sock, use_sendfile):
+    """
+    Write a response body to `sock` the way a WSGI server does: with `sendfile()` for
+    `wsgi.file_wrapper` responses like gunicorn, or by iterating the response.
+    """
+    filelike = getattr(response, "file_to_stream", None)
+    if use_sendfile and filelike is not None and hasattr(filelike, "fileno"):
+        fileno = filelike.fileno()
+        offset = os.lseek(fileno, 0, os.SEEK_CUR)
+        nbytes = int(response["Content-Length"])
+        sent = 0
+        while sent < nbytes:
+            sent += os.sendfile(
+                sock.fileno(), fileno, offset + sent, min(nbytes - sent, SENDFILE_BLOCK_SIZE)
+            )
+    else:
+        for chunk in response:
+            sock.sendall(chunk)
+    response.close()
+
+
+def drain(sock, nbytes):
+    buffer = bytearray(DRAIN_BUFFER_SIZE)
+    received = 0
+    while received < nbytes:
+        count = sock.recv_into(buffer)
+        if not count:
+            break
+        received += count
+
+
+class Command(BaseCommand):
+    help = "Compare CPU time per GB served by the playback paths, for full and ranged responses."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size-mb", type=int, default=256, help="Size of the served file.")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per path.")
+
+    def handle(self, *args, size_mb, repeat, **options):
+        file_size = size_mb * 1024 * 1024
+        file_path = os.path.join(settings.MEDIA_ROOT, "videos", f"benchmark-{uuid.uuid4().hex}")
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1024 * 1024))
+
+        start, end = file_size // 4, file_size // 4 * 3 - 1
+        full_request = RequestFactory().get("/")
+        range_request = RequestFactory().get("/", HTTP_RANGE=f"bytes={start}-{end}")
+        paths = {
+            "generator (8 KB)": (
+                lambda: legacy_response(file_path),
+                lambda: legacy_response(file_path, start, end + 1),
+                False,
+            ),
+            "file_wrapper read": (
+                lambda: serve_file(full_request, file_path, "video/mp4"),
+                lambda: serve_file(range_request, file_path, "video/mp4"),
+                False,
+            ),
+            "file_wrapper sendfile": (
+                lambda: serve_file(full_request, file_path, "video/mp4"),
+                lambda: serve_file(range_request, file_path, "video/mp4"),
+                True,
+            ),
+        }
+        try:
+            # Serve once first, so every path reads the file from the page cache
+            self.measure(paths["generator (8 KB)"][0], file_size, False)
+            for name, (full, ranged, use_sendfile) in paths.items():
+                for kind, build, nbytes in (
+                    ("full", full, file_size),
+                    ("range", ranged, end - start + 1),
+                ):
+                    cpu, wall = min(
+                        (self.measure(build, nbytes, use_sendfile) for _ in range(repeat)),
+                        key=lambda timing: timing[0],
+                    )
+                    self.stdout.write(
+                        f"{name:<22} {kind:<6} {cpu * GB / nbytes:>8.3f} CPU s/GB  "
+                        f"{nbytes / wall / 1024 ** 2:>9,.0f} MB/s  (best of {repeat})"
+                    )
+        finally:
+            os.remove(file_path)
+
+    @staticmethod
+    def measure(build_response, nbytes, use_sendfile):
+        server, client = socket.socketpair()
+        reader = threading.Thread(target=drain, args=(client, nbytes))
+        reader.start()
+        try:
+            usage = resource.getrusage(RUSAGE_SERVER)
+            started = time.perf_counter()
+            send_response(build_response(), server, use_sendfile)
+            wall = time.perf_counter() - started
+            after = resource.getrusage(RUSAGE_SERVER)
+        finally:
+            server.close()
+            reader.join()
+            client.close()
+        cpu = (after.ru_utime - usage.ru_utime) + (after.ru_stime - usage.ru_stime)
+        return cpu, wall
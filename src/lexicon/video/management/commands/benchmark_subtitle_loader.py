@@ -0,0 +1,64 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from lexicon.video.benchmarks import generate_subtitle_entries
+from lexicon.video.models import Subtitle, Video
+from lexicon.video.services.subtitle import load_subtitles
+
+
+def load_with_bulk_create(video_id, language, subtitle_entries, batch_size=1000):
+    """
+    The previous loading path: one `Subtitle` instance per cue, saved with `bulk_create`.
+    """
+    subtitles_to_create = [
+        Subtitle(
+            video_id=video_id,
+            language=language,
+            cc_subtitle=entry["cc_subtitle"],
+            start_ms=entry["start_ms"],
+            end_ms=entry["end_ms"],
+        )
+        for entry in subtitle_entries
+    ]
+    Subtitle.objects.bulk_create(subtitles_to_create, batch_size=batch_size)
+    return len(subtitles_to_create)
+
+
+class Command(BaseCommand):
+    help = "Compare subtitle load throughput (rows/sec) of the COPY loader and bulk_create."
+
+    loaders = {
+        "bulk_create": load_with_bulk_create,
+        "copy": load_subtitles,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50000, help="Cues loaded per run.")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per loader.")
+
+    def handle(self, *args, rows, repeat, **options):
+        name = f"benchmark-{uuid.uuid4().hex}"
+        video = Video.objects.create(
+            title=name,
+            description="Subtitle loader benchmark",
+            video_file=f"videos/{name}.webm",
+        )
+        try:
+            for name, loader in self.loaders.items():
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    with transaction.atomic():
+                        loader(video.id, "eng", generate_subtitle_entries(rows))
+                    timings.append(time.perf_counter() - started)
+                    Subtitle.objects.filter(video_id=video.id).delete()
+
+                best = min(timings)
+                self.stdout.write(
+                    f"{name:<12} {rows / best:>12,.0f} rows/sec  (best of {repeat}: {best:.3f}s)"
+                )
+        finally:
+            video.delete()
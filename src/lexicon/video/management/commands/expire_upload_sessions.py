@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from lexicon.video.services.upload import expire_upload_sessions
+
+
+class Command(BaseCommand):
+    help = "Fail upload sessions past their expiry time and remove their staging files."
+
+    def handle(self, *args, **options):
+        count = expire_upload_sessions()
+        self.stdout.write(f"Expired {count} upload session(s).")
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from lexicon.video.async_extraction import process_video_batch
+from lexicon.video.models import Video, VideoProcessingRun
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue subtitle extraction of stored videos in batches, each extracted concurrently by a "
+        "single worker, by default of every original upload without a completed processing run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("video_ids", nargs="*", type=int, help="Ids of the videos to extract")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.ASYNC_EXTRACTION_CONCURRENCY * 4,
+            help="Videos per queued batch",
+        )
+        parser.add_argument(
+            "--language", default=None, help="Only extract this language, e.g. 'eng'"
+        )
+
+    def handle(self, *args, **options):
+        videos = Video.objects.filter(source__isnull=True)
+        if options["video_ids"]:
+            videos = videos.filter(id__in=options["video_ids"])
+        else:
+            done = VideoProcessingRun.objects.filter(
+                status=VideoProcessingRun.Status.COMPLETED
+            ).values("video_id")
+            videos = videos.exclude(id__in=done)
+
+        video_ids = list(videos.order_by("id").values_list("id", flat=True))
+        batch_size = max(options["batch_size"], 1)
+        batches = [video_ids[i : i + batch_size] for i in range(0, len(video_ids), batch_size)]
+        for batch in batches:
+            process_video_batch.delay(batch, language=options["language"])
+        self.stdout.write(
+            f"Queued {len(video_ids)} video(s) for subtitle extraction in {len(batches)} batch(es)."
+        )
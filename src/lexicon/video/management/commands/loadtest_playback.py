@@ -0,0 +1,200 @@
+import asyncio
+import os
+import resource
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from lexicon.video.asgi import send_file
+from lexicon.video.http import serve_file
+
+# A client counts as keeping up if it received this share of the bytes its bitrate asked for
+KEPT_UP_RATIO = 0.9
+# Socket buffers between the server and the client's link, which absorb short server stalls
+LINK_BUFFER_SIZE = 256 * 1024
+RSS_SAMPLE_INTERVAL = 0.1
+
+
+class Link:
+    """
+    A client's network link of `bytes_per_second` behind a send buffer: writes return at
+    once while the buffer has room, and otherwise once the link carried enough of it.
+    """
+
+    def __init__(self, bytes_per_second: float, started: float, duration: float):
+        self.bytes_per_second = bytes_per_second
+        self.started = started
+        self.deadline = started + duration
+        self.busy_until = started
+        self.first_byte = None
+        self.received = 0
+
+    def write(self, nbytes: int) -> float:
+        """
+        Queue `nbytes` and return how long the writer blocks, or -1 once the client left.
+        """
+        now = time.perf_counter()
+        if self.first_byte is None:
+            self.first_byte = now - self.started
+        if now >= self.deadline:
+            return -1
+        start = max(self.busy_until, now)
+        self.busy_until = start + nbytes / self.bytes_per_second
+        # Only count what the link carries before the client leaves
+        self.received += max(min(nbytes, int((self.deadline - start) * self.bytes_per_second)), 0)
+        buffered = self.busy_until - LINK_BUFFER_SIZE / self.bytes_per_second
+        return min(max(buffered - now, 0), self.deadline - now)
+
+
+def current_rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+class RSSSampler(threading.Thread):
+    """
+    Samples the resident memory of the process until stopped, to report its peak growth.
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.baseline = self.peak = current_rss()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(RSS_SAMPLE_INTERVAL):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self) -> int:
+        self.stopped.set()
+        self.join()
+        return self.peak - self.baseline
+
+
+def asgi_client(file_path, link):
+    """
+    An ASGI client on `link`: `send` waits while the link's buffer is full, and the client
+    disconnects once its time is up.
+    """
+    disconnect = asyncio.Event()
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "query_string": b"",
+        "headers": [],
+    }
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] != "http.response.body":
+            return
+        delay = link.write(len(message["body"]))
+        if delay < 0:
+            disconnect.set()
+        elif delay:
+            await asyncio.sleep(delay)
+
+    return send_file(scope, receive, send, file_path, "video/mp4")
+
+
+def thread_client(file_path, link):
+    """
+    A client on `link` served by a worker thread, which blocks while the link's buffer is
+    full, like a blocking socket write would.
+    """
+    response = serve_file(RequestFactory().get("/"), file_path, "video/mp4")
+    try:
+        for chunk in response:
+            delay = link.write(len(chunk))
+            if delay < 0:
+                break
+            time.sleep(delay)
+    finally:
+        response.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare how many concurrent slow playback streams one process sustains with the "
+        "asynchronous ASGI path and with a pool of worker threads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--streams", type=int, default=2000, help="Concurrent clients.")
+        parser.add_argument(
+            "--bitrate", type=int, default=2000, help="Bitrate of each client in kbit/s."
+        )
+        parser.add_argument("--duration", type=float, default=10, help="Seconds per client.")
+        parser.add_argument(
+            "--threads", type=int, default=64, help="Worker threads of the threaded server."
+        )
+        parser.add_argument("--size-mb", type=int, default=64, help="Size of the served file.")
+
+    def handle(self, *args, streams, bitrate, duration, threads, size_mb, **options):
+        file_path = os.path.join(settings.MEDIA_ROOT, "videos", f"loadtest-{uuid.uuid4().hex}")
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1024 * 1024))
+
+        bytes_per_second = bitrate * 1000 / 8
+        self.stdout.write(
+            f"{streams} clients at {bitrate} kbit/s for {duration:g}s, {size_mb} MB file"
+        )
+        try:
+            for name, run in (
+                ("asgi (aiofiles)", self.run_asgi),
+                (f"threads ({threads})", lambda *args: self.run_threads(*args, threads=threads)),
+            ):
+                sampler = RSSSampler()
+                sampler.start()
+                usage = resource.getrusage(resource.RUSAGE_SELF)
+                started = time.perf_counter()
+                links = [Link(bytes_per_second, started, duration) for _ in range(streams)]
+                run(file_path, links)
+                after = resource.getrusage(resource.RUSAGE_SELF)
+                rss = sampler.stop()
+                cpu = (after.ru_utime - usage.ru_utime) + (after.ru_stime - usage.ru_stime)
+                self.report(name, links, bytes_per_second * duration, cpu, rss)
+        finally:
+            os.remove(file_path)
+
+    @staticmethod
+    def run_asgi(file_path, links):
+        async def run():
+            await asyncio.gather(*(asgi_client(file_path, link) for link in links))
+
+        asyncio.run(run())
+
+    @staticmethod
+    def run_threads(file_path, links, threads):
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for link in links:
+                executor.submit(thread_client, file_path, link)
+
+    def report(self, name, links, expected, cpu, rss):
+        kept_up = sum(link.received >= expected * KEPT_UP_RATIO for link in links)
+        waits = sorted(link.first_byte for link in links if link.first_byte is not None)
+        first_byte = (
+            f"p50 {statistics.median(waits) * 1000:,.0f}ms "
+            f"p95 {waits[int(len(waits) * 0.95) - 1] * 1000:,.0f}ms"
+            if waits
+            else "never"
+        )
+        self.stdout.write(
+            f"{name:<16} kept up {kept_up:>5}/{len(links)}  first byte {first_byte}  "
+            f"{cpu:.1f} CPU s  +{rss / 1024 ** 2:,.0f} MB RSS"
+        )
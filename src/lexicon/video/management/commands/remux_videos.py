@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from lexicon.video.models import Video, VideoRemux
+from lexicon.video.remux import remux_video
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue faststart remuxes of stored videos, by default of every original upload that "
+        "hasn't been remuxed yet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("video_ids", nargs="*", type=int, help="Ids of the videos to remux")
+
+    def handle(self, *args, **options):
+        videos = Video.objects.filter(source__isnull=True)
+        if options["video_ids"]:
+            videos = videos.filter(id__in=options["video_ids"])
+        else:
+            done = VideoRemux.objects.filter(
+                status__in=[VideoRemux.Status.COMPLETED, VideoRemux.Status.SKIPPED]
+            ).values("video_id")
+            videos = videos.exclude(id__in=done)
+
+        count = 0
+        for video_id in videos.values_list("id", flat=True).iterator():
+            remux_video.delay(video_id)
+            count += 1
+        self.stdout.write(f"Queued {count} video(s) for remuxing.")
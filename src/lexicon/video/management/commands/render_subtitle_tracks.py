@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from lexicon.video.models import Subtitle, SubtitleTrack
+from lexicon.video.services.subtitle import render_subtitle_track
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the stored subtitles of videos as WebVTT tracks, by default every language of "
+        "a video that doesn't have a track yet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("video_ids", nargs="*", type=int, help="Ids of the videos to render")
+
+    def handle(self, *args, **options):
+        languages = Subtitle.objects.order_by().values_list("video_id", "language").distinct()
+        if options["video_ids"]:
+            languages = languages.filter(video_id__in=options["video_ids"])
+        else:
+            rendered = set(SubtitleTrack.objects.values_list("video_id", "language"))
+            languages = [key for key in languages if key not in rendered]
+
+        count = 0
+        for video_id, language in languages:
+            render_subtitle_track(video_id, language)
+            count += 1
+        self.stdout.write(f"Rendered {count} subtitle track(s).")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from lexicon.video.cache import get_video_cache_stats, reset_video_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show the hit/miss counters of the video metadata cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Reset the counters after printing them."
+        )
+
+    def handle(self, *args, reset, **options):
+        stats = get_video_cache_stats()
+        self.stdout.write(
+            f"hits: {stats['hits']}  misses: {stats['misses']}  hit ratio: {stats['hit_ratio']:.2%}"
+        )
+        if reset:
+            reset_video_cache_stats()
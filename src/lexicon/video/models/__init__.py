@@ -1,2 +1,6 @@
-from .subtitle import Subtitle  # noqa
+from .packaging import VideoPackage  # noqa
+from .processing import VideoProcessingRun, VideoProcessingStage  # noqa
+from .remux import VideoRemux  # noqa
+from .subtitle import Subtitle, SubtitleTrack  # noqa
+from .upload import UploadChunk, UploadSession  # noqa
 from .video import Video  # noqa
@@ -0,0 +1,63 @@
+import os
+
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from lexicon.db.models.base import DefaultFieldsModel
+from lexicon.db.models.utils import sane_repr, sane_str
+
+
+class VideoPackage(DefaultFieldsModel):
+    """
+    An HLS packaging of a video: segmented renditions at several bitrates plus a master
+    playlist, stored under `MEDIA_ROOT/hls/<video id>/<package id>/`.
+
+    A package's files never change once it completed, so they can be cached indefinitely.
+    Repackaging a video creates a new package in a new directory.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        COMPLETED = "completed", _("Completed")
+        FAILED = "failed", _("Failed")
+
+    video = models.ForeignKey(
+        "lexicon.Video",
+        on_delete=models.CASCADE,
+        related_name="packages",
+        verbose_name=_("video"),
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+        db_index=True,
+        verbose_name=_("status"),
+    )
+    renditions = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name=_("renditions"),
+        help_text=_("Name, height and video bitrate (kbit/s) of every rendition"),
+    )
+    segment_seconds = models.PositiveIntegerField(verbose_name=_("segment duration (s)"))
+    size = models.PositiveBigIntegerField(null=True, blank=True, verbose_name=_("size"))
+    duration_ms = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name=_("duration (ms)")
+    )
+    error = models.TextField(blank=True, default="", verbose_name=_("error"))
+
+    class Meta:
+        app_label = "lexicon"
+        db_table = "lexicon_video_package"
+        verbose_name = _("video package")
+        verbose_name_plural = _("video packages")
+        ordering = ["-created_at"]
+
+    __repr__ = sane_repr("id", "video_id", "status")
+    __str__ = sane_str("id", "video_id", "status")
+
+    @property
+    def directory(self) -> str:
+        return os.path.join(settings.MEDIA_ROOT, "hls", str(self.video_id), str(self.id))
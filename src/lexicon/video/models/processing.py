@@ -0,0 +1,124 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from lexicon.db.models.base import DefaultFieldsModel
+from lexicon.db.models.utils import sane_repr, sane_str
+
+
+class VideoProcessingRun(DefaultFieldsModel):
+    """
+    A single subtitle processing run of a video, tracking which stage it has reached and
+    whether it finished. Per-stage timings are stored as `VideoProcessingStage` rows.
+
+    Status only moves forward through `Status` order, so concurrent per-stream subtasks can
+    report progress without overwriting each other, and `COMPLETED`/`FAILED` are final.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", _("Queued")
+        PROBING = "probing", _("Probing")
+        EXTRACTING = "extracting", _("Extracting")
+        PARSING = "parsing", _("Parsing")
+        SAVING = "saving", _("Saving")
+        COMPLETED = "completed", _("Completed")
+        FAILED = "failed", _("Failed")
+
+    FINAL_STATUSES = (Status.COMPLETED, Status.FAILED)
+
+    video = models.ForeignKey(
+        "lexicon.Video",
+        on_delete=models.CASCADE,
+        related_name="processing_runs",
+        verbose_name=_("video"),
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.QUEUED,
+        db_index=True,
+        verbose_name=_("status"),
+    )
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name=_("started at"))
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name=_("finished at"))
+    error = models.TextField(blank=True, default="", verbose_name=_("error"))
+
+    class Meta:
+        app_label = "lexicon"
+        db_table = "lexicon_video_processing_run"
+        verbose_name = _("video processing run")
+        verbose_name_plural = _("video processing runs")
+        ordering = ["-created_at"]
+
+    __repr__ = sane_repr("id", "video_id", "status")
+    __str__ = sane_str("id", "video_id", "status")
+
+    @classmethod
+    def advance(cls, run_id, status):
+        """
+        Move a run forward to `status`. Runs that already reached `status`, a later stage or
+        a final status are left untouched.
+
+        Returns:
+            bool: True if the run was updated.
+        """
+        statuses = list(cls.Status.values)
+        earlier = statuses[: statuses.index(status)]
+        updates = {"status": status, "updated_at": timezone.now()}
+        if status == cls.Status.PROBING:
+            updates["started_at"] = updates["updated_at"]
+        if status in cls.FINAL_STATUSES:
+            earlier = [value for value in earlier if value not in cls.FINAL_STATUSES]
+            updates["finished_at"] = updates["updated_at"]
+        return bool(cls.objects.filter(id=run_id, status__in=earlier).update(**updates))
+
+    @classmethod
+    def fail(cls, run_id, error):
+        """
+        Mark a run as failed with the given error, unless it already finished.
+        """
+        now = timezone.now()
+        return bool(
+            cls.objects.filter(id=run_id)
+            .exclude(status__in=cls.FINAL_STATUSES)
+            .update(status=cls.Status.FAILED, error=str(error), finished_at=now, updated_at=now)
+        )
+
+
+class VideoProcessingStage(DefaultFieldsModel):
+    """
+    Wall-clock time and row count of one stage of a processing run, per subtitle language.
+
+    Extraction, parsing and inserting overlap in the streaming pipeline, so `parse` and
+    `insert` durations are the time spent in each of them rather than elapsed intervals.
+    """
+
+    class Stage(models.TextChoices):
+        PROBE = "probe", _("Probe")
+        EXTRACT = "extract", _("Extract")
+        PARSE = "parse", _("Parse")
+        INSERT = "insert", _("Insert")
+        RENDER = "render", _("Render")
+
+    run = models.ForeignKey(
+        VideoProcessingRun,
+        on_delete=models.CASCADE,
+        related_name="stages",
+        verbose_name=_("processing run"),
+    )
+    stage = models.CharField(
+        max_length=20, choices=Stage.choices, db_index=True, verbose_name=_("stage")
+    )
+    language = models.CharField(max_length=50, blank=True, default="", verbose_name=_("language"))
+    duration_ms = models.PositiveIntegerField(db_index=True, verbose_name=_("duration (ms)"))
+    row_count = models.PositiveIntegerField(null=True, blank=True, verbose_name=_("row count"))
+
+    class Meta:
+        app_label = "lexicon"
+        db_table = "lexicon_video_processing_stage"
+        verbose_name = _("video processing stage")
+        verbose_name_plural = _("video processing stages")
+        ordering = ["created_at"]
+
+    __repr__ = sane_repr("id", "run_id", "stage", "language")
+    __str__ = sane_str("id", "run_id", "stage", "language")
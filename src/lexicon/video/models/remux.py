@@ -0,0 +1,76 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from lexicon.db.models.base import DefaultFieldsModel
+from lexicon.db.models.utils import sane_repr, sane_str
+
+
+class VideoRemux(DefaultFieldsModel):
+    """
+    A faststart remux of a stored video file: the streams are copied without re-encoding into
+    a layout with the seek index in front of the media data, and the new file replaces the
+    served one.
+
+    Time to first frame and seek latency are measured on the file before and after, so the
+    effect of the new layout can be compared per video.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        COMPLETED = "completed", _("Completed")
+        SKIPPED = "skipped", _("Skipped")
+        FAILED = "failed", _("Failed")
+
+    video = models.ForeignKey(
+        "lexicon.Video",
+        on_delete=models.CASCADE,
+        related_name="remuxes",
+        verbose_name=_("video"),
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+        db_index=True,
+        verbose_name=_("status"),
+    )
+    container = models.CharField(max_length=20, blank=True, default="", verbose_name=_("container"))
+    size_before = models.PositiveBigIntegerField(
+        null=True, blank=True, verbose_name=_("size before")
+    )
+    size_after = models.PositiveBigIntegerField(null=True, blank=True, verbose_name=_("size after"))
+    index_offset_before = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("index offset before"),
+        help_text=_("Byte offset of the seek index, empty if the file had none"),
+    )
+    index_offset_after = models.PositiveBigIntegerField(
+        null=True, blank=True, verbose_name=_("index offset after")
+    )
+    first_frame_ms_before = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name=_("time to first frame before (ms)")
+    )
+    first_frame_ms_after = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name=_("time to first frame after (ms)")
+    )
+    seek_ms_before = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name=_("seek latency before (ms)")
+    )
+    seek_ms_after = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name=_("seek latency after (ms)")
+    )
+    duration_ms = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name=_("duration (ms)")
+    )
+    error = models.TextField(blank=True, default="", verbose_name=_("error"))
+
+    class Meta:
+        app_label = "lexicon"
+        db_table = "lexicon_video_remux"
+        verbose_name = _("video remux")
+        verbose_name_plural = _("video remuxes")
+        ordering = ["-created_at"]
+
+    __repr__ = sane_repr("id", "video_id", "status")
+    __str__ = sane_str("id", "video_id", "status")
@@ -1,3 +1,6 @@
+import os
+
+from django.conf import settings
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
@@ -15,8 +18,12 @@ class Subtitle(DefaultFieldsModel):
     )
     language = models.CharField(max_length=50, db_index=True, verbose_name=_("language"))
     cc_subtitle = models.TextField(max_length=1024, db_index=True, verbose_name=_("CC subtitle"))
-    start_time = models.TimeField(db_index=True, verbose_name=_("Start time"))
-    end_time = models.TimeField(db_index=True, verbose_name=_("End time"))
+    start_ms = models.PositiveIntegerField(
+        db_index=True, verbose_name=_("Start time"), help_text=_("Cue start in milliseconds")
+    )
+    end_ms = models.PositiveIntegerField(
+        db_index=True, verbose_name=_("End time"), help_text=_("Cue end in milliseconds")
+    )
 
     class Meta:
         app_label = "lexicon"
@@ -24,6 +31,72 @@ class Subtitle(DefaultFieldsModel):
         verbose_name = _("subtitle")
         verbose_name_plural = _("subtitles")
         ordering = ["-created_at"]
+        indexes = [
+            # Serve time window queries of a track, and of all tracks of a video when no
+            # language is given, in keyset order
+            models.Index(
+                fields=["video", "language", "start_ms", "id"],
+                name="lexicon_subtitle_window_idx",
+            ),
+            models.Index(
+                fields=["video", "start_ms", "id"],
+                name="lexicon_subtitle_time_idx",
+            ),
+        ]
 
     __repr__ = sane_repr("id")
     __str__ = sane_str("id")
+
+
+class SubtitleTrack(DefaultFieldsModel):
+    """
+    A subtitle track of a video rendered as a WebVTT file, with a gzip-compressed copy next
+    to it, stored under `MEDIA_ROOT/subtitles/<video id>/`.
+
+    The files are named after the `version` of their content, so they never change once
+    written and can be cached indefinitely; rendering a track again writes new files.
+    """
+
+    video = models.ForeignKey(
+        "lexicon.Video",
+        on_delete=models.CASCADE,
+        related_name="subtitle_tracks",
+        verbose_name=_("video"),
+    )
+    language = models.CharField(max_length=50, verbose_name=_("language"))
+    cue_count = models.PositiveIntegerField(verbose_name=_("cue count"))
+    size = models.PositiveIntegerField(
+        verbose_name=_("size"), help_text=_("Size of the uncompressed WebVTT file in bytes")
+    )
+    version = models.CharField(
+        max_length=64,
+        verbose_name=_("version"),
+        help_text=_("Digest of the WebVTT content"),
+    )
+
+    class Meta:
+        app_label = "lexicon"
+        db_table = "lexicon_subtitle_track"
+        verbose_name = _("subtitle track")
+        verbose_name_plural = _("subtitle tracks")
+        ordering = ["language"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["video", "language"], name="lexicon_subtitle_track_video_language"
+            )
+        ]
+
+    __repr__ = sane_repr("id", "video_id", "language")
+    __str__ = sane_str("id", "video_id", "language")
+
+    @property
+    def directory(self) -> str:
+        return os.path.join(settings.MEDIA_ROOT, "subtitles", str(self.video_id))
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"{self.language}-{self.version}.vtt")
+
+    @property
+    def gzip_path(self) -> str:
+        return f"{self.path}.gz"
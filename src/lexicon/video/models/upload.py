@@ -0,0 +1,112 @@
+import math
+import os
+import uuid
+
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from lexicon.db.models.base import DefaultFieldsModel
+from lexicon.db.models.utils import sane_repr, sane_str
+
+
+class UploadSession(DefaultFieldsModel):
+    """
+    A resumable, chunked upload of a video file.
+
+    The client declares the file size up front and then PUTs fixed-size chunks in any order,
+    possibly in parallel and retrying failed ones. Each chunk is written at its offset of a
+    preallocated staging file. Once every chunk arrived the session is completed, moving the
+    staging file into `videos/` and creating the `Video`. While that runs the session is
+    `COMPLETING` and accepts no more chunks.
+    """
+
+    class Status(models.TextChoices):
+        ACTIVE = "active", _("Active")
+        COMPLETING = "completing", _("Completing")
+        COMPLETED = "completed", _("Completed")
+        FAILED = "failed", _("Failed")
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    title = models.CharField(max_length=255, verbose_name=_("title"))
+    description = models.TextField(blank=True, default="", verbose_name=_("description"))
+    language = models.CharField(max_length=50, verbose_name=_("language"))
+    file_name = models.CharField(
+        max_length=255, verbose_name=_("file name"), help_text=_("Original name of the file")
+    )
+    total_size = models.PositiveBigIntegerField(verbose_name=_("total size"))
+    chunk_size = models.PositiveIntegerField(verbose_name=_("chunk size"))
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.ACTIVE,
+        db_index=True,
+        verbose_name=_("status"),
+    )
+    error = models.TextField(blank=True, default="", verbose_name=_("error"))
+    expires_at = models.DateTimeField(db_index=True, verbose_name=_("expires at"))
+    video = models.ForeignKey(
+        "lexicon.Video",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="upload_sessions",
+        verbose_name=_("video"),
+    )
+
+    class Meta:
+        app_label = "lexicon"
+        db_table = "lexicon_video_upload_session"
+        verbose_name = _("upload session")
+        verbose_name_plural = _("upload sessions")
+        ordering = ["-created_at"]
+
+    __repr__ = sane_repr("id", "token", "status")
+    __str__ = sane_str("id", "token", "status")
+
+    @property
+    def total_chunks(self) -> int:
+        return max(1, math.ceil(self.total_size / self.chunk_size))
+
+    @property
+    def staging_path(self) -> str:
+        return os.path.join(settings.MEDIA_ROOT, "uploads", f"{self.token}.part")
+
+    def chunk_offset(self, index: int) -> int:
+        return index * self.chunk_size
+
+    def expected_chunk_size(self, index: int) -> int:
+        """
+        Size of chunk `index`; every chunk is `chunk_size` bytes except possibly the last.
+        """
+        return min(self.chunk_size, self.total_size - self.chunk_offset(index))
+
+
+class UploadChunk(DefaultFieldsModel):
+    """
+    A chunk of an `UploadSession` that has been written to the staging file.
+    """
+
+    session = models.ForeignKey(
+        UploadSession,
+        on_delete=models.CASCADE,
+        related_name="chunks",
+        verbose_name=_("upload session"),
+    )
+    index = models.PositiveIntegerField(verbose_name=_("index"))
+    size = models.PositiveIntegerField(verbose_name=_("size"))
+
+    class Meta:
+        app_label = "lexicon"
+        db_table = "lexicon_video_upload_chunk"
+        verbose_name = _("upload chunk")
+        verbose_name_plural = _("upload chunks")
+        ordering = ["index"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["session", "index"], name="lexicon_upload_chunk_session_index_uniq"
+            )
+        ]
+
+    __repr__ = sane_repr("id", "session_id", "index")
+    __str__ = sane_str("id", "session_id", "index")
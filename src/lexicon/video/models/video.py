@@ -1,3 +1,5 @@
+import os
+
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
@@ -5,6 +7,34 @@ from lexicon.db.models.base import DefaultFieldsModel
 from lexicon.db.models.utils import sane_repr, sane_str
 
 
+class VideoQuerySet(models.QuerySet):
+    def with_latest_processing_run(self):
+        """
+        Prefetch the latest processing run of each video, together with its stages, into
+        `latest_processing_runs`, a list holding at most that run.
+        """
+        from lexicon.video.models.processing import VideoProcessingRun
+
+        latest = VideoProcessingRun.objects.filter(video_id=models.OuterRef("video_id")).order_by(
+            "-created_at", "-id"
+        )
+        return self.prefetch_related(
+            models.Prefetch(
+                "processing_runs",
+                queryset=VideoProcessingRun.objects.filter(
+                    id=models.Subquery(latest.values("id")[:1])
+                ).prefetch_related("stages"),
+                to_attr="latest_processing_runs",
+            )
+        )
+
+    def with_subtitle_tracks(self):
+        """
+        Prefetch the WebVTT subtitle tracks of the videos and of their source videos.
+        """
+        return self.prefetch_related("subtitle_tracks", "source__subtitle_tracks")
+
+
 class Video(DefaultFieldsModel):
     """
     Video model to store information about uploaded videos including title, description,
@@ -23,6 +53,38 @@ class Video(DefaultFieldsModel):
         verbose_name=_("video file"),
         help_text=_("Upload video file in MP4, AVI, or MOV format"),
     )
+    file_key = models.CharField(
+        max_length=255,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_("file key"),
+        help_text=_(
+            "Name of the stored file, used to look the video up in playback and subtitle URLs. "
+            "Empty for duplicate uploads, which share the file of their source video"
+        ),
+    )
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        db_index=True,
+        verbose_name=_("content hash"),
+        help_text=_("SHA-256 digest of the uploaded file, used to detect duplicate uploads"),
+    )
+    source = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        default=None,
+        on_delete=models.PROTECT,
+        related_name="duplicates",
+        verbose_name=_("source video"),
+        help_text=_("Earlier upload of the same file whose stored file and subtitles are reused"),
+    )
+
+    objects = VideoQuerySet.as_manager()
 
     class Meta:
         app_label = "lexicon"
@@ -34,8 +96,24 @@ class Video(DefaultFieldsModel):
     __repr__ = sane_repr("id", "title")
     __str__ = sane_str("id", "title")
 
+    def save(self, *args, **kwargs):
+        if self.video_file and not self.video_file._committed:
+            # Store a new file first, so the final (deduplicated) name is known
+            self.video_file.save(self.video_file.name, self.video_file.file, save=False)
+        if self.source_id is None and self.video_file and not self.file_key:
+            self.file_key = os.path.basename(self.video_file.name)
+        super().save(*args, **kwargs)
+
     def get_video_url(self):
         """
         Returns the URL of the video file for display in templates.
         """
         return self.video_file.url if self.video_file else None
+
+    @property
+    def subtitle_video_id(self):
+        """
+        Returns the id of the video that owns the subtitles shown for this video. Duplicate
+        uploads share the subtitles of their source video instead of storing a copy.
+        """
+        return self.source_id or self.id
@@ -0,0 +1,263 @@
+import json
+import logging
+import os
+import shutil
+import subprocess
+import time
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+
+from lexicon.tasks.base import instrumented_task
+
+from .cache import get_cached_video
+from .ffmpeg import FFmpegRunner, priority_prefix
+from .models import VideoPackage
+
+logger = logging.getLogger(__name__)
+
+MASTER_PLAYLIST = "master.m3u8"
+AUDIO_BITRATE = "128k"
+
+Status = VideoPackage.Status
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """
+    One rung of the bitrate ladder.
+
+    Attributes:
+        height (int): Output height in pixels; the width keeps the source aspect ratio.
+        bitrate (int): Target video bitrate in kbit/s.
+    """
+
+    height: int
+    bitrate: int
+
+    @property
+    def name(self) -> str:
+        return f"{self.height}p"
+
+    @classmethod
+    def parse(cls, value: str) -> "Rendition":
+        """
+        Parse a `<height>:<kbit/s>` ladder entry, e.g. `720:2800`.
+        """
+        height, _separator, bitrate = value.partition(":")
+        return cls(height=int(height), bitrate=int(bitrate))
+
+
+def get_ladder() -> List[Rendition]:
+    """
+    The configured bitrate ladder, lowest rendition first.
+    """
+    return sorted((Rendition.parse(value) for value in settings.HLS_LADDER), key=lambda r: r.height)
+
+
+def select_renditions(ladder: List[Rendition], source_height: Optional[int]) -> List[Rendition]:
+    """
+    Drop the renditions that would upscale the source. A source below the lowest rung is
+    packaged once, at the lowest rung's bitrate and its own height.
+    """
+    if not source_height:
+        return ladder
+    renditions = [rendition for rendition in ladder if rendition.height <= source_height]
+    return renditions or [Rendition(height=source_height, bitrate=ladder[0].bitrate)]
+
+
+def probe_source(input_path: str) -> Tuple[Optional[int], bool]:
+    """
+    Return the height of the first video stream of a media file, and whether it has audio.
+    """
+    result = subprocess.run(
+        priority_prefix()
+        + [
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_entries",
+            "stream=codec_type,height",
+            "-of",
+            "json",
+            input_path,
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+        stdin=subprocess.DEVNULL,
+        timeout=settings.FFPROBE_TIMEOUT,
+    )
+    streams = json.loads(result.stdout or "{}").get("streams", [])
+    heights = [stream.get("height") for stream in streams if stream.get("codec_type") == "video"]
+    has_audio = any(stream.get("codec_type") == "audio" for stream in streams)
+    return (heights[0] if heights else None), has_audio
+
+
+def hls_command_args(
+    input_path: str,
+    output_dir: str,
+    renditions: List[Rendition],
+    has_audio: bool,
+    segment_seconds: int,
+) -> List[str]:
+    """
+    ffmpeg arguments that encode every rendition in a single decoding pass and write them as
+    HLS media playlists and MPEG-TS segments, with a master playlist listing all of them.
+
+    Keyframes are forced at every segment boundary, so segments of all renditions line up
+    and players can switch between them at any segment.
+    """
+    splits = "".join(f"[v{i}]" for i in range(len(renditions)))
+    filters = [f"[0:v:0]split={len(renditions)}{splits}"]
+    filters += [
+        f"[v{i}]scale=-2:{rendition.height}[v{i}out]" for i, rendition in enumerate(renditions)
+    ]
+
+    args = ["-i", input_path, "-filter_complex", ";".join(filters)]
+    stream_map = []
+    for i, rendition in enumerate(renditions):
+        args += [
+            "-map",
+            f"[v{i}out]",
+            f"-b:v:{i}",
+            f"{rendition.bitrate}k",
+            f"-maxrate:v:{i}",
+            f"{int(rendition.bitrate * 1.07)}k",
+            f"-bufsize:v:{i}",
+            f"{int(rendition.bitrate * 1.5)}k",
+        ]
+        if has_audio:
+            args += ["-map", "0:a:0"]
+        stream_map.append(
+            f"v:{i},a:{i},name:{rendition.name}" if has_audio else f"v:{i},name:{rendition.name}"
+        )
+
+    args += [
+        "-c:v",
+        "libx264",
+        "-preset",
+        "veryfast",
+        "-profile:v",
+        "main",
+        "-sc_threshold",
+        "0",
+        "-force_key_frames",
+        f"expr:gte(t,n_forced*{segment_seconds})",
+    ]
+    if has_audio:
+        args += ["-c:a", "aac", "-b:a", AUDIO_BITRATE, "-ac", "2"]
+    return args + [
+        "-f",
+        "hls",
+        "-hls_time",
+        str(segment_seconds),
+        "-hls_playlist_type",
+        "vod",
+        "-hls_flags",
+        "independent_segments",
+        "-hls_segment_filename",
+        os.path.join(output_dir, "%v", "segment_%05d.ts"),
+        "-master_pl_name",
+        MASTER_PLAYLIST,
+        "-var_stream_map",
+        " ".join(stream_map),
+        os.path.join(output_dir, "%v", "index.m3u8"),
+    ]
+
+
+def _directory_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _dirs, files in os.walk(path)
+        for name in files
+    )
+
+
+def get_latest_package(video_id: int) -> Optional[VideoPackage]:
+    """
+    Returns the newest completed package of a video.
+    """
+    return (
+        VideoPackage.objects.filter(video_id=video_id, status=Status.COMPLETED)
+        .order_by("-created_at")
+        .first()
+    )
+
+
+def remove_stale_packages(video_id: int, keep: int = 2):
+    """
+    Remove the files of all but the newest `keep` completed packages of a video. The previous
+    package is kept by default, so players that fetched its playlists before the new package
+    completed can finish playback.
+    """
+    packages = VideoPackage.objects.filter(video_id=video_id).exclude(
+        id__in=VideoPackage.objects.filter(video_id=video_id, status=Status.COMPLETED)
+        .order_by("-created_at")
+        .values("id")[:keep]
+    )
+    for package in packages.exclude(status=Status.PENDING):
+        shutil.rmtree(package.directory, ignore_errors=True)
+
+
+def package_video(video_id: int) -> Optional[VideoPackage]:
+    """
+    Package a video for adaptive streaming as HLS at the configured bitrate ladder.
+
+    Args:
+        video_id (int): Id of the video.
+
+    Returns:
+        Optional[VideoPackage]: The completed package, or None for duplicate uploads, which
+            are streamed from the package of their source video.
+    """
+    video = get_cached_video(video_id)
+    if video.source_id is not None:
+        return None
+
+    package = VideoPackage.objects.create(
+        video_id=video.id, segment_seconds=settings.HLS_SEGMENT_SECONDS
+    )
+    try:
+        source_height, has_audio = probe_source(video.path)
+        renditions = select_renditions(get_ladder(), source_height)
+        package.renditions = [{"name": r.name, **asdict(r)} for r in renditions]
+
+        started = time.perf_counter()
+        for rendition in renditions:
+            os.makedirs(os.path.join(package.directory, rendition.name), exist_ok=True)
+        args = hls_command_args(
+            video.path, package.directory, renditions, has_audio, package.segment_seconds
+        )
+        with FFmpegRunner().start(args) as process:
+            process.check_returncode()
+
+        package.duration_ms = int((time.perf_counter() - started) * 1000)
+        package.size = _directory_size(package.directory)
+        package.status = Status.COMPLETED
+        package.save()
+    except Exception as e:
+        logger.error(f"Error packaging video {video.id}: {e}")
+        shutil.rmtree(package.directory, ignore_errors=True)
+        package.status = Status.FAILED
+        package.error = str(e)
+        package.save()
+        raise
+
+    remove_stale_packages(video.id)
+    logger.info(
+        f"Packaged video {video.id} as HLS in {package.duration_ms}ms: "
+        f"{', '.join(r.name for r in renditions)}"
+    )
+    return package
+
+
+@instrumented_task(name="lexicon.video.packaging.package_video_for_streaming")
+def package_video_for_streaming(video_id):
+    """
+    Celery task that packages an uploaded video for adaptive streaming, when enabled.
+    """
+    if not settings.HLS_PACKAGING_ENABLED:
+        return
+    package_video(video_id)
@@ -0,0 +1,390 @@
+import logging
+import os
+import struct
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, List, Optional, Tuple
+
+from django.conf import settings
+
+from lexicon.tasks.base import instrumented_task
+
+from .cache import get_cached_video
+from .ffmpeg import FFmpegRunner, priority_prefix
+from .models import VideoRemux
+
+logger = logging.getLogger(__name__)
+
+MP4_FORMATS = {"mp4": "mp4", "m4v": "mp4", "mov": "mov"}
+MATROSKA_EXTENSIONS = {"mkv", "webm"}
+
+# Top-level EBML element ids
+EBML_HEADER_ID = 0x1A45DFA3
+EBML_DOCTYPE_ID = 0x4282
+SEGMENT_ID = 0x18538067
+CUES_ID = 0x1C53BB6B
+CLUSTER_ID = 0x1F43B675
+
+# Space reserved in front of the clusters for Matroska cues. A cue point takes well under
+# 64 bytes, and ffmpeg writes roughly one per second of video.
+INDEX_BYTES_PER_SECOND = 64
+INDEX_SPACE_PADDING = 16 * 1024
+
+Status = VideoRemux.Status
+
+
+@dataclass(frozen=True)
+class MediaLayout:
+    """
+    Where the seek index of a media file sits relative to its media data.
+
+    Attributes:
+        container (str): ffmpeg muxer that writes this kind of file, e.g. 'mp4' or 'webm'.
+        index_offset (Optional[int]): Byte offset of the index (`moov` atom or Matroska
+            `Cues`), None if it wasn't found.
+        media_offset (Optional[int]): Byte offset of the first media data (`mdat` atom or
+            Matroska `Cluster`), None if it wasn't found.
+    """
+
+    container: str
+    index_offset: Optional[int]
+    media_offset: Optional[int]
+
+    @property
+    def index_first(self) -> bool:
+        """
+        Whether a player reading the file from the start gets the index before any media
+        data, so it can start playback and seek without fetching the end of the file.
+        """
+        if self.index_offset is None:
+            return False
+        return self.media_offset is None or self.index_offset < self.media_offset
+
+
+def _scan_mp4(file: BinaryIO, file_size: int) -> Tuple[Optional[int], Optional[int]]:
+    index_offset = media_offset = None
+    offset = 0
+    while offset + 8 <= file_size and (index_offset is None or media_offset is None):
+        file.seek(offset)
+        size, kind = struct.unpack(">I4s", file.read(8))
+        if size == 1:
+            size = struct.unpack(">Q", file.read(8))[0]
+        elif size == 0:
+            # The atom extends to the end of the file
+            size = file_size - offset
+        if kind == b"moov" and index_offset is None:
+            index_offset = offset
+        elif kind == b"mdat" and media_offset is None:
+            media_offset = offset
+        if size < 8:
+            break
+        offset += size
+    return index_offset, media_offset
+
+
+def _read_vint(file: BinaryIO, keep_marker: bool = False) -> Tuple[Optional[int], int]:
+    """
+    Read an EBML variable-length integer, returning it with its length in bytes, or
+    `(None, 0)` at the end of the file.
+
+    Element ids keep their length marker bit, element sizes don't. A size with all value bits
+    set means "unknown size" and is returned as -1.
+    """
+    first = file.read(1)
+    if not first:
+        return None, 0
+    length, mask = 1, 0x80
+    while length <= 8 and not first[0] & mask:
+        length += 1
+        mask >>= 1
+    if length > 8:
+        raise ValueError("Invalid EBML variable-length integer")
+    value = first[0] if keep_marker else first[0] & (mask - 1)
+    rest = file.read(length - 1)
+    if len(rest) < length - 1:
+        return None, 0
+    for byte in rest:
+        value = value << 8 | byte
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        return -1, length
+    return value, length
+
+
+def _read_element_header(file: BinaryIO) -> Tuple[Optional[int], int]:
+    element_id, _length = _read_vint(file, keep_marker=True)
+    if element_id is None:
+        return None, 0
+    size, _length = _read_vint(file)
+    if size is None:
+        return None, 0
+    return element_id, size
+
+
+def _read_doctype(file: BinaryIO, header_size: int) -> str:
+    end = file.tell() + header_size
+    while file.tell() < end:
+        element_id, size = _read_element_header(file)
+        if element_id is None or size < 0:
+            break
+        if element_id == EBML_DOCTYPE_ID:
+            return file.read(size).rstrip(b"\x00").decode("ascii", errors="replace")
+        file.seek(size, os.SEEK_CUR)
+    return "matroska"
+
+
+def _scan_matroska(file: BinaryIO, file_size: int) -> Tuple[str, Optional[int], Optional[int]]:
+    element_id, size = _read_element_header(file)
+    if element_id != EBML_HEADER_ID or size < 0:
+        raise ValueError("Not an EBML file")
+    header_end = file.tell() + size
+    doctype = _read_doctype(file, size)
+
+    file.seek(header_end)
+    element_id, _size = _read_element_header(file)
+    if element_id != SEGMENT_ID:
+        raise ValueError("Matroska segment not found")
+
+    index_offset = media_offset = None
+    offset = file.tell()
+    while offset < file_size and (index_offset is None or media_offset is None):
+        file.seek(offset)
+        element_id, size = _read_element_header(file)
+        if element_id is None:
+            break
+        if element_id == CUES_ID and index_offset is None:
+            index_offset = offset
+        elif element_id == CLUSTER_ID and media_offset is None:
+            media_offset = offset
+        if size < 0:
+            # Elements of unknown size, e.g. the clusters of live recordings, can't be skipped
+            break
+        offset = file.tell() + size
+    return doctype, index_offset, media_offset
+
+
+def inspect_layout(path: str) -> Optional[MediaLayout]:
+    """
+    Find the seek index and the first media data of an MP4/QuickTime or Matroska/WebM file
+    by walking its top-level structure, without reading the media data.
+
+    Args:
+        path (str): Path of the media file.
+
+    Returns:
+        Optional[MediaLayout]: The layout, or None if the container isn't supported.
+    """
+    extension = os.path.splitext(path)[1].lstrip(".").lower()
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as file:
+        if extension in MP4_FORMATS:
+            return MediaLayout(MP4_FORMATS[extension], *_scan_mp4(file, file_size))
+        if extension in MATROSKA_EXTENSIONS:
+            doctype, index_offset, media_offset = _scan_matroska(file, file_size)
+            container = "webm" if doctype == "webm" else "matroska"
+            return MediaLayout(container, index_offset, media_offset)
+    return None
+
+
+@dataclass
+class PlaybackTimings:
+    """
+    How long a player takes to start and to seek in a media file.
+
+    Attributes:
+        first_frame_ms (Optional[int]): Time to open the file and decode its first video frame.
+        seek_ms (Optional[int]): Time to open the file, seek to the middle and decode a frame.
+        duration (Optional[float]): Duration of the media in seconds.
+    """
+
+    first_frame_ms: Optional[int] = None
+    seek_ms: Optional[int] = None
+    duration: Optional[float] = None
+
+
+def _run_ffprobe(args: List[str]) -> Tuple[str, int]:
+    started = time.perf_counter()
+    result = subprocess.run(
+        priority_prefix() + ["ffprobe", "-v", "error", *args],
+        check=True,
+        capture_output=True,
+        text=True,
+        stdin=subprocess.DEVNULL,
+        timeout=settings.FFPROBE_TIMEOUT,
+    )
+    return result.stdout.strip(), int((time.perf_counter() - started) * 1000)
+
+
+def _time_first_frame(path: str, position: Optional[float] = None) -> int:
+    interval = f"{position:.3f}%+#1" if position else "%+#1"
+    _output, elapsed_ms = _run_ffprobe(
+        [
+            "-select_streams",
+            "v:0",
+            "-read_intervals",
+            interval,
+            "-show_entries",
+            "frame=pts_time",
+            "-of",
+            "csv=p=0",
+            path,
+        ]
+    )
+    return elapsed_ms
+
+
+def measure_playback(path: str) -> PlaybackTimings:
+    """
+    Time decoding the first video frame of a file, and a frame from its middle, the way a
+    player starts and seeks. Both include opening the container and locating the index, which
+    is what the layout of the file changes. Failed measurements are left empty.
+
+    Args:
+        path (str): Path of the media file.
+
+    Returns:
+        PlaybackTimings: The measured timings.
+    """
+    timings = PlaybackTimings()
+    try:
+        output, _elapsed_ms = _run_ffprobe(
+            ["-show_entries", "format=duration", "-of", "csv=p=0", path]
+        )
+        timings.duration = float(output) if output.replace(".", "", 1).isdigit() else None
+        timings.first_frame_ms = _time_first_frame(path)
+        if timings.duration:
+            timings.seek_ms = _time_first_frame(path, timings.duration / 2)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"Could not measure playback of {path}: {e}")
+    return timings
+
+
+def remux_command_args(
+    input_path: str, output_path: str, layout: MediaLayout, duration: Optional[float]
+) -> List[str]:
+    """
+    ffmpeg arguments that copy every stream of `input_path` into `output_path` with the index
+    written in front of the media data.
+    """
+    args = ["-i", input_path, "-map", "0", "-c", "copy"]
+    if layout.container in MP4_FORMATS.values():
+        # Write `moov` in a second pass over the output, in front of `mdat`
+        args += ["-movflags", "+faststart"]
+    else:
+        # Reserve room for the cues after the headers; ffmpeg fills it once all clusters are
+        # written
+        index_space = int((duration or 0) * INDEX_BYTES_PER_SECOND) + INDEX_SPACE_PADDING
+        args += ["-reserve_index_space", str(index_space)]
+    return args + ["-f", layout.container, output_path]
+
+
+def _file_identity(path: str) -> Tuple[int, int, int]:
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def remux_for_streaming(video_id: int) -> Optional[VideoRemux]:
+    """
+    Rewrite a video's stored file so its seek index comes before the media data, measuring
+    time to first frame and seek latency before and after.
+
+    The streams are copied, not re-encoded. The new file is written next to the stored one
+    and swapped in with an atomic rename, so a reader always sees either the old or the new
+    file, and readers that already opened the old one keep reading it. Files that already
+    have their index in front are left alone. `Video.content_hash` keeps the digest of the
+    uploaded file, so re-uploads of it are still detected as duplicates.
+
+    Args:
+        video_id (int): Id of the video.
+
+    Returns:
+        Optional[VideoRemux]: The recorded remux, or None for duplicate uploads, which share
+            the file of their source video.
+    """
+    video = get_cached_video(video_id)
+    if video.source_id is not None:
+        return None
+
+    path = video.path
+    remux = VideoRemux.objects.create(video_id=video.id)
+    output_path = None
+    try:
+        layout = inspect_layout(path)
+        if layout is None:
+            logger.info(f"Skipping remux of video {video.id}: unsupported container")
+            return _finish(remux, Status.SKIPPED)
+
+        identity = _file_identity(path)
+        before = measure_playback(path)
+        remux.container = layout.container
+        remux.size_before = identity[1]
+        remux.index_offset_before = layout.index_offset
+        remux.first_frame_ms_before = before.first_frame_ms
+        remux.seek_ms_before = before.seek_ms
+        if layout.index_first:
+            logger.info(f"Skipping remux of video {video.id}: index already in front")
+            return _finish(remux, Status.SKIPPED)
+
+        started = time.perf_counter()
+        handle, output_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix=".remux-", suffix=os.path.splitext(path)[1]
+        )
+        os.close(handle)
+        args = remux_command_args(path, output_path, layout, before.duration)
+        with FFmpegRunner().start(args) as process:
+            process.check_returncode()
+
+        new_layout = inspect_layout(output_path)
+        if not new_layout.index_first:
+            raise RuntimeError("The remuxed file doesn't have its index in front")
+        with open(output_path, "rb") as output_file:
+            os.fsync(output_file.fileno())
+        if _file_identity(path) != identity:
+            raise RuntimeError("The stored file changed while it was remuxed")
+        os.replace(output_path, path)
+        output_path = None
+
+        after = measure_playback(path)
+        remux.duration_ms = int((time.perf_counter() - started) * 1000)
+        remux.size_after = os.path.getsize(path)
+        remux.index_offset_after = new_layout.index_offset
+        remux.first_frame_ms_after = after.first_frame_ms
+        remux.seek_ms_after = after.seek_ms
+        logger.info(
+            f"Remuxed video {video.id} for streaming in {remux.duration_ms}ms: first frame "
+            f"{remux.first_frame_ms_before} -> {remux.first_frame_ms_after}ms, seek "
+            f"{remux.seek_ms_before} -> {remux.seek_ms_after}ms"
+        )
+        return _finish(remux, Status.COMPLETED)
+    except Exception as e:
+        logger.error(f"Error remuxing video {video.id}: {e}")
+        remux.error = str(e)
+        _finish(remux, Status.FAILED)
+        raise
+    finally:
+        if output_path is not None:
+            _remove(output_path)
+
+
+def _finish(remux: VideoRemux, status: str) -> VideoRemux:
+    remux.status = status
+    remux.save()
+    return remux
+
+
+@instrumented_task(name="lexicon.video.remux.remux_video")
+def remux_video(video_id):
+    """
+    Celery task that rewrites an uploaded video into a streaming-friendly layout.
+    """
+    if not settings.FASTSTART_REMUX_ENABLED:
+        return
+    remux_for_streaming(video_id)
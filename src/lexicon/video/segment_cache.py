@@ -0,0 +1,456 @@
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from typing import BinaryIO, Iterable, Optional
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from .files import VideoFileInfo
+from .http import PlaybackFileResponse, plan_file_response
+from .telemetry import MeteredReader, StreamMeter
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "SegmentCache",
+    "segment_cache",
+    "serve_from_segment_cache",
+]
+
+# Subdirectory of the cache holding a request counter file per window that isn't cached yet
+POPULARITY_DIRECTORY = ".popularity"
+# Counter key of the leading windows of a video, which are admitted together
+LEADING_KEY = "leading"
+# Least number of seconds between two eviction passes. The cache may exceed its size by
+# the windows admitted in between.
+EVICTION_INTERVAL = 5
+# Admissions waiting for the background admitter of a process; further ones are dropped
+# and requested again by later misses
+ADMISSION_QUEUE_SIZE = 256
+
+
+class SegmentReader:
+    """
+    Reads `length` bytes of a video from `start`, from the cached windows of the segment
+    cache for as long as they are present and from the video file after that.
+    """
+
+    def __init__(self, cache, video_file: VideoFileInfo, start: int, length: int, window):
+        self.cache = cache
+        self.video_file = video_file
+        self.position = start
+        self.remaining = length
+        self.window = window
+        self.window_end = (start // cache.window_size + 1) * cache.window_size
+        self.window.seek(start % cache.window_size)
+        self.source = None
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        if not size:
+            return b""
+        if self.window is not None and self.position >= self.window_end:
+            self.window.close()
+            self.window = self.cache.open_window(self.video_file, self.position)
+            self.window_end += self.cache.window_size
+        if self.window is not None:
+            data = self.window.read(min(size, self.window_end - self.position))
+        else:
+            data = self._read_source(size)
+        self.position += len(data)
+        self.remaining -= len(data)
+        return data
+
+    def _read_source(self, size: int) -> bytes:
+        if self.source is None:
+            self.source = open(self.video_file.path, "rb")
+            if not self.cache.is_current(self.source, self.video_file):
+                # The file was replaced mid-stream; end the response short rather than mix
+                # bytes of two files
+                logger.warning(f"Video file {self.video_file.path} changed while streaming")
+                self.remaining = 0
+                return b""
+            self.source.seek(self.position)
+        return self.source.read(size)
+
+    def close(self):
+        for file in (self.window, self.source):
+            if file is not None:
+                file.close()
+
+
+class SegmentCache:
+    """
+    Node-wide cache of byte windows of popular videos, kept as files in a shared memory
+    directory (tmpfs) so all worker processes of a node share it.
+
+    Videos are cached in windows of `window_size` bytes, keyed by video id, size and
+    modification time, so replaced files are never served from stale windows. A window is
+    admitted after `min_requests` range requests started in it, with no more than
+    `popularity_ttl` seconds between two of them; the leading `leading_bytes` of a video,
+    which every playback starts with, share one count and are admitted all together.
+    Requests are counted in counter files in the cache directory, so the counts are shared
+    by all processes of the node.
+
+    Requests never wait for the cache to fill: windows are copied, and the cache evicted,
+    by a background thread of each process. When the cache grows past `max_bytes`, the
+    least recently used windows are evicted, at most every `EVICTION_INTERVAL` seconds;
+    hits refresh the modification time of a window, which serves as the shared recency.
+
+    Hit, miss, admission and eviction counts are kept per process.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        window_size: int,
+        leading_bytes: int,
+        min_requests: int,
+        popularity_ttl: int,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.window_size = window_size
+        self.leading_windows = max(leading_bytes // window_size, 1)
+        self.min_requests = min_requests
+        self.popularity_ttl = popularity_ttl
+        self.admitter = _Admitter(self)
+        self.hits = 0
+        self.misses = 0
+        self.admissions = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def video_directory(self, video_file: VideoFileInfo) -> str:
+        return os.path.join(
+            self.directory, f"{video_file.video_id}-{video_file.size:x}-{video_file.mtime_ns:x}"
+        )
+
+    def window_path(self, video_file: VideoFileInfo, index: int) -> str:
+        return os.path.join(self.video_directory(video_file), str(index))
+
+    def counter_path(self, video_file: VideoFileInfo, key: str) -> str:
+        name = os.path.basename(self.video_directory(video_file))
+        return os.path.join(self.directory, POPULARITY_DIRECTORY, f"{name}-{key}")
+
+    def open_window(self, video_file: VideoFileInfo, position: int) -> Optional[BinaryIO]:
+        """
+        Open the cached window holding `position`, or return None if it isn't cached.
+        """
+        path = self.window_path(video_file, position // self.window_size)
+        try:
+            window = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted meanwhile; the open file stays readable
+            pass
+        return window
+
+    def open(self, video_file: VideoFileInfo, start: int, length: int) -> Optional[SegmentReader]:
+        """
+        Returns a reader for a range of a video if the window the range starts in is cached,
+        and otherwise counts the request towards admitting the window.
+        """
+        index = start // self.window_size
+        window = self.open_window(video_file, start)
+        if window is not None:
+            self._count("hits")
+            return SegmentReader(self, video_file, start, length, window)
+
+        self._count("misses")
+        if index < self.leading_windows:
+            key, indexes = LEADING_KEY, range(self.leading_windows)
+        else:
+            key, indexes = str(index), [index]
+        if self.count_request(video_file, key) >= self.min_requests:
+            self.admitter.submit(video_file, key, indexes)
+        return None
+
+    def count_request(self, video_file: VideoFileInfo, key: str) -> int:
+        """
+        Count a request for the windows of `key` in their shared counter file, restarting
+        the count when the previous request is older than `popularity_ttl`.
+
+        Every request appends a byte, which is atomic across processes, so the file size is
+        the count.
+
+        Returns:
+            int: Number of requests counted, or 0 if the counter couldn't be updated.
+        """
+        path = self.counter_path(video_file, key)
+        try:
+            if time.time() - os.stat(path).st_mtime > self.popularity_ttl:
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+        try:
+            try:
+                fd = os.open(path, flags, 0o644)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd = os.open(path, flags, 0o644)
+            try:
+                os.write(fd, b".")
+                return os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+        except OSError as e:
+            logger.debug(f"Could not count a request of video {video_file.video_id}: {e}")
+            return 0
+
+    def admit(self, video_file: VideoFileInfo, indexes: Iterable[int]) -> bool:
+        """
+        Copy windows of a video into the cache.
+
+        Returns:
+            bool: True if any window was copied.
+        """
+        directory = self.video_directory(video_file)
+        admissions = self.admissions
+        try:
+            with open(video_file.path, "rb") as source:
+                if not self.is_current(source, video_file):
+                    # The file was replaced since it was looked up; its next lookup sees that
+                    return False
+                os.makedirs(directory, exist_ok=True)
+                for index in indexes:
+                    if index * self.window_size >= video_file.size:
+                        break
+                    self._copy_window(source, directory, index)
+        except OSError as e:
+            # Another process may have evicted the directory meanwhile
+            logger.debug(f"Could not cache windows of video {video_file.video_id}: {e}")
+        return self.admissions != admissions
+
+    def _copy_window(self, source: BinaryIO, directory: str, index: int):
+        path = os.path.join(directory, str(index))
+        if os.path.exists(path):
+            return
+        source.seek(index * self.window_size)
+        data = source.read(self.window_size)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as temp:
+                temp.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self._count("admissions")
+
+    def evict(self):
+        """
+        Remove the least recently used windows until the cache fits in `max_bytes`, and
+        request counters that expired.
+        """
+        self._expire_counters()
+        windows = sorted(self._list_windows())
+        total = sum(size for _mtime, size, _path in windows)
+        for _mtime, size, path in windows:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            self._count("evictions")
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+
+    def _expire_counters(self):
+        expired = time.time() - self.popularity_ttl
+        for counter in _scandir(os.path.join(self.directory, POPULARITY_DIRECTORY)):
+            try:
+                if counter.stat().st_mtime < expired:
+                    os.unlink(counter.path)
+            except FileNotFoundError:
+                continue
+
+    def _list_windows(self):
+        """
+        Yields the modification time, size and path of every cached window.
+        """
+        for video_directory in _scandir(self.directory):
+            if video_directory.name == POPULARITY_DIRECTORY:
+                continue
+            for entry in _scandir(video_directory.path):
+                if entry.name.startswith(".tmp-"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime_ns, stat.st_size, entry.path
+
+    def discard(self, video_id: int):
+        """
+        Remove all cached windows of a video, e.g. after it was deleted.
+        """
+        for video_directory in _scandir(self.directory):
+            if video_directory.name.split("-", 1)[0] == str(video_id):
+                shutil.rmtree(video_directory.path, ignore_errors=True)
+        for counter in _scandir(os.path.join(self.directory, POPULARITY_DIRECTORY)):
+            if counter.name.split("-", 1)[0] == str(video_id):
+                _unlink(counter.path)
+
+    @staticmethod
+    def is_current(file: BinaryIO, video_file: VideoFileInfo) -> bool:
+        stat = os.fstat(file.fileno())
+        return (stat.st_size, stat.st_mtime_ns) == (video_file.size, video_file.mtime_ns)
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+class _Admitter:
+    """
+    Daemon thread copying windows into the segment cache, and evicting the cache at most
+    every `EVICTION_INTERVAL` seconds after admissions, off the request path. Started
+    lazily, once per process.
+    """
+
+    def __init__(self, cache: SegmentCache):
+        self.cache = cache
+        self.lock = threading.Lock()
+        self.queue = None
+        self.pending = set()
+        self.pid = None
+
+    def submit(self, video_file: VideoFileInfo, key: str, indexes: Iterable[int]):
+        """
+        Queue the windows of `key` for admission, unless they already are.
+        """
+        pending_key = (video_file.video_id, video_file.size, video_file.mtime_ns, key)
+        with self.lock:
+            if self.pid != os.getpid():
+                # Not started yet, or this is a forked child without the parent's thread
+                self.pid = os.getpid()
+                self.pending = set()
+                self.queue = queue.Queue(maxsize=ADMISSION_QUEUE_SIZE)
+                threading.Thread(
+                    target=self._run, args=(self.queue,), name="segment-cache", daemon=True
+                ).start()
+            if pending_key in self.pending:
+                return
+            try:
+                self.queue.put_nowait((pending_key, video_file, key, list(indexes)))
+            except queue.Full:
+                return
+            self.pending.add(pending_key)
+
+    def _run(self, admissions: queue.Queue):
+        evicted_at = 0.0
+        evict_at = None
+        while True:
+            timeout = None if evict_at is None else max(evict_at - time.monotonic(), 0)
+            try:
+                pending_key, video_file, key, indexes = admissions.get(timeout=timeout)
+            except queue.Empty:
+                pass
+            else:
+                if self._admit(video_file, key, indexes) and evict_at is None:
+                    evict_at = max(evicted_at + EVICTION_INTERVAL, time.monotonic())
+                with self.lock:
+                    self.pending.discard(pending_key)
+
+            if evict_at is not None and time.monotonic() >= evict_at:
+                try:
+                    self.cache.evict()
+                except Exception as e:
+                    logger.warning(f"Could not evict the segment cache: {e}")
+                evicted_at, evict_at = time.monotonic(), None
+
+    def _admit(self, video_file: VideoFileInfo, key: str, indexes) -> bool:
+        try:
+            admitted = self.cache.admit(video_file, indexes)
+        except Exception as e:
+            logger.warning(f"Could not cache windows of video {video_file.video_id}: {e}")
+            return False
+        # Windows evicted later need to become popular again
+        _unlink(self.cache.counter_path(video_file, key))
+        return admitted
+
+
+def _unlink(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _scandir(path: str):
+    try:
+        with os.scandir(path) as entries:
+            return [entry for entry in entries if entry.is_dir() or entry.is_file()]
+    except FileNotFoundError:
+        return []
+
+
+segment_cache = SegmentCache(
+    directory=settings.SEGMENT_CACHE_DIR,
+    max_bytes=settings.SEGMENT_CACHE_SIZE,
+    window_size=settings.SEGMENT_CACHE_WINDOW_SIZE,
+    leading_bytes=settings.SEGMENT_CACHE_LEADING_SIZE,
+    min_requests=settings.SEGMENT_CACHE_MIN_REQUESTS,
+    popularity_ttl=settings.SEGMENT_CACHE_POPULARITY_TTL,
+)
+
+
+def serve_from_segment_cache(
+    request, video_file: VideoFileInfo, filename: str = "", meter: Optional[StreamMeter] = None
+) -> Optional[HttpResponse]:
+    """
+    Answer a playback request whose range starts in a cached window from the segment cache.
+
+    Only GET requests for the whole file or a single range are considered; everything else,
+    and misses, return None to be served from the file.
+
+    Args:
+        request (HttpRequest): The request.
+        video_file (VideoFileInfo): The requested video file.
+        filename (str): Name sent in an inline `Content-Disposition` of full responses.
+        meter (Optional[StreamMeter]): Records the response in the playback telemetry.
+
+    Returns:
+        Optional[HttpResponse]: The response, or None.
+    """
+    if not settings.SEGMENT_CACHE_ENABLED or request.method != "GET":
+        return None
+    plan = plan_file_response(
+        request, video_file.size, video_file.mtime_ns, video_file.content_type, filename
+    )
+    if len(plan.parts) != 1 or plan.closing:
+        return None
+
+    _header, start, length = plan.parts[0]
+    reader = segment_cache.open(video_file, start, length)
+    if reader is None:
+        return None
+    response = PlaybackFileResponse(
+        reader if meter is None else MeteredReader(reader, meter), status=plan.status
+    )
+    for header, value in plan.headers.items():
+        response[header] = value
+    if meter is not None:
+        meter.attach(response, plan)
+    return response
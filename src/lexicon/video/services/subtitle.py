@@ -0,0 +1,151 @@
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from lexicon.db.bulk import analyze_model, copy_rows
+from lexicon.video.models import Subtitle, SubtitleTrack
+from lexicon.video.timecodes import format_vtt_timestamp
+
+logger = logging.getLogger(__name__)
+
+SUBTITLE_LOAD_FIELDS = (
+    "video_id",
+    "language",
+    "cc_subtitle",
+    "start_ms",
+    "end_ms",
+    "created_at",
+    "updated_at",
+)
+
+WEBVTT_HEADER = "WEBVTT\n\n"
+# Cues read from the database per round trip while rendering a track
+RENDER_CHUNK_SIZE = 2000
+
+
+def load_subtitles(video_id: int, language: str, subtitle_entries: Iterable[Dict]) -> int:
+    """
+    Bulk-load parsed subtitle entries for a video, streaming them through PostgreSQL's COPY.
+
+    Entries are consumed lazily, so a generator fed by a subtitle pipe is written to the
+    database as it is parsed. Table statistics are refreshed once a load of at least
+    `SUBTITLE_ANALYZE_MIN_ROWS` rows has been committed.
+
+    Args:
+        video_id (int): Id of the video the subtitles belong to.
+        language (str): Language of the subtitle track.
+        subtitle_entries (Iterable[Dict]): Entries with `start_ms`, `end_ms` and `cc_subtitle`.
+
+    Returns:
+        int: Number of subtitles saved.
+    """
+    now = timezone.now()
+    rows = (
+        (video_id, language, entry["cc_subtitle"], entry["start_ms"], entry["end_ms"], now, now)
+        for entry in subtitle_entries
+    )
+    loaded = copy_rows(
+        Subtitle, SUBTITLE_LOAD_FIELDS, rows, batch_size=settings.SUBTITLE_INSERT_BATCH_SIZE
+    )
+
+    if loaded >= settings.SUBTITLE_ANALYZE_MIN_ROWS:
+        transaction.on_commit(lambda: analyze_model(Subtitle))
+
+    logger.info(f"{loaded} {language} subtitles saved to the database for video {video_id}.")
+    return loaded
+
+
+def format_webvtt_cue(start_ms: int, end_ms: int, text: str) -> str:
+    """
+    Format a cue as a WebVTT cue block. Blank lines, which would end the cue early, are
+    dropped from its text, and "-->" is escaped since it may not appear in cue text.
+    """
+    lines = [line for line in text.replace("-->", "--&gt;").splitlines() if line.strip()]
+    text = "\n".join(lines)
+    return f"{format_vtt_timestamp(start_ms)} --> {format_vtt_timestamp(end_ms)}\n{text}\n\n"
+
+
+def render_subtitle_track(video_id: int, language: str) -> SubtitleTrack:
+    """
+    Render the stored subtitles of a video in a language as a WebVTT file, plus a
+    gzip-compressed copy served to clients that accept it, and record them as the video's
+    track for that language.
+
+    Cues are streamed from the database into both files, so memory stays flat regardless
+    of the track size. Files of the previous rendering are removed afterwards.
+
+    Args:
+        video_id (int): Id of the video.
+        language (str): Language of the track.
+
+    Returns:
+        SubtitleTrack: The track.
+    """
+    track = SubtitleTrack(video_id=video_id, language=language)
+    os.makedirs(track.directory, exist_ok=True)
+    cues = (
+        Subtitle.objects.filter(video_id=video_id, language=language)
+        .order_by("start_ms", "end_ms", "id")
+        .values_list("start_ms", "end_ms", "cc_subtitle")
+        .iterator(chunk_size=RENDER_CHUNK_SIZE)
+    )
+
+    digest = hashlib.sha256()
+    track.cue_count = track.size = 0
+    vtt = tempfile.NamedTemporaryFile(dir=track.directory, prefix=".tmp-", delete=False)
+    compressed = tempfile.NamedTemporaryFile(dir=track.directory, prefix=".tmp-", delete=False)
+    try:
+        with vtt, compressed, gzip.GzipFile(fileobj=compressed, mode="wb", mtime=0) as gz:
+
+            def write(block: str):
+                data = block.encode("utf-8")
+                vtt.write(data)
+                gz.write(data)
+                digest.update(data)
+                track.size += len(data)
+
+            write(WEBVTT_HEADER)
+            for start_ms, end_ms, text in cues:
+                write(format_webvtt_cue(start_ms, end_ms, text))
+                track.cue_count += 1
+        track.version = digest.hexdigest()[:16]
+        os.replace(vtt.name, track.path)
+        os.replace(compressed.name, track.gzip_path)
+    except BaseException:
+        for name in (vtt.name, compressed.name):
+            if os.path.exists(name):
+                os.unlink(name)
+        raise
+
+    previous = SubtitleTrack.objects.filter(video_id=video_id, language=language).first()
+    track, _created = SubtitleTrack.objects.update_or_create(
+        video_id=video_id,
+        language=language,
+        defaults={"cue_count": track.cue_count, "size": track.size, "version": track.version},
+    )
+    if previous is not None and previous.version != track.version:
+        remove_subtitle_track_files(previous)
+
+    logger.info(
+        f"Rendered the {language} subtitle track of video {video_id}: {track.cue_count} cues, "
+        f"{track.size} bytes."
+    )
+    return track
+
+
+def remove_subtitle_track_files(track: SubtitleTrack):
+    """
+    Remove the WebVTT files of a subtitle track, if they still exist.
+    """
+    for path in (track.path, track.gzip_path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
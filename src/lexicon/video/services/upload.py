@@ -0,0 +1,335 @@
+import fcntl
+import hashlib
+import logging
+import os
+from datetime import timedelta
+from typing import BinaryIO, List, Optional
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+
+from lexicon.api.file_upload import UploadedFileConfig
+from lexicon.video.models import UploadChunk, UploadSession, Video
+from lexicon.video.services.video import create_video_entity
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+HASH_READ_SIZE = 1024 * 1024
+
+Status = UploadSession.Status
+
+
+def create_upload_session(
+    title: str,
+    description: str,
+    language: str,
+    file_name: str,
+    total_size: int,
+    chunk_size: Optional[int] = None,
+) -> UploadSession:
+    """
+    Starts a resumable upload, validating everything that is known before any data is sent,
+    and preallocates its staging file.
+
+    Args:
+        title (str): Title of the video to create.
+        description (str): Description of the video.
+        language (str): The subtitle language to extract.
+        file_name (str): Original name of the file.
+        total_size (int): Size of the file in bytes.
+        chunk_size (Optional[int]): Requested chunk size; defaults to `UPLOAD_CHUNK_SIZE`.
+
+    Returns:
+        UploadSession: The new session.
+    """
+    file_config = UploadedFileConfig(file_type="video")
+
+    if Video.objects.filter(title=title).exists():
+        raise serializers.ValidationError(
+            _("A video with the title '{}' already exists.".format(title))
+        )
+    allowed_extensions = file_config.get_allowed_extensions()
+    extension = os.path.splitext(file_name)[1].lstrip(".").lower()
+    if extension not in allowed_extensions:
+        raise serializers.ValidationError(
+            _(
+                "File extension '{}' is not allowed. Allowed extensions are: {}.".format(
+                    extension, ", ".join(allowed_extensions)
+                )
+            )
+        )
+
+    allowed_max_size = file_config.get_allowed_max_size()
+    if total_size > allowed_max_size:
+        raise serializers.ValidationError(
+            _("File size is too large. Allowed max file size: {} bytes.".format(allowed_max_size))
+        )
+
+    chunk_size = min(chunk_size or settings.UPLOAD_CHUNK_SIZE, settings.UPLOAD_MAX_CHUNK_SIZE)
+    session = UploadSession.objects.create(
+        title=title,
+        description=description or "",
+        language=language,
+        file_name=file_name,
+        total_size=total_size,
+        chunk_size=chunk_size,
+        expires_at=timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL),
+    )
+
+    os.makedirs(os.path.dirname(session.staging_path), exist_ok=True)
+    with open(session.staging_path, "wb") as staging_file:
+        staging_file.truncate(total_size)
+
+    logger.info(f"Upload session {session.token} started for '{title}' ({total_size} bytes)")
+    return session
+
+
+def get_active_upload_session(token) -> UploadSession:
+    """
+    Returns the upload session with the given token if it still accepts data.
+    """
+    session = UploadSession.objects.filter(token=token).first()
+    if session is None:
+        raise serializers.ValidationError(_("Upload session not found."))
+    if session.status != Status.ACTIVE:
+        raise serializers.ValidationError(
+            _("Upload session is {}.".format(session.get_status_display().lower()))
+        )
+    if session.expires_at <= timezone.now():
+        fail_upload_session(session, "Upload session expired.")
+        raise serializers.ValidationError(_("Upload session expired."))
+    return session
+
+
+def fail_upload_session(session: UploadSession, error: str):
+    """
+    Marks a session as failed and drops its staging file.
+    """
+    UploadSession.objects.filter(
+        id=session.id, status__in=[Status.ACTIVE, Status.COMPLETING]
+    ).update(status=Status.FAILED, error=error, updated_at=timezone.now())
+    _remove(session.staging_path)
+    logger.warning(f"Upload session {session.token} failed: {error}")
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def write_upload_chunk(
+    session: UploadSession, index: int, stream: BinaryIO, content_length: Optional[int]
+) -> UploadChunk:
+    """
+    Streams one chunk of the request body into its place in the staging file.
+
+    The chunk size is checked against the declared `Content-Length` before any data is read
+    and against the bytes actually received while reading, and the first chunk must start
+    with an allowed file signature, so invalid uploads are rejected as early as possible.
+    Chunks can be written concurrently and re-sent; a re-sent chunk overwrites the previous
+    copy.
+
+    Writers hold a shared lock on the staging file and only write once they hold it and the
+    session is still active. Completion claims the session and then takes the exclusive lock,
+    so it waits for chunks already being written, and chunks arriving after the claim are
+    refused instead of changing a file that was already hashed.
+
+    Args:
+        session (UploadSession): An active session.
+        index (int): Zero-based index of the chunk.
+        stream (BinaryIO): The request body.
+        content_length (Optional[int]): Declared size of the body, if known.
+
+    Returns:
+        UploadChunk: The stored chunk.
+    """
+    if index >= session.total_chunks:
+        raise serializers.ValidationError(
+            _("Chunk index must be lower than {}.".format(session.total_chunks))
+        )
+    expected = session.expected_chunk_size(index)
+    if content_length is not None and content_length != expected:
+        raise serializers.ValidationError(
+            _("Chunk {} must be exactly {} bytes.".format(index, expected))
+        )
+
+    try:
+        fd = os.open(session.staging_path, os.O_WRONLY)
+    except FileNotFoundError:
+        raise serializers.ValidationError(_("Upload session no longer accepts chunks."))
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        if not UploadSession.objects.filter(id=session.id, status=Status.ACTIVE).exists():
+            raise serializers.ValidationError(_("Upload session no longer accepts chunks."))
+        written = _write_chunk_data(fd, session, index, stream, expected)
+        if written != expected:
+            raise serializers.ValidationError(
+                _(
+                    "Chunk {} is incomplete: received {} of {} bytes.".format(
+                        index, written, expected
+                    )
+                )
+            )
+        chunk, _created = UploadChunk.objects.update_or_create(
+            session=session, index=index, defaults={"size": written}
+        )
+    finally:
+        # Also releases the lock
+        os.close(fd)
+    return chunk
+
+
+def _write_chunk_data(
+    fd: int, session: UploadSession, index: int, stream: BinaryIO, expected: int
+) -> int:
+    """
+    Copy the chunk from `stream` to its offset of the staging file.
+
+    Returns:
+        int: Number of bytes written.
+    """
+    file_config = UploadedFileConfig(file_type="video")
+    offset = session.chunk_offset(index)
+    written = 0
+    while True:
+        data = stream.read(min(READ_SIZE, expected - written + 1))
+        if not data:
+            break
+        if written + len(data) > expected:
+            raise serializers.ValidationError(
+                _("Chunk {} must be exactly {} bytes.".format(index, expected))
+            )
+        if index == 0 and written == 0 and not file_config.has_allowed_signature(data):
+            fail_upload_session(session, "File content is not an allowed video format.")
+            raise serializers.ValidationError(_("File content is not an allowed video format."))
+        os.pwrite(fd, data, offset + written)
+        written += len(data)
+    return written
+
+
+def get_missing_chunks(session: UploadSession) -> List[int]:
+    received = set(session.chunks.values_list("index", flat=True))
+    return [index for index in range(session.total_chunks) if index not in received]
+
+
+def complete_upload_session(token) -> Video:
+    """
+    Assembles a fully received upload into `videos/` and creates its video.
+
+    The staging file already holds every chunk at its offset, so assembling is a rename
+    within `MEDIA_ROOT`. The file is hashed once here since chunks may have arrived out of
+    order. The session is claimed as `COMPLETING` by a single conditional update first, so
+    the file is hashed without holding a transaction open, and it goes back to `ACTIVE` if
+    completing fails so it can be retried.
+
+    Returns:
+        Video: The created video.
+    """
+    session = get_active_upload_session(token)
+    claimed = UploadSession.objects.filter(id=session.id, status=Status.ACTIVE).update(
+        status=Status.COMPLETING, updated_at=timezone.now()
+    )
+    if not claimed:
+        raise serializers.ValidationError(_("Upload session is already completed."))
+
+    try:
+        video, path = _assemble_upload(session)
+    except Exception:
+        UploadSession.objects.filter(id=session.id, status=Status.COMPLETING).update(
+            status=Status.ACTIVE, updated_at=timezone.now()
+        )
+        raise
+
+    if video.source_id is not None:
+        # A duplicate upload reuses the stored file of its source video
+        _remove(path)
+
+    logger.info(f"Upload session {session.token} completed as video {video.id}")
+    return video
+
+
+def _assemble_upload(session: UploadSession):
+    """
+    Hash the staging file of a claimed session, move it into `videos/` and create the video,
+    holding the exclusive lock on the file so no chunk is still being written to it.
+
+    Returns:
+        Tuple[Video, str]: The created video and the path of the stored file.
+    """
+    try:
+        staging_file = open(session.staging_path, "rb")
+    except FileNotFoundError:
+        fail_upload_session(session, "Upload data is missing.")
+        raise serializers.ValidationError(_("Upload data is missing."))
+
+    with staging_file:
+        fcntl.flock(staging_file, fcntl.LOCK_EX)
+        missing = get_missing_chunks(session)
+        if missing:
+            raise serializers.ValidationError(
+                {"missing_chunks": missing, "message": _("Upload is incomplete.")}
+            )
+
+        content_hash = _hash_file(staging_file)
+        name = default_storage.get_available_name(
+            f"videos/{get_valid_filename(os.path.basename(session.file_name))}"
+        )
+        path = default_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(session.staging_path, path)
+        try:
+            with transaction.atomic():
+                video = create_video_entity(
+                    title=session.title,
+                    description=session.description,
+                    video_file=name,
+                    language=session.language,
+                    content_hash=content_hash,
+                )
+                UploadSession.objects.filter(id=session.id).update(
+                    status=Status.COMPLETED, video=video, updated_at=timezone.now()
+                )
+        except Exception:
+            # Put the data back, so completing can be retried
+            os.replace(path, session.staging_path)
+            raise
+    return video, path
+
+
+def _hash_file(file: BinaryIO) -> str:
+    hasher = hashlib.sha256()
+    for block in iter(lambda: file.read(HASH_READ_SIZE), b""):
+        hasher.update(block)
+    return hasher.hexdigest()
+
+
+def expire_upload_sessions() -> int:
+    """
+    Fails every active session past its expiry time, and every session stuck completing
+    for longer than `UPLOAD_SESSION_TTL` after its worker died, removing its staging file.
+
+    Returns:
+        int: Number of sessions expired.
+    """
+    now = timezone.now()
+    sessions = UploadSession.objects.filter(
+        Q(status=Status.ACTIVE, expires_at__lte=now)
+        | Q(
+            status=Status.COMPLETING,
+            updated_at__lte=now - timedelta(seconds=settings.UPLOAD_SESSION_TTL),
+        )
+    )
+    count = 0
+    for session in sessions.iterator():
+        fail_upload_session(session, "Upload session expired.")
+        count += 1
+    return count
@@ -1,28 +1,37 @@
 import logging
+from typing import Optional
 
 from django.core.files.uploadedfile import UploadedFile
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
 from lexicon.video.extraction import process_video
-from lexicon.video.models import Video
+from lexicon.video.models import Video, VideoProcessingRun
+from lexicon.video.packaging import package_video_for_streaming
+from lexicon.video.remux import remux_video
 
 logger = logging.getLogger(__name__)
 
 
 def create_video_entity(
-    title: str, video_file: UploadedFile, description: str, language: str
+    title: str, video_file: UploadedFile, description: str, language: str, content_hash: str = ""
 ) -> Video:
     """
     Creates a new video entity in the database with the given title, video file, and description.
 
     This function checks for the existence of a video with the same title and raises
-    a ValidationError if it already exists. If not, it creates a new Video object and logs the process.
+    a ValidationError if it already exists. If the uploaded content was already stored under
+    another title, the new video reuses that stored file and links to its subtitles instead of
+    storing the file again. Extraction is only skipped when the source video already has a
+    subtitle track in the requested language; otherwise that language is extracted into the
+    source video under a processing run of the new video.
 
     Args:
         title (str): The title of the video.
         video_file (UploadedFile): The video file to be uploaded.
         description (str): A brief description of the video.
+        language (str): The subtitle language to extract.
+        content_hash (str): SHA-256 digest of the uploaded file, if it was computed.
     """
     logger.debug("Attempting to create video with title: '%s'", title)
 
@@ -31,13 +40,57 @@ def create_video_entity(
         logger.error(error_message)
         raise serializers.ValidationError(error_message)
 
-    video = Video.objects.create(title=title, description=description, video_file=video_file)
-
-    logger.info("Video created successfully with title: '%s'", title)
-
     if language not in ["eng", "kor", "ger"]:
         raise serializers.ValidationError(_("Please select valid language"))
 
-    process_video.delay(video.id, language)
+    source = get_video_by_content_hash(content_hash)
+    if source is not None:
+        video = Video.objects.create(
+            title=title,
+            description=description,
+            video_file=source.video_file.name,
+            content_hash=content_hash,
+            source=source,
+        )
+        if source.subtitle_tracks.filter(language=language).exists():
+            logger.info(
+                "Video created with title: '%s' as a duplicate of video %s, skipping extraction",
+                title,
+                source.id,
+            )
+            return video
+
+        logger.info(
+            "Video created with title: '%s' as a duplicate of video %s, extracting %s subtitles",
+            title,
+            source.id,
+            language,
+        )
+        run = VideoProcessingRun.objects.create(video=video)
+        process_video.delay_on_commit(source.id, language, run_id=run.id)
+        return video
+
+    video = Video.objects.create(
+        title=title, description=description, video_file=video_file, content_hash=content_hash
+    )
+
+    logger.info("Video created successfully with title: '%s'", title)
+
+    run = VideoProcessingRun.objects.create(video=video)
+    process_video.delay_on_commit(video.id, language, run_id=run.id)
+    remux_video.delay_on_commit(video.id)
+    package_video_for_streaming.delay_on_commit(video.id)
 
     return video
+
+
+def get_video_by_content_hash(content_hash: str) -> Optional[Video]:
+    """
+    Returns the original (non-duplicate) video whose stored file has the given digest.
+
+    Args:
+        content_hash (str): SHA-256 digest of a video file.
+    """
+    if not content_hash:
+        return None
+    return Video.objects.filter(content_hash=content_hash, source__isnull=True).first()
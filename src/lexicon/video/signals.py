@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from lexicon.video.cache import invalidate_video
+from lexicon.video.files import forget_video_file
+from lexicon.video.models import SubtitleTrack, Video
+from lexicon.video.segment_cache import segment_cache
+from lexicon.video.services.subtitle import remove_subtitle_track_files
+
+
+@receiver(post_save, sender=Video, dispatch_uid="video_cache_invalidate_on_save")
+@receiver(post_delete, sender=Video, dispatch_uid="video_cache_invalidate_on_delete")
+def invalidate_video_cache(sender, instance, **kwargs):
+    # Bumping the generation before the change is visible would let a concurrent reader cache
+    # the old row under the new generation
+    video_id = instance.id
+    transaction.on_commit(lambda: invalidate_video(video_id))
+
+
+@receiver(post_save, sender=Video, dispatch_uid="video_file_forget_on_save")
+@receiver(post_delete, sender=Video, dispatch_uid="video_file_forget_on_delete")
+def forget_video_file_on_change(sender, instance, **kwargs):
+    file_key = instance.file_key
+    transaction.on_commit(lambda: forget_video_file(file_key))
+
+
+@receiver(post_delete, sender=Video, dispatch_uid="video_segments_discard_on_delete")
+def discard_cached_segments(sender, instance, **kwargs):
+    video_id = instance.id
+    transaction.on_commit(lambda: segment_cache.discard(video_id))
+
+
+@receiver(post_delete, sender=SubtitleTrack, dispatch_uid="subtitle_track_files_remove_on_delete")
+def remove_subtitle_track_files_on_delete(sender, instance, **kwargs):
+    transaction.on_commit(lambda: remove_subtitle_track_files(instance))
@@ -0,0 +1,86 @@
+import re
+from typing import Dict, Iterable, Iterator, Optional
+
+from .timecodes import parse_srt_timestamp
+
+SRT_TIMING_PATTERN = re.compile(
+    r"^\s*(\d{2,}:\d{2}:\d{2}[,.]\d{3})\s*-->\s*(\d{2,}:\d{2}:\d{2}[,.]\d{3})"
+)
+
+
+class SRTParser:
+    """
+    Incremental SubRip parser that is fed one line at a time.
+
+    Only the current cue is held in memory, so a track of any size can be parsed straight
+    from a pipe. Cue numbers are ignored and multi-line cue text is joined with spaces.
+    """
+
+    def __init__(self):
+        self._timing = None
+        self._text = []
+
+    def feed(self, line: str) -> Optional[Dict]:
+        """
+        Consume a single line and return a cue entry once the cue it belongs to is complete.
+
+        Args:
+            line (str): A line of SRT text, with or without its line terminator.
+
+        Returns:
+            Optional[Dict]: The completed cue entry, or None while a cue is still being read.
+        """
+        line = line.lstrip("\ufeff").strip()
+
+        if self._timing is None:
+            match = SRT_TIMING_PATTERN.match(line)
+            if match:
+                self._timing = match.groups()
+            return None
+
+        if line:
+            self._text.append(line)
+            return None
+
+        return self.close()
+
+    def close(self) -> Optional[Dict]:
+        """
+        Flush the cue that is currently being read, if any.
+
+        Returns:
+            Optional[Dict]: The pending cue entry, or None when there is nothing to flush or
+            the pending cue has no text.
+        """
+        timing, text = self._timing, self._text
+        self._timing, self._text = None, []
+
+        if timing is None or not text:
+            return None
+
+        return {
+            "start_ms": parse_srt_timestamp(timing[0]),
+            "end_ms": parse_srt_timestamp(timing[1]),
+            "cc_subtitle": " ".join(text),
+        }
+
+
+def iter_srt_cues(lines: Iterable[str]) -> Iterator[Dict]:
+    """
+    Lazily parse SRT lines into cue entries.
+
+    Args:
+        lines (Iterable[str]): SRT text, one line per item, e.g. an open text stream.
+
+    Yields:
+        Dict: Cue entries with `start_ms`, `end_ms` and `cc_subtitle` keys.
+    """
+    parser = SRTParser()
+    for line in lines:
+        entry = parser.feed(line)
+        if entry is not None:
+            yield entry
+
+    entry = parser.close()
+    if entry is not None:
+        yield entry
@@ -0,0 +1,526 @@
+import atexit
+import fcntl
+import io
+import json
+import logging
+import os
+import re
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from lexicon.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "MeteredReader",
+    "StreamMeter",
+    "render_metrics",
+    "telemetry",
+]
+
+KB, MB = 1024, 1024 * 1024
+# Upper bounds of the histogram buckets; every histogram also has a +Inf bucket
+SIZE_BUCKETS = [KB, 64 * KB, 256 * KB, MB, 4 * MB, 16 * MB, 64 * MB, 256 * MB, 1024 * MB]
+TTFB_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5]
+DURATION_BUCKETS = [0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600]
+THROUGHPUT_BUCKETS = [128 * KB, 512 * KB, MB, 4 * MB, 16 * MB, 64 * MB, 256 * MB]
+
+HISTOGRAMS = {
+    "range_bytes": (SIZE_BUCKETS, "Length of the requested byte ranges."),
+    "sent_bytes": (SIZE_BUCKETS, "Bytes sent per response."),
+    "ttfb_seconds": (TTFB_BUCKETS, "Time from the request to the first body byte."),
+    "duration_seconds": (DURATION_BUCKETS, "Time from the request until the stream ended."),
+    "throughput_bytes_per_second": (THROUGHPUT_BUCKETS, "Throughput of each stream."),
+}
+VIDEO_HISTOGRAMS = ["range_bytes", "sent_bytes"]
+# Per-video statistics of the videos that are no longer tracked individually are summed up
+# under this video id, so no request drops out of the per-video totals
+OTHER_VIDEOS = "other"
+# Files of live processes are `<host>-<pid>-<random>.json`; `<host>-retired.json` holds the
+# sums of the processes of that host that exited
+RETIRED_NAME = "retired"
+LOCK_NAME = ".retire.lock"
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed bucket bounds, like Prometheus histograms.
+    """
+
+    def __init__(self, bounds: List[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                break
+        else:
+            i = len(self.bounds)
+        self.counts[i] += 1
+        self.sum += value
+
+    def to_json(self) -> dict:
+        return {"counts": self.counts, "sum": self.sum}
+
+    def merge(self, data: dict):
+        if len(data["counts"]) == len(self.counts):
+            self.counts = [a + b for a, b in zip(self.counts, data["counts"])]
+            self.sum += data["sum"]
+
+
+class StreamStats:
+    """
+    Counters and histograms of the playback requests of one video, or of all of them.
+    """
+
+    def __init__(self, histograms: Iterable[str]):
+        self.statuses = Counter()
+        self.aborts = 0
+        self.bytes_sent = 0
+        self.histograms = {name: Histogram(HISTOGRAMS[name][0]) for name in histograms}
+
+    def observe(self, name: str, value: Optional[float]):
+        if value is not None and name in self.histograms:
+            self.histograms[name].observe(value)
+
+    def to_json(self) -> dict:
+        return {
+            "statuses": dict(self.statuses),
+            "aborts": self.aborts,
+            "bytes_sent": self.bytes_sent,
+            "histograms": {name: h.to_json() for name, h in self.histograms.items()},
+        }
+
+    def merge(self, data: dict):
+        self.statuses.update(data["statuses"])
+        self.aborts += data["aborts"]
+        self.bytes_sent += data["bytes_sent"]
+        for name, histogram in data["histograms"].items():
+            if name in self.histograms:
+                self.histograms[name].merge(histogram)
+
+
+class SnapshotTotals:
+    """
+    Sum of the statistics snapshots of several processes.
+    """
+
+    def __init__(self):
+        self.stats = StreamStats(HISTOGRAMS)
+        self.videos: Dict[str, StreamStats] = {}
+        self.segment_cache = Counter()
+
+    def merge(self, snapshot: dict):
+        self.stats.merge(snapshot["global"])
+        for video_id, data in snapshot["videos"].items():
+            self.videos.setdefault(video_id, StreamStats(VIDEO_HISTOGRAMS)).merge(data)
+        self.segment_cache.update(snapshot.get("segment_cache", {}))
+
+    def to_json(self, max_videos: Optional[int] = None) -> dict:
+        """
+        Args:
+            max_videos (Optional[int]): Only keep the videos with the most requests on their
+                own, and add the others to the `OTHER_VIDEOS` statistics.
+        """
+        videos = [item for item in self.videos.items() if item[0] != OTHER_VIDEOS]
+        other = self.videos.get(OTHER_VIDEOS)
+        if max_videos is not None and len(videos) > max_videos:
+            videos.sort(key=lambda item: sum(item[1].statuses.values()), reverse=True)
+            other = other or StreamStats(VIDEO_HISTOGRAMS)
+            for _video_id, stats in videos[max_videos:]:
+                other.merge(stats.to_json())
+            videos = videos[:max_videos]
+        if other is not None:
+            videos.append((OTHER_VIDEOS, other))
+        return {
+            "global": self.stats.to_json(),
+            "videos": {video_id: stats.to_json() for video_id, stats in videos},
+            "segment_cache": dict(self.segment_cache),
+        }
+
+
+class StreamMeter:
+    """
+    Measures one playback response: the requested range, the bytes sent, the time to the
+    first body byte, how long the stream lasted and whether the client aborted it.
+
+    Servers that `sendfile()` a response never hand its bytes to Python; for those the
+    response is assumed to be sent in full unless it ended with an error.
+    """
+
+    def __init__(self, video_id: int):
+        self.video_id = video_id
+        self.started = time.perf_counter()
+        self.first_byte_at = None
+        self.status = None
+        self.range_length = None
+        self.expected = 0
+        self.bytes_sent = 0
+        self.sendfile = False
+        self.finished = False
+
+    def attach(self, response, plan, send_body: bool = True):
+        """
+        Meter a response sent according to `plan`, until the response is closed.
+        """
+        self.start(plan, send_body)
+        response._resource_closers.append(self.close)
+
+    def wrap(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Count the bytes of a streamed body as they are produced.
+        """
+        for chunk in chunks:
+            self.sent(len(chunk))
+            yield chunk
+
+    def start(self, plan, send_body: bool = True):
+        """
+        Record the response about to be sent, from its `FilePlan`.
+        """
+        self.status = plan.status
+        if plan.parts:
+            self.range_length = sum(length for _header, _start, length in plan.parts)
+        if send_body and plan.parts:
+            self.expected = plan.content_length
+
+    def sent(self, nbytes: int):
+        if self.first_byte_at is None and nbytes:
+            self.first_byte_at = time.perf_counter()
+        self.bytes_sent += nbytes
+
+    def finish(self, aborted: bool = False):
+        """
+        Record the stream as ended. Only the first call counts.
+        """
+        if self.finished or self.status is None:
+            return
+        self.finished = True
+        if self.sendfile and not aborted:
+            self.bytes_sent = self.expected
+        telemetry.record(self, aborted=aborted or self.bytes_sent < self.expected)
+
+    def close(self):
+        """
+        Response closer: WSGI servers close the response when it was sent, or when sending it
+        failed because the client went away, in which case the error is still being handled.
+        """
+        self.finish(aborted=sys.exc_info()[0] is not None)
+
+
+class MeteredReader:
+    """
+    Wraps the file-like body of a `FileResponse` to count the bytes read from it. Servers
+    that ask for its `fileno()` to `sendfile()` it are noted instead.
+    """
+
+    def __init__(self, reader, meter: StreamMeter):
+        self.reader = reader
+        self.meter = meter
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.reader.read(size)
+        self.meter.sent(len(data))
+        return data
+
+    def fileno(self) -> int:
+        if not hasattr(self.reader, "fileno"):
+            raise io.UnsupportedOperation("fileno")
+        fileno = self.reader.fileno()
+        self.meter.sendfile = True
+        if self.meter.first_byte_at is None:
+            self.meter.first_byte_at = time.perf_counter()
+        return fileno
+
+    def close(self):
+        self.reader.close()
+
+
+class PlaybackTelemetry:
+    """
+    Aggregates the playback streams of this process into global and per-video statistics.
+
+    Every process periodically writes its cumulative statistics to a file of its own in
+    `PLAYBACK_TELEMETRY_DIR`, and the metrics endpoint sums the files of all processes of a
+    node, like the multiprocess mode of the Prometheus client. Files of processes that exited
+    are folded into a single retired file of their host when collected, so restarted workers
+    don't pile up files while the sums stay monotonic.
+
+    Only the `PLAYBACK_TELEMETRY_MAX_VIDEOS` most recently played videos are tracked on their
+    own per process; the statistics of videos evicted from that set are added to the
+    `OTHER_VIDEOS` statistics. The series of an evicted video that is played again restart,
+    which Prometheus handles as a counter reset.
+
+    Statistics are flushed every `PLAYBACK_TELEMETRY_FLUSH_INTERVAL` seconds by a background
+    thread, and when the process exits.
+    """
+
+    def __init__(self):
+        self.stats = StreamStats(HISTOGRAMS)
+        self.videos = LRUCache(
+            maxsize=settings.PLAYBACK_TELEMETRY_MAX_VIDEOS, on_evict=self._add_to_other_videos
+        )
+        self.other_videos = StreamStats(VIDEO_HISTOGRAMS)
+        self.pid = None
+        self.name = None
+        self.flusher_pid = None
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def record(self, meter: StreamMeter, aborted: bool):
+        now = time.perf_counter()
+        duration = now - meter.started
+        ttfb = meter.first_byte_at - meter.started if meter.first_byte_at else None
+        throughput = meter.bytes_sent / duration if meter.bytes_sent and duration > 0 else None
+        with self._lock:
+            video = self.videos.get(meter.video_id)
+            if video is None:
+                video = StreamStats(VIDEO_HISTOGRAMS)
+                self.videos.set(meter.video_id, video)
+            for stats in (self.stats, video):
+                stats.statuses[str(meter.status)] += 1
+                stats.aborts += aborted
+                stats.bytes_sent += meter.bytes_sent
+                stats.observe("range_bytes", meter.range_length)
+                stats.observe("sent_bytes", meter.bytes_sent if meter.expected else None)
+                stats.observe("ttfb_seconds", ttfb)
+                stats.observe("duration_seconds", duration if meter.expected else None)
+                stats.observe("throughput_bytes_per_second", throughput)
+            self.dirty = True
+            if self.flusher_pid != os.getpid():
+                # Not started yet, or this is a forked child without the parent's thread
+                self.flusher_pid = os.getpid()
+                threading.Thread(
+                    target=self._flush_periodically, name="playback-telemetry", daemon=True
+                ).start()
+
+    def _add_to_other_videos(self, _video_id, stats: StreamStats):
+        # Called by `self.videos` while `record()` holds the lock
+        self.other_videos.merge(stats.to_json())
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(settings.PLAYBACK_TELEMETRY_FLUSH_INTERVAL)
+            self.flush_pending()
+
+    def flush_pending(self):
+        """
+        Flush the statistics if anything was recorded since the last flush.
+        """
+        if self.dirty:
+            self.flush()
+
+    def to_json(self) -> dict:
+        from .segment_cache import segment_cache
+
+        with self._lock:
+            videos = {str(video_id): stats.to_json() for video_id, stats in self.videos.items()}
+            if any(self.other_videos.statuses.values()):
+                videos[OTHER_VIDEOS] = self.other_videos.to_json()
+            return {
+                "global": self.stats.to_json(),
+                "videos": videos,
+                "segment_cache": {
+                    name: getattr(segment_cache, name)
+                    for name in ("hits", "misses", "admissions", "evictions")
+                },
+            }
+
+    def flush(self):
+        """
+        Write the statistics of this process to its file.
+        """
+        self.dirty = False
+        if self.pid != os.getpid():
+            # Forked workers write files of their own
+            self.pid = os.getpid()
+            self.name = f"{socket.gethostname()}-{self.pid}-{uuid.uuid4().hex[:8]}"
+        directory = settings.PLAYBACK_TELEMETRY_DIR
+        try:
+            os.makedirs(directory, exist_ok=True)
+            _write_json(os.path.join(directory, f"{self.name}.json"), self.to_json())
+        except OSError as e:
+            logger.warning(f"Could not write playback telemetry: {e}")
+
+    def collect(self) -> List[dict]:
+        """
+        Returns the statistics of all processes of this node, after flushing our own and
+        retiring the files of processes that exited.
+        """
+        self.flush()
+        directory = settings.PLAYBACK_TELEMETRY_DIR
+        try:
+            self.retire(directory)
+        except OSError as e:
+            logger.warning(f"Could not retire playback telemetry: {e}")
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            return [self.to_json()]
+        snapshots = []
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            snapshot = _read_json(os.path.join(directory, name))
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        return snapshots
+
+    def retire(self, directory: str):
+        """
+        Add the files of the processes of this host that exited to the host's retired file
+        and delete them.
+
+        The retired file lists the files already added to it, so a file is never counted
+        twice, even if deleting it failed. Only one process retires files at a time; others
+        skip it rather than wait.
+        """
+        host = socket.gethostname()
+        with open(os.path.join(directory, LOCK_NAME), "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            names = set(os.listdir(directory))
+            exited = [name for name in sorted(names) if _exited_process_file(name, host)]
+            if not exited:
+                return
+
+            retired_path = os.path.join(directory, f"{host}-{RETIRED_NAME}.json")
+            totals = SnapshotTotals()
+            retired = _read_json(retired_path) or {}
+            if retired:
+                totals.merge(retired)
+            added = set(retired.get("retired_files", [])) & names
+            for name in exited:
+                snapshot = _read_json(os.path.join(directory, name))
+                if name not in added and snapshot is not None:
+                    totals.merge(snapshot)
+                    added.add(name)
+
+            retired = totals.to_json(max_videos=settings.PLAYBACK_TELEMETRY_MAX_VIDEOS)
+            retired["retired_files"] = sorted(added)
+            _write_json(retired_path, retired)
+            for name in exited:
+                os.remove(os.path.join(directory, name))
+        logger.info(f"Retired the playback telemetry of {len(exited)} exited process(es).")
+
+
+def _write_json(path: str, data: dict):
+    """
+    Atomically replace the file at `path` with `data`, so readers never see a partial file.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _exited_process_file(name: str, host: str) -> bool:
+    """
+    Whether `name` is the file of a process of `host` that is no longer running.
+    """
+    match = re.fullmatch(rf"{re.escape(host)}-(\d+)-[0-9a-f]{{8}}\.json", name)
+    if match is None:
+        return False
+    pid = int(match.group(1))
+    if pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+def _family_lines(prefix: str, entries: List[Tuple[Dict[str, str], StreamStats]]) -> List[str]:
+    """
+    Render the metric families of `StreamStats` objects, one labelled sample per entry.
+    Samples of a family have to be consecutive in the text format.
+    """
+    lines = [f"# TYPE {prefix}_requests_total counter"]
+    for labels, stats in entries:
+        for status, count in sorted(stats.statuses.items()):
+            lines.append(f"{prefix}_requests_total{_labels({**labels, 'status': status})} {count}")
+    for name, attribute in (("aborts_total", "aborts"), ("sent_bytes_total", "bytes_sent")):
+        lines.append(f"# TYPE {prefix}_{name} counter")
+        for labels, stats in entries:
+            lines.append(f"{prefix}_{name}{_labels(labels)} {getattr(stats, attribute)}")
+
+    for name in entries[0][1].histograms if entries else []:
+        bounds, help_text = HISTOGRAMS[name]
+        metric = f"{prefix}_{name}"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+        for labels, stats in entries:
+            histogram, cumulative = stats.histograms[name], 0
+            for bound, count in zip(bounds + ["+Inf"], histogram.counts):
+                cumulative += count
+                lines.append(f"{metric}_bucket{_labels({**labels, 'le': str(bound)})} {cumulative}")
+            lines.append(f"{metric}_sum{_labels(labels)} {histogram.sum}")
+            lines.append(f"{metric}_count{_labels(labels)} {cumulative}")
+    return lines
+
+
+def _video_order(item: Tuple[str, StreamStats]):
+    # Videos by id, then the other videos
+    video_id = item[0]
+    return (1, 0) if video_id == OTHER_VIDEOS else (0, int(video_id))
+
+
+def render_metrics(snapshots: List[dict]) -> str:
+    """
+    Sum the statistics of several processes and render them in the Prometheus text format.
+    """
+    totals = SnapshotTotals()
+    for snapshot in snapshots:
+        totals.merge(snapshot)
+
+    lines = _family_lines("lexicon_playback", [({}, totals.stats)])
+    lines += _family_lines(
+        "lexicon_video_playback",
+        [
+            ({"video_id": video_id}, stats)
+            for video_id, stats in sorted(totals.videos.items(), key=_video_order)
+        ],
+    )
+    for name, count in sorted(totals.segment_cache.items()):
+        lines += [
+            f"# TYPE lexicon_segment_cache_{name}_total counter",
+            f"lexicon_segment_cache_{name}_total {count}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+telemetry = PlaybackTelemetry()
+atexit.register(telemetry.flush_pending)
@@ -0,0 +1,70 @@
+MS_PER_SECOND = 1000
+MS_PER_MINUTE = 60 * MS_PER_SECOND
+MS_PER_HOUR = 60 * MS_PER_MINUTE
+
+
+def parse_srt_timestamp(value: str) -> int:
+    """
+    Convert an SRT timestamp to milliseconds.
+    Example: '01:02:03,456' -> 3723456 ('.' is accepted in place of ',')
+    """
+    hours, minutes, seconds = value.strip().split(":")
+    seconds, millis = seconds.replace(",", ".").split(".")
+    return (
+        int(hours) * MS_PER_HOUR
+        + int(minutes) * MS_PER_MINUTE
+        + int(seconds) * MS_PER_SECOND
+        + int(millis.ljust(3, "0")[:3])
+    )
+
+
+def parse_iso_timestamp(value: str) -> int:
+    """
+    Convert an 'HH:MM:SS[.ffffff]' timestamp, as produced by `format_iso_timestamp`,
+    to milliseconds.
+    Example: '00:00:01.773000' -> 1773
+    """
+    hours, minutes, seconds = value.strip().split(":")
+    seconds, _, fraction = seconds.partition(".")
+    return (
+        int(hours) * MS_PER_HOUR
+        + int(minutes) * MS_PER_MINUTE
+        + int(seconds) * MS_PER_SECOND
+        + (int(fraction.ljust(3, "0")[:3]) if fraction else 0)
+    )
+
+
+def _split(ms: int):
+    hours, ms = divmod(ms, MS_PER_HOUR)
+    minutes, ms = divmod(ms, MS_PER_MINUTE)
+    seconds, ms = divmod(ms, MS_PER_SECOND)
+    return hours, minutes, seconds, ms
+
+
+def format_srt_timestamp(ms: int) -> str:
+    """
+    Format milliseconds as 'HH:MM:SS,mmm'.
+    Example: 1000 -> '00:00:01,000'
+    """
+    return "{:02}:{:02}:{:02},{:03}".format(*_split(ms))
+
+
+def format_iso_timestamp(ms: int) -> str:
+    """
+    Format milliseconds the way `datetime.time.isoformat` renders a time of day,
+    i.e. 'HH:MM:SS' or 'HH:MM:SS.ffffff' when there is a fractional part.
+    Example: 1773 -> '00:00:01.773000'
+    """
+    hours, minutes, seconds, millis = _split(ms)
+    value = f"{hours:02}:{minutes:02}:{seconds:02}"
+    if millis:
+        value += f".{millis * 1000:06}"
+    return value
+
+
+def format_vtt_timestamp(ms: int) -> str:
+    """
+    Format milliseconds as a WebVTT timestamp, 'HH:MM:SS.mmm'.
+    Example: 1000 -> '00:00:01.000'
+    """
+    return "{:02}:{:02}:{:02}.{:03}".format(*_split(ms))
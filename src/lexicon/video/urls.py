@@ -1,20 +1,65 @@
 from django.urls import path
 
-from lexicon.video.views.playback import VideoPlaybackView
-from lexicon.video.views.subtitle import SubtitleSearchView, SubtitleView
-from lexicon.video.views.video import VideoListCreateView, VideoPageListView
+from lexicon.video.views.metrics import PlaybackMetricsView
+from lexicon.video.views.playback import HLSPlaybackView, VideoPlaybackView
+from lexicon.video.views.subtitle import SubtitleSearchView, SubtitleTrackView, SubtitleView
+from lexicon.video.views.upload import (
+    UploadChunkView,
+    UploadSessionCompleteView,
+    UploadSessionCreateView,
+    UploadSessionDetailView,
+)
+from lexicon.video.views.video import VideoDetailView, VideoListCreateView, VideoPageListView
 
 urlpatterns = [
     path("list/", VideoPageListView.as_view(), name="video-list"),
     path("api/v1/videos/", VideoListCreateView.as_view(), name="video-upload"),
+    path("api/v1/videos/<int:pk>/", VideoDetailView.as_view(), name="video-detail"),
+    path("api/v1/uploads/", UploadSessionCreateView.as_view(), name="upload-session-create"),
+    path(
+        "api/v1/uploads/<uuid:token>/",
+        UploadSessionDetailView.as_view(),
+        name="upload-session-detail",
+    ),
+    path(
+        "api/v1/uploads/<uuid:token>/chunks/<int:index>/",
+        UploadChunkView.as_view(),
+        name="upload-session-chunk",
+    ),
+    path(
+        "api/v1/uploads/<uuid:token>/complete/",
+        UploadSessionCompleteView.as_view(),
+        name="upload-session-complete",
+    ),
     path(
         "api/v1/video/playback/<str:file_name>/", VideoPlaybackView.as_view(), name="video-playback"
     ),
+    path("api/v1/metrics/playback/", PlaybackMetricsView.as_view(), name="playback-metrics"),
+    path(
+        "api/v1/videos/<int:video_id>/hls/master.m3u8",
+        HLSPlaybackView.as_view(),
+        name="video-hls-master",
+    ),
+    path(
+        "api/v1/videos/<int:video_id>/hls/<int:package_id>/<path:path>",
+        HLSPlaybackView.as_view(),
+        name="video-hls-file",
+    ),
     path(
         "api/v1/videos/subtitle/<str:file_name>/",
         SubtitleView.as_view(),
         name="video-subtitle",
     ),
+    path(
+        "api/v1/videos/<int:video_id>/subtitles/<str:language>.vtt",
+        SubtitleTrackView.as_view(),
+        name="video-subtitle-track",
+    ),
+    path(
+        "api/v1/videos/<int:video_id>/subtitles/<str:language>/<str:version>.vtt",
+        SubtitleTrackView.as_view(),
+        name="video-subtitle-track-version",
+    ),
     path(
         "api/v1/videos/subtitles/",
         SubtitleSearchView.as_view(),
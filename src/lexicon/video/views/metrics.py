@@ -0,0 +1,24 @@
+from django.http import HttpResponse
+from rest_framework.permissions import IsAdminUser
+
+from lexicon.api.views import APIView
+from lexicon.video.telemetry import render_metrics, telemetry
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class PlaybackMetricsView(APIView):
+    """
+    API view exposing the playback telemetry of all worker processes of this node in the
+    Prometheus text format, for a scraper authenticating as an admin user.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Handle GET requests for the current playback metrics.
+        """
+        return HttpResponse(
+            render_metrics(telemetry.collect()), content_type=PROMETHEUS_CONTENT_TYPE
+        )
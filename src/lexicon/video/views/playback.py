@@ -1,12 +1,27 @@
 import os
 
-from django.http import HttpResponse, StreamingHttpResponse
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404
+from django.shortcuts import get_object_or_404, redirect
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
 from rest_framework import status
 from rest_framework.response import Response
-from rest_framework.views import APIView
 
-from lexicon.video.models import Video
+from lexicon.api.throttle import BurstAnonRateThrottle, PlaybackConcurrencyThrottle
+from lexicon.api.views import APIView
+from lexicon.video.files import forget_video_file, get_video_file
+from lexicon.video.http import file_etag, offload_response, serve_file
+from lexicon.video.models import Video, VideoPackage
+from lexicon.video.packaging import MASTER_PLAYLIST, get_latest_package
+from lexicon.video.segment_cache import serve_from_segment_cache
+from lexicon.video.telemetry import StreamMeter
+
+HLS_CONTENT_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+}
 
 
 class VideoPlaybackView(APIView):
@@ -14,99 +29,95 @@ class VideoPlaybackView(APIView):
     API view for streaming video files with support for range requests.
     """
 
+    throttle_classes = [BurstAnonRateThrottle, PlaybackConcurrencyThrottle]
+
     def get(self, request, file_name, *args, **kwargs):
         """
-        Handle GET requests to stream a video file. Supports range requests for partial content streaming.
+        Handle GET and HEAD requests to stream a video file. Supports single and multiple
+        byte ranges and conditional requests, so browsers revalidate cached videos instead
+        of downloading them again.
         """
-        video = self.get_video(file_name)
-        if isinstance(video, Response):
-            return video
+        video_file = get_video_file(file_name)
+        if video_file is None:
+            return Response({"detail": "File not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        file_path = video.video_file.path
-        file_size = os.path.getsize(file_path)
-        range_header = request.headers.get("Range")
+        offloaded = offload_response(video_file.path, video_file.content_type, file_name)
+        if offloaded is not None:
+            return offloaded
 
-        if range_header:
-            return self.handle_range_request(range_header, file_path, file_size)
-        else:
-            return self.stream_full_video(file_path, file_name, file_size)
+        meter = StreamMeter(video_file.video_id) if settings.PLAYBACK_TELEMETRY_ENABLED else None
+        cached = serve_from_segment_cache(request, video_file, file_name, meter)
+        if cached is not None:
+            return cached
 
-    def get_video(self, file_name):
-        """
-        Retrieve the video object based on the file name. Return a 404 response if not found.
-        """
-        video = get_object_or_404(Video, video_file__icontains=file_name)
-        file_path = video.video_file.path
-
-        if not os.path.exists(file_path):
+        cached_stat = (video_file.size, video_file.mtime_ns)
+        try:
+            response = serve_file(
+                request,
+                video_file.path,
+                content_type=video_file.content_type,
+                filename=file_name,
+                cached_stat=cached_stat,
+                meter=meter,
+            )
+        except FileNotFoundError:
+            forget_video_file(file_name)
             return Response({"detail": "File not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        return video
+        if response.get("ETag") != file_etag(*cached_stat):
+            # The file was replaced since it was cached, e.g. by a remux
+            forget_video_file(file_name)
+        return response
 
-    def handle_range_request(self, range_header, file_path, file_size):
-        """
-        Handle HTTP Range requests for partial video streaming.
-        """
-        try:
-            start, end = self.parse_byte_range(range_header, file_size)
-            if start >= file_size:
-                return HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
 
-            end = min(end, file_size - 1)
-            content_length = end - start + 1
+class HLSPlaybackView(APIView):
+    """
+    API view serving the HLS playlists and segments of a video's packaged renditions.
 
-            response = StreamingHttpResponse(
-                self.get_video_stream(file_path, start, end + 1),
-                status=status.HTTP_206_PARTIAL_CONTENT,
-                content_type="video/mp4",
-            )
-            response["Content-Range"] = f"bytes {start}-{end}/{file_size}"
-            response["Content-Length"] = str(content_length)
-            return response
-        except ValueError:
-            return HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+    The master playlist URL of a video is stable and redirects to the newest package, so it
+    is only cached briefly. Files inside a package never change and are cached for a long
+    time by browsers and edge caches.
+    """
 
-    def parse_byte_range(self, range_header, file_size):
+    def get(self, request, video_id, package_id=None, path=MASTER_PLAYLIST, *args, **kwargs):
         """
-        Parse the 'Range' header and return the start and end byte positions.
+        Handle GET requests for the master playlist of a video, or for a file of a package.
         """
-        byte_range = range_header.strip().replace("bytes=", "")
-        start, end = byte_range.split("-")
-        start = int(start)
-        end = int(end) if end else file_size - 1
-        return start, end
+        video = get_object_or_404(Video.objects.only("id", "source_id"), id=video_id)
+        # Duplicate uploads are streamed from the package of their source video
+        package_video_id = video.source_id or video.id
+
+        if package_id is None:
+            package = get_latest_package(package_video_id)
+            if package is None:
+                raise Http404("Video has not been packaged for streaming.")
+            response = redirect(
+                "lexicon_video:video-hls-file",
+                video_id=video.id,
+                package_id=package.id,
+                path=MASTER_PLAYLIST,
+            )
+            patch_cache_control(response, public=True, max_age=settings.HLS_MASTER_MAX_AGE)
+            return response
 
-    def stream_full_video(self, file_path, file_name, file_size):
-        """
-        Stream the full video if no range request is provided.
-        """
-        response = StreamingHttpResponse(self.get_video_stream(file_path), content_type="video/mp4")
-        response["Content-Disposition"] = f'inline; filename="{file_name}"'
-        response["Content-Length"] = str(file_size)
+        package = get_object_or_404(
+            VideoPackage,
+            id=package_id,
+            video_id=package_video_id,
+            status=VideoPackage.Status.COMPLETED,
+        )
+        content_type = HLS_CONTENT_TYPES.get(os.path.splitext(path)[1])
+        try:
+            file_path = safe_join(package.directory, path)
+        except SuspiciousFileOperation:
+            raise Http404("File not found.")
+        if content_type is None or not os.path.isfile(file_path):
+            raise Http404("File not found.")
+
+        response = offload_response(file_path, content_type) or serve_file(
+            request, file_path, content_type=content_type
+        )
+        patch_cache_control(
+            response, public=True, max_age=settings.HLS_CACHE_MAX_AGE, immutable=True
+        )
         return response
-
-    def get_video_stream(self, file_path, start=0, end=None):
-        """
-        Generator function to stream the video file in chunks.
-        """
-        chunk_size = self.get_chunk_size()
-        with open(file_path, "rb") as f:
-            f.seek(start)
-            remaining = (end - start) if end else None
-
-            while remaining is None or remaining > 0:
-                chunk = f.read(chunk_size)
-                if not chunk:
-                    break
-                if remaining is not None:
-                    if len(chunk) > remaining:
-                        chunk = chunk[:remaining]
-                    remaining -= len(chunk)
-                yield chunk
-
-    @staticmethod
-    def get_chunk_size():
-        """
-        Return the optimal chunk size for streaming the video.
-        """
-        return 8192  # Chunk size can be configured or optimized later based on testing
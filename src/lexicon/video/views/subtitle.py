@@ -1,16 +1,35 @@
+import re
+
+from django.conf import settings
 from django.core.cache import cache
-from django.shortcuts import get_object_or_404
+from django.db.models import Q
+from django.http import Http404
+from django.shortcuts import get_object_or_404, redirect
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django_filters import rest_framework as dj_filters
 from rest_framework import filters, serializers
+from rest_framework.utils.urls import replace_query_param
+
+from lexicon.api.pagination import (
+    DefaultPageNumberPagination,
+    PaginatedListAPIViewMixin,
+    decode_keyset_cursor,
+    encode_keyset_cursor,
+)
+from lexicon.api.throttle import BurstAnonRateThrottle, SearchConcurrencyThrottle
+from lexicon.api.views import APIView, GenericAPIView
+from lexicon.video.files import get_video_file
+from lexicon.video.http import serve_file
+from lexicon.video.models import Subtitle, SubtitleTrack, Video
+from lexicon.video.timecodes import format_iso_timestamp, format_srt_timestamp, parse_iso_timestamp
 
-from lexicon.api.pagination import DefaultPageNumberPagination, PaginatedListAPIViewMixin
-from lexicon.api.views import GenericAPIView
-from lexicon.video.models import Subtitle, Video
+WEBVTT_CONTENT_TYPE = "text/vtt; charset=utf-8"
+ACCEPTS_GZIP = re.compile(r"\bgzip\b")
 
 
 class SubtitleView(GenericAPIView):
     """
-    API view to retrieve and cache subtitles for a given video file.
+    API view to retrieve a time window of the subtitles of a video file, a page at a time.
     """
 
     class Filterset(dj_filters.FilterSet):
@@ -18,81 +37,195 @@ class SubtitleView(GenericAPIView):
             model = Subtitle
             fields = ["language"]
 
-    filter_backends = [dj_filters.DjangoFilterBackend]
-    filterset_class = Filterset
-
-    def filter_queryset(self, queryset):
-        return super().filter_queryset(queryset)
-
-    def get(self, request, file_name, *args, **kwargs):
+    class WindowSerializer(serializers.Serializer):
         """
-        Retrieve subtitles for a given video file and cache the result.
-        Only the first 1000 subtitles are processed for performance reasons.
+        Serializer for the time window, page size and continuation token of a request.
         """
-        start_time = request.query_params.get("start_time")
 
-        if start_time:
+        start_time = serializers.CharField(required=False)
+        end_time = serializers.CharField(required=False)
+        limit = serializers.IntegerField(
+            min_value=1,
+            max_value=settings.SUBTITLE_WINDOW_MAX_LIMIT,
+            default=settings.SUBTITLE_WINDOW_LIMIT,
+        )
+        cursor = serializers.CharField(required=False)
+
+        def validate_start_time(self, value):
+            return self._parse_time(value)
+
+        def validate_end_time(self, value):
+            return self._parse_time(value)
+
+        def validate_cursor(self, value):
+            try:
+                return decode_keyset_cursor(value, size=2)
+            except ValueError as e:
+                raise serializers.ValidationError(str(e))
+
+        @staticmethod
+        def _parse_time(value):
             try:
-                start_time = self.convert_to_time(start_time)
+                return SubtitleView.convert_to_ms(value)
             except ValueError:
-                return self.error_response(
-                    message="Invalid start_time format. Expected format: HH:MM:SS,ms"
+                raise serializers.ValidationError(
+                    "Invalid time format. Expected format: HH:MM:SS.ffffff"
                 )
 
-        cache_key = f"subtitles_{file_name}_{start_time}"
-        cached_subtitles = cache.get(cache_key)
-
-        if cached_subtitles:
-            return self.success_response(data={"subtitles": cached_subtitles})
-
-        video = get_object_or_404(Video, video_file__icontains=file_name)
+    filter_backends = [dj_filters.DjangoFilterBackend]
+    filterset_class = Filterset
 
-        subtitles = Subtitle.objects.filter(video=video)
-        if start_time:
-            subtitles = subtitles.filter(start_time__gte=start_time)
+    def filter_queryset(self, queryset):
+        return super().filter_queryset(queryset)
 
-        subtitles = subtitles.order_by("start_time")
-        filtered_subtitles = self.filter_queryset(subtitles)
+    def get(self, request, file_name, *args, **kwargs):
+        """
+        Retrieve the subtitles of a video file starting in `[start_time, end_time)`, at most
+        `limit` of them, in order of their start, and cache the result.
 
-        subtitle_list = [
-            {
-                "start_time": self.format_time(subtitle.start_time),
-                "end_time": self.format_time(subtitle.end_time),
-                "content": subtitle.cc_subtitle,
-            }
-            for subtitle in filtered_subtitles
-        ]
+        The response carries a `next_cursor` token, and a `next` link, when more subtitles of
+        the window remain; passing the token back as `cursor` continues after the last
+        subtitle returned.
+        """
+        window = self.WindowSerializer(data=request.query_params)
+        window.is_valid(raise_exception=True)
+        params = window.validated_data
+
+        cache_key = "subtitles_{}_{}_{}_{}_{}_{}".format(
+            file_name,
+            request.query_params.get("language", ""),
+            params.get("start_time", ""),
+            params.get("end_time", ""),
+            params["limit"],
+            request.query_params.get("cursor", ""),
+        )
+        cached_page = cache.get(cache_key)
+        if cached_page is not None:
+            return self.success_response(data=cached_page)
+
+        video_file = get_video_file(file_name)
+        if video_file is None:
+            raise Http404("Video not found.")
+
+        subtitles = self.get_window_queryset(video_file.video_id, params)
+        # One extra row tells whether the window continues after this page
+        rows = list(
+            subtitles.order_by("start_ms", "id").values_list(
+                "id", "start_ms", "end_ms", "cc_subtitle"
+            )[: params["limit"] + 1]
+        )
+        next_cursor = None
+        if len(rows) > params["limit"]:
+            rows = rows[: params["limit"]]
+            last_id, last_start_ms, _end_ms, _text = rows[-1]
+            next_cursor = encode_keyset_cursor((last_start_ms, last_id))
+
+        page = {
+            "subtitles": [
+                {
+                    "start_time": self.format_time(start_ms),
+                    "end_time": self.format_time(end_ms),
+                    "content": cc_subtitle,
+                }
+                for _id, start_ms, end_ms, cc_subtitle in rows
+            ],
+            "next_cursor": next_cursor,
+            "next": (
+                replace_query_param(request.build_absolute_uri(), "cursor", next_cursor)
+                if next_cursor
+                else None
+            ),
+        }
 
         # Cache the result for 15 minutes
-        cache.set(cache_key, subtitle_list, timeout=60 * 15)
+        cache.set(cache_key, page, timeout=60 * 15)
+
+        return self.success_response(data=page)
 
-        return self.success_response(data={"subtitles": subtitle_list})
+    def get_window_queryset(self, video_id, params):
+        """
+        Subtitles of a video starting within the requested window, after the cursor if any.
+        """
+        subtitles = self.filter_queryset(Subtitle.objects.filter(video_id=video_id))
+        if "start_time" in params:
+            subtitles = subtitles.filter(start_ms__gte=params["start_time"])
+        if "end_time" in params:
+            subtitles = subtitles.filter(start_ms__lt=params["end_time"])
+        if "cursor" in params:
+            start_ms, subtitle_id = params["cursor"]
+            subtitles = subtitles.filter(start_ms__gte=start_ms).filter(
+                Q(start_ms__gt=start_ms) | Q(id__gt=subtitle_id)
+            )
+        return subtitles
 
     @staticmethod
-    def format_time(time_obj):
+    def format_time(ms):
         """
-        Format time to 'HH:MM:SS,ms'.
+        Format milliseconds to 'HH:MM:SS,ms'.
         Example: '00:00:01,000'
         """
-        return f"{time_obj.hour:02}:{time_obj.minute:02}:{time_obj.second:02},{time_obj.microsecond // 1000:03}"
+        return format_srt_timestamp(ms)
 
     @staticmethod
-    def convert_to_time(time_str):
+    def convert_to_ms(time_str):
         """
-        Convert a string time in 'HH:MM:SS.microsecond' format to a time object.
-        Example: '00:00:01.773000' -> time object
+        Convert a string time in 'HH:MM:SS.microsecond' format to milliseconds.
+        Example: '00:00:01.773000' -> 1773
         """
-        from datetime import time
-
         try:
-            hours, minutes, seconds_microseconds = time_str.split(":")
-            seconds, microseconds = map(int, seconds_microseconds.split("."))
-            hours, minutes = int(hours), int(minutes)
-            return time(hour=hours, minute=minutes, second=seconds, microsecond=microseconds)
+            return parse_iso_timestamp(time_str)
         except (ValueError, IndexError):
             raise ValueError("Invalid time format")
 
 
+class SubtitleTrackView(APIView):
+    """
+    API view serving the pre-rendered WebVTT subtitle tracks of a video.
+
+    The track URL of a video and language is stable and redirects to the current rendering
+    of the track, so it is only cached briefly. Renderings are addressed by their version
+    and never change, so they are cached for a long time; clients accepting gzip get the
+    precompressed copy.
+    """
+
+    def get(self, request, video_id, language, version=None, *args, **kwargs):
+        """
+        Handle GET requests for the track of a video in a language, or for a rendering of it.
+        """
+        video = get_object_or_404(Video.objects.only("id", "source_id"), id=video_id)
+        # Duplicate uploads share the subtitles of their source video
+        track = get_object_or_404(
+            SubtitleTrack, video_id=video.source_id or video.id, language=language
+        )
+
+        if version != track.version:
+            response = redirect(
+                "lexicon_video:video-subtitle-track-version",
+                video_id=video.id,
+                language=language,
+                version=track.version,
+            )
+            patch_cache_control(
+                response, public=True, max_age=settings.SUBTITLE_TRACK_REDIRECT_MAX_AGE
+            )
+            return response
+
+        accepts_gzip = ACCEPTS_GZIP.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        try:
+            if accepts_gzip:
+                response = serve_file(request, track.gzip_path, content_type=WEBVTT_CONTENT_TYPE)
+                response["Content-Encoding"] = "gzip"
+            else:
+                response = serve_file(request, track.path, content_type=WEBVTT_CONTENT_TYPE)
+        except FileNotFoundError:
+            raise Http404("Subtitle track not found.")
+        patch_vary_headers(response, ["Accept-Encoding"])
+        patch_cache_control(
+            response, public=True, max_age=settings.SUBTITLE_TRACK_MAX_AGE, immutable=True
+        )
+        return response
+
+
 class SubtitleVideoDetailSerializer(serializers.ModelSerializer):
     """
     Serializer to retrieve video details with custom video file name.
@@ -122,22 +255,28 @@ class SubtitleSearchView(PaginatedListAPIViewMixin, GenericAPIView):
 
     class OutPutSerializer(serializers.ModelSerializer):
         video = SubtitleVideoDetailSerializer()
+        start_time = serializers.SerializerMethodField()
 
         class Meta:
             model = Subtitle
             fields = (
                 "id",
                 "video",
+                "language",
                 "cc_subtitle",
                 "start_time",
             )
 
+        def get_start_time(self, obj):
+            return format_iso_timestamp(obj.start_ms)
+
     class ListPagination(DefaultPageNumberPagination):
         pass
 
     queryset = Subtitle.objects.all()
     serializer_class = OutPutSerializer
     pagination_class = ListPagination
+    throttle_classes = [BurstAnonRateThrottle, SearchConcurrencyThrottle]
     filter_backends = [
         filters.SearchFilter,
     ]
@@ -0,0 +1,147 @@
+import io
+import logging
+
+from rest_framework import serializers, status
+from rest_framework.parsers import JSONParser
+
+from lexicon.api.throttle import BurstAnonRateThrottle, UploadConcurrencyThrottle
+from lexicon.api.views import GenericAPIView
+from lexicon.video.models import UploadSession
+from lexicon.video.services.upload import (
+    complete_upload_session,
+    create_upload_session,
+    get_active_upload_session,
+    get_missing_chunks,
+    write_upload_chunk,
+)
+from lexicon.video.views.video import VideoOutputSerializer
+
+logger = logging.getLogger(__name__)
+
+
+class UploadSessionOutputSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the state of a resumable upload, including which chunks are still missing
+    so an interrupted client knows what to re-send.
+    """
+
+    total_chunks = serializers.IntegerField(read_only=True)
+    missing_chunks = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            "token",
+            "status",
+            "total_size",
+            "chunk_size",
+            "total_chunks",
+            "missing_chunks",
+            "expires_at",
+            "video",
+        ]
+
+    def get_missing_chunks(self, obj):
+        if obj.status != UploadSession.Status.ACTIVE:
+            return []
+        return get_missing_chunks(obj)
+
+
+class UploadSessionCreateView(GenericAPIView):
+    """
+    API view for starting a resumable, chunked video upload.
+    """
+
+    permission_classes = []
+
+    class UploadSessionInputSerializer(serializers.Serializer):
+        title = serializers.CharField(max_length=255)
+        description = serializers.CharField(max_length=200, required=False)
+        language = serializers.ChoiceField(choices=["eng", "kor", "ger"])
+        file_name = serializers.CharField(max_length=255)
+        total_size = serializers.IntegerField(min_value=1)
+        chunk_size = serializers.IntegerField(min_value=64 * 1024, required=False)
+
+    def post(self, request, *args, **kwargs):
+        """
+        Handles POST requests to start an upload session.
+        """
+        serializer = self.UploadSessionInputSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        session = create_upload_session(
+            title=data["title"],
+            description=data.get("description"),
+            language=data["language"],
+            file_name=data["file_name"],
+            total_size=data["total_size"],
+            chunk_size=data.get("chunk_size"),
+        )
+        return self.success_response(
+            item=UploadSessionOutputSerializer(session).data, status=status.HTTP_201_CREATED
+        )
+
+
+class UploadSessionDetailView(GenericAPIView):
+    """
+    API view for checking the progress of an upload session.
+    """
+
+    permission_classes = []
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionOutputSerializer
+    lookup_field = "token"
+
+    def get(self, request, *args, **kwargs):
+        """
+        Handles GET requests to retrieve an upload session.
+        """
+        serializer = self.get_serializer(self.get_object())
+        return self.success_response(item=serializer.data)
+
+
+class UploadChunkView(GenericAPIView):
+    """
+    API view for uploading a single chunk. The request body is the raw chunk data, streamed
+    straight into the staging file; chunks may be sent in parallel and in any order.
+    """
+
+    permission_classes = []
+    throttle_classes = [BurstAnonRateThrottle, UploadConcurrencyThrottle]
+    # The body is read as a stream, never parsed
+    parser_classes = []
+
+    def put(self, request, token, index, *args, **kwargs):
+        """
+        Handles PUT requests carrying chunk `index` of the upload.
+        """
+        session = get_active_upload_session(token)
+        content_length = request.META.get("CONTENT_LENGTH")
+        chunk = write_upload_chunk(
+            session,
+            index,
+            request.stream or io.BytesIO(),
+            int(content_length) if content_length else None,
+        )
+        return self.success_response(item={"index": chunk.index, "size": chunk.size})
+
+
+class UploadSessionCompleteView(GenericAPIView):
+    """
+    API view for completing an upload once every chunk has been received.
+    """
+
+    permission_classes = []
+    throttle_classes = [BurstAnonRateThrottle, UploadConcurrencyThrottle]
+    parser_classes = [JSONParser]
+
+    def post(self, request, token, *args, **kwargs):
+        """
+        Handles POST requests to assemble the upload and create its video.
+        """
+        video = complete_upload_session(token)
+        logger.info(f"Video '{video.title}' uploaded successfully in chunks.")
+        return self.success_response(
+            item=VideoOutputSerializer(video).data, status=status.HTTP_201_CREATED
+        )
@@ -1,13 +1,20 @@
 import logging
 
 from django.shortcuts import render
+from django.urls import reverse
 from rest_framework import filters, serializers, status
 from rest_framework.exceptions import ValidationError
 
 from lexicon.api.file_upload import UploadedFileConfig
 from lexicon.api.pagination import DefaultPageNumberPagination, PaginatedListAPIViewMixin
+from lexicon.api.throttle import (
+    BurstAnonRateThrottle,
+    SearchConcurrencyThrottle,
+    UploadConcurrencyThrottle,
+)
+from lexicon.api.upload_handlers import HashingUploadHandler, ValidatingUploadHandler
 from lexicon.api.views import GenericAPIView
-from lexicon.video.models import Video
+from lexicon.video.models import SubtitleTrack, Video, VideoProcessingRun, VideoProcessingStage
 from lexicon.video.services.video import create_video_entity
 
 logger = logging.getLogger(__name__)
@@ -28,6 +35,94 @@ class VideoPageListView(GenericAPIView):
         return render(request, self.template_name)
 
 
+class VideoProcessingStageSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the timing and row count of a single processing stage.
+    """
+
+    class Meta:
+        model = VideoProcessingStage
+        fields = ["stage", "language", "duration_ms", "row_count"]
+
+
+class VideoProcessingRunSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the status of a processing run with its per-stage timings.
+    """
+
+    stages = VideoProcessingStageSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = VideoProcessingRun
+        fields = ["id", "status", "started_at", "finished_at", "error", "stages"]
+
+
+class SubtitleTrackSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a WebVTT subtitle track, with the URL of its current rendering.
+    """
+
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SubtitleTrack
+        fields = ["language", "cue_count", "url"]
+
+    def get_url(self, obj):
+        return reverse(
+            "lexicon_video:video-subtitle-track-version",
+            kwargs={
+                "video_id": self.context.get("video_id", obj.video_id),
+                "language": obj.language,
+                "version": obj.version,
+            },
+        )
+
+
+class VideoOutputSerializer(serializers.ModelSerializer):
+    """
+    Serializer for video output, handling the display of video information.
+    """
+
+    file_name = serializers.SerializerMethodField()
+    processing = serializers.SerializerMethodField()
+    subtitle_tracks = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Video
+        fields = [
+            "id",
+            "title",
+            "description",
+            "file_name",
+            "processing",
+            "subtitle_tracks",
+            "created_at",
+        ]
+
+    def get_file_name(self, obj):
+        return obj.video_file.name.split("/")[1]
+
+    def get_processing(self, obj):
+        """
+        Return the latest processing run of the video, if any.
+        """
+        runs = getattr(obj, "latest_processing_runs", None)
+        if runs is None:
+            runs = obj.processing_runs.order_by("-created_at", "-id")[:1]
+        return VideoProcessingRunSerializer(runs[0]).data if runs else None
+
+    def get_subtitle_tracks(self, obj):
+        """
+        Return the WebVTT subtitle tracks of the video; duplicate uploads have the tracks of
+        their source video.
+        """
+        video = obj.source if obj.source_id else obj
+        return SubtitleTrackSerializer(
+            video.subtitle_tracks.all(), many=True, context={"video_id": obj.id}
+        ).data
+
+
 class VideoListCreateView(
     PaginatedListAPIViewMixin,
     GenericAPIView,
@@ -37,6 +132,11 @@ class VideoListCreateView(
     """
 
     permission_classes = []
+    throttle_classes = [
+        BurstAnonRateThrottle,
+        SearchConcurrencyThrottle,
+        UploadConcurrencyThrottle,
+    ]
 
     class ListPagination(DefaultPageNumberPagination):
         pass
@@ -57,27 +157,27 @@ class VideoListCreateView(
             field.run_validation(attrs["video_file"])
             return attrs
 
-    class VideoOutputSerializer(serializers.ModelSerializer):
-        """
-        Serializer for video output, handling the display of video information.
-        """
-
-        file_name = serializers.SerializerMethodField()
-
-        class Meta:
-            model = Video
-            fields = ["id", "title", "description", "file_name", "created_at"]
-
-        def get_file_name(self, obj):
-            return obj.video_file.name.split("/")[1]
-
     pagination_class = ListPagination
-    queryset = Video.objects.all().order_by("-created_at")
+    queryset = (
+        Video.objects.with_latest_processing_run().with_subtitle_tracks().order_by("-created_at")
+    )
     serializer_class = VideoOutputSerializer
     filter_backends = [
         filters.SearchFilter,
     ]
 
+    def initialize_request(self, request, *args, **kwargs):
+        """
+        Reject oversized or wrong-type uploads while they stream in, and hash accepted files
+        on the way to disk so duplicate uploads can be detected without reading the stored
+        file back.
+        """
+        if request.method == "POST":
+            file_config = UploadedFileConfig(file_type="video")
+            request.upload_handlers.insert(0, HashingUploadHandler(request))
+            request.upload_handlers.insert(0, ValidatingUploadHandler(request, file_config))
+        return super().initialize_request(request, *args, **kwargs)
+
     def get(self, request, *args, **kwargs):
         """
         Handles GET requests to retrieve the list of videos.
@@ -89,6 +189,9 @@ class VideoListCreateView(
         Handles POST requests to upload a new video.
         """
         serializer = self.VideoInputSerializer(data=request.data)
+        rejection = getattr(request, "upload_rejection", None)
+        if rejection is not None:
+            raise rejection
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
 
@@ -98,6 +201,7 @@ class VideoListCreateView(
                 description=data.get("description"),
                 video_file=data["video_file"],
                 language=data["language"],
+                content_hash=request.upload_digests.get("video_file", ""),
             )
             logger.info(f"Video '{data['title']}' uploaded successfully.")
             return self.success_response(
@@ -112,3 +216,20 @@ class VideoListCreateView(
                 {"message": "An unexpected error occurred."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+class VideoDetailView(GenericAPIView):
+    """
+    API view for retrieving a single video with its processing status.
+    """
+
+    permission_classes = []
+    queryset = Video.objects.with_latest_processing_run().with_subtitle_tracks()
+    serializer_class = VideoOutputSerializer
+
+    def get(self, request, *args, **kwargs):
+        """
+        Handles GET requests to retrieve a video by id.
+        """
+        serializer = self.get_serializer(self.get_object())
+        return self.success_response(item=serializer.data)